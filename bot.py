@@ -1,24 +1,80 @@
 import asyncio
 import logging
+import os
+from typing import Optional
 
 import betterlogging as bl
 from aiogram import Bot, Dispatcher
-from aiogram.fsm.storage.memory import MemoryStorage
+from aiogram.fsm.middleware import FSMContextMiddleware
+from aiogram.fsm.storage.memory import MemoryStorage, SimpleEventIsolation
 from aiogram.fsm.storage.redis import DefaultKeyBuilder, RedisStorage
 from aiogram.webhook.aiohttp_server import SimpleRequestHandler, setup_application
 from aiohttp import web
 
+from infrastructure.database.models import LeadSubmission
+from infrastructure.database.setup import (
+    create_engine,
+    create_session_pool,
+    create_sqlite_engine,
+    create_tables,
+)
+from infrastructure.some_api.api import MyApi
 from tgbot.config import Config, load_config
 from tgbot.handlers import routers_list
+from tgbot.keyboards.inline import KeyboardCacheSession
+from tgbot.middlewares.api import ApiMiddleware
 from tgbot.middlewares.config import ConfigMiddleware
+from tgbot.middlewares.draft_lifecycle import DraftLifecycleMiddleware
+from tgbot.middlewares.edit_optimizer import EditOptimizer
+from tgbot.middlewares.form_card import FormCardMiddleware
+from tgbot.middlewares.fsm_buffer import (
+    BufferedFSMContextMiddleware,
+    FSMBufferMiddleware,
+)
+from tgbot.middlewares.lead_outbox import LeadOutboxMiddleware
+from tgbot.middlewares.ocr_pipeline import OcrPipelineMiddleware
+from tgbot.middlewares.photo_cache import PhotoCacheMiddleware
 from tgbot.services import broadcaster
+from tgbot.services.direction_catalog import direction_catalog
+from tgbot.services.draft_lifecycle import DraftLifecycle
+from tgbot.services.form_card import FormCard
+from tgbot.services.lead_outbox import LeadOutbox
+from tgbot.services.ocr_image import OcrImagePreparer
+from tgbot.services.ocr_pipeline import OcrPipeline
+from tgbot.services.photo_cache import PhotoCache
+from tgbot.storage import (
+    CachedStorage,
+    ClusterRedisStorage,
+    CompactRedisStorage,
+    HashTagKeyBuilder,
+    SqliteStorage,
+    create_redis,
+)
 
 
 async def on_startup(bot: Bot, admin_ids: list[int]):
     await broadcaster.broadcast(bot, admin_ids, "Bot was started")
 
 
-def register_global_middlewares(dp: Dispatcher, config: Config, session_pool=None):
+async def warm_up_catalogs(api: MyApi):
+    """Load the shared direction index so drafts from before a restart show names."""
+    try:
+        await direction_catalog.refresh(api)
+    except Exception as e:
+        logging.getLogger(__name__).warning("Could not load shipment directions: %s", e)
+
+
+def register_global_middlewares(
+    dp: Dispatcher,
+    config: Config,
+    api: MyApi,
+    lead_outbox: LeadOutbox,
+    photo_cache: PhotoCache,
+    ocr_pipeline: OcrPipeline,
+    form_card: FormCard,
+    draft_lifecycle: Optional[DraftLifecycle] = None,
+    session_pool=None,
+):
     """
     Register global middlewares for the given dispatcher.
     Global middlewares here are the ones that are applied to all the handlers (you specify the type of update)
@@ -26,13 +82,27 @@ def register_global_middlewares(dp: Dispatcher, config: Config, session_pool=Non
     :param dp: The dispatcher instance.
     :type dp: Dispatcher
     :param config: The configuration object from the loaded configuration.
+    :param api: The shared backend API client.
+    :param lead_outbox: The lead submission outbox.
+    :param photo_cache: The business card photo cache.
+    :param ocr_pipeline: The background business card OCR pipeline.
+    :param form_card: Shows the lead form prompts, on one message per draft if enabled.
+    :param draft_lifecycle: Optional expiry of idle drafts, for storages without a TTL.
     :param session_pool: Optional session pool object for the database using SQLAlchemy.
     :return: None
     """
     middleware_types = [
         ConfigMiddleware(config),
+        ApiMiddleware(api),
+        LeadOutboxMiddleware(lead_outbox),
+        PhotoCacheMiddleware(photo_cache),
+        OcrPipelineMiddleware(ocr_pipeline),
+        FormCardMiddleware(form_card),
+        FSMBufferMiddleware(),
         # DatabaseMiddleware(session_pool),
     ]
+    if draft_lifecycle is not None:
+        middleware_types.insert(-1, DraftLifecycleMiddleware(draft_lifecycle))
 
     for middleware_type in middleware_types:
         dp.message.outer_middleware(middleware_type)
@@ -76,13 +146,74 @@ def get_storage(config):
         Storage: The storage object based on the configuration.
 
     """
-    if config.tg_bot.use_redis:
-        return RedisStorage.from_url(
-            config.redis.dsn(),
-            key_builder=DefaultKeyBuilder(with_bot_id=True, with_destiny=True),
+    if not config.tg_bot.use_redis:
+        if config.fsm.backend == "sqlite":
+            # Drafts survive restarts; they are expired by the draft lifecycle
+            return SqliteStorage(
+                config.fsm.sqlite_path,
+                flush_interval=config.fsm.flush_interval,
+                ttl=config.drafts.idle_timeout,
+            )
+        return MemoryStorage()
+
+    redis = create_redis(config.redis)
+    cluster = config.redis.mode == "cluster"
+    if config.redis.fsm_storage == "compact":
+        storage = CompactRedisStorage(
+            redis,
+            ttl=config.redis.fsm_ttl,
+            compress_threshold=config.redis.fsm_compress_threshold,
+            hash_tag=cluster,
         )
     else:
-        return MemoryStorage()
+        # In a cluster the state, data and lock keys of a chat must share a slot
+        key_builder_class = HashTagKeyBuilder if cluster else DefaultKeyBuilder
+        storage_class = ClusterRedisStorage if cluster else RedisStorage
+        storage = storage_class(
+            redis,
+            key_builder=key_builder_class(with_bot_id=True, with_destiny=True),
+            state_ttl=config.redis.fsm_ttl,
+            data_ttl=config.redis.fsm_ttl,
+        )
+    if config.redis.fsm_l1_size > 0:
+        # Hot drafts are served from process memory, Redis stays the source of truth
+        storage = CachedStorage(
+            storage,
+            storage.redis,
+            max_entries=config.redis.fsm_l1_size,
+            ttl=config.redis.fsm_l1_ttl,
+        )
+    return storage
+
+
+def get_events_isolation(storage):
+    """
+    Return the event isolation for the given storage.
+
+    Updates of one chat are handled one at a time, and background tasks that
+    write to a draft (e.g. the OCR pipeline) take the same per-chat lock.
+    """
+    if isinstance(storage, (RedisStorage, CompactRedisStorage, CachedStorage)):
+        return storage.create_isolation()
+    return SimpleEventIsolation()
+
+
+async def create_outbox_engine(config: Config):
+    """
+    Return the engine that stores the lead submission outbox.
+
+    Postgres is used when OUTBOX_BACKEND=postgres (tables are created by Alembic),
+    otherwise a local SQLite file is created on demand.
+    """
+    if config.outbox.backend == "postgres":
+        return create_engine(config.db)
+
+    directory = os.path.dirname(config.outbox.sqlite_path)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    engine = create_sqlite_engine(config.outbox.sqlite_path)
+    await create_tables(engine, LeadSubmission)
+    return engine
 
 
 async def main():
@@ -91,14 +222,124 @@ async def main():
     config = load_config(".env")
     storage = get_storage(config)
 
-    bot = Bot(token=config.tg_bot.token)
-    dp = Dispatcher(storage=storage)
+    # Shared keyboards are serialized once per process instead of on every request
+    bot = Bot(token=config.tg_bot.token, session=KeyboardCacheSession())
+    # Identical edits are dropped and bursts of edits to one message coalesced
+    edit_optimizer = EditOptimizer(
+        debounce=config.edits.debounce,
+        max_messages=config.edits.max_messages,
+        dedup_ttl=config.edits.dedup_ttl,
+    )
+    bot.session.middleware(edit_optimizer)
+    dp = Dispatcher(
+        storage=storage,
+        events_isolation=get_events_isolation(storage),
+        disable_fsm=True,
+    )
+    # The FSM middleware reads state and data with one storage call per update
+    dp.fsm = BufferedFSMContextMiddleware(
+        storage=dp.fsm.storage,
+        events_isolation=dp.fsm.events_isolation,
+        strategy=dp.fsm.strategy,
+    )
+    dp.update.outer_middleware(dp.fsm)
+    if isinstance(storage, CachedStorage):
+        dp.startup.register(storage.start)
+    elif isinstance(storage, SqliteStorage):
+        dp.startup.register(storage.open)
+
+    # One long-lived API client (and connection pool) for the whole dispatcher lifetime
+    api = MyApi(config=config)
+    photo_cache = PhotoCache(
+        config.photo_cache.directory,
+        max_bytes=config.photo_cache.max_bytes,
+        max_age=config.photo_cache.max_age,
+        file_info_ttl=config.photo_cache.file_info_ttl,
+    )
+    dp.startup.register(photo_cache.start)
+    ocr_image = OcrImagePreparer(
+        min_side=config.ocr.min_side,
+        max_side=config.ocr.max_side,
+        jpeg_quality=config.ocr.jpeg_quality,
+        recompress=config.ocr.recompress,
+        workers=config.ocr.workers,
+    )
+    ocr_pipeline = OcrPipeline(
+        storage,
+        dp.fsm.events_isolation,
+        bot,
+        api,
+        photo_cache,
+        ocr_image,
+        max_in_flight=config.ocr.max_in_flight,
+        per_user_limit=config.ocr.per_user_limit,
+        queue_size=config.ocr.queue_size,
+        deadline=config.ocr.queue_deadline,
+    )
+    dp.startup.register(ocr_pipeline.start)
+
+    outbox_engine = await create_outbox_engine(config)
+    lead_outbox = LeadOutbox(
+        create_session_pool(outbox_engine),
+        bot,
+        api,
+        photo_cache,
+        workers=config.outbox.workers,
+        max_attempts=config.outbox.max_attempts,
+        poll_interval=config.outbox.poll_interval,
+    )
+    dp.startup.register(lead_outbox.start)
+
+    # Redis drafts expire on their own (REDIS_FSM_TTL), local ones need a sweeper
+    draft_lifecycle = None
+    if isinstance(storage, (MemoryStorage, SqliteStorage)):
+        draft_lifecycle = DraftLifecycle(
+            storage,
+            dp.fsm.events_isolation,
+            idle_timeout=config.drafts.idle_timeout,
+            sweep_interval=config.drafts.sweep_interval,
+            batch_size=config.drafts.sweep_batch,
+        )
+        dp.startup.register(draft_lifecycle.start)
+        dp.shutdown.register(draft_lifecycle.stop)
+
+    # Shutdown hooks run in registration order: stop the workers before closing their resources
+    dp.shutdown.register(lead_outbox.stop)
+    dp.shutdown.register(edit_optimizer.drain)
+    dp.shutdown.register(ocr_pipeline.stop)
+    dp.shutdown.register(api.close)
+    dp.shutdown.register(ocr_image.close)
+    dp.shutdown.register(outbox_engine.dispose)
+    # Dispatcher registers the FSM storage close as its first shutdown hook, but
+    # the OCR pipeline and the draft sweeper write drafts until they stop:
+    # close the storage (and events isolation) last
+    dp.shutdown.handlers = [
+        handler
+        for handler in dp.shutdown.handlers
+        if not isinstance(getattr(handler.callback, "__self__", None), FSMContextMiddleware)
+    ]
+    dp.shutdown.register(dp.fsm.close)
 
     dp.include_routers(*routers_list)
 
-    register_global_middlewares(dp, config)
+    form_card = FormCard(
+        enabled=config.form_card.enabled,
+        delete_replies=config.form_card.delete_replies,
+    )
+
+    register_global_middlewares(
+        dp,
+        config,
+        api,
+        lead_outbox,
+        photo_cache,
+        ocr_pipeline,
+        form_card,
+        draft_lifecycle,
+    )
 
     await on_startup(bot, config.tg_bot.admin_ids)
+    await warm_up_catalogs(api)
 
     # Choose between webhook and polling based on configuration
     # To use webhook mode, set USE_WEBHOOK=true in .env file and configure:
@@ -136,7 +377,11 @@ async def main():
 
         # Run forever
         print("Webhook mode, Bot started")
-        await asyncio.Event().wait()
+        try:
+            await asyncio.Event().wait()
+        finally:
+            # Triggers the dispatcher shutdown hooks
+            await runner.cleanup()
     else:
         # Use polling mode
         print("Polling mode, Bot started")
@@ -1,2 +1,3 @@
 from .base import Base
+from .lead_submissions import LeadSubmission
 from .users import User
@@ -0,0 +1,56 @@
+from datetime import datetime
+from typing import Any, Optional
+
+from sqlalchemy import BIGINT, JSON, Integer, String, Text, text
+from sqlalchemy.dialects.postgresql import TIMESTAMP
+from sqlalchemy.orm import Mapped, mapped_column
+
+from .base import Base, TimestampMixin, TableNameMixin, int_pk
+
+
+class LeadSubmission(Base, TimestampMixin, TableNameMixin):
+    """
+    This class represents a lead waiting in the submission outbox.
+
+    The lead form handler stores the final payload here and answers the user
+    right away; a background worker then sends it to the backend API.
+
+    Attributes:
+        id (Mapped[int]): The unique identifier of the outbox row.
+        idempotency_key (Mapped[str]): The key sent with the create-lead request, unique per draft.
+        telegram_id (Mapped[int]): The Telegram ID of the staff member who collected the lead.
+        chat_id (Mapped[int]): The chat where the summary message lives.
+        message_id (Mapped[Optional[int]]): The summary message to edit with the final status.
+        payload (Mapped[dict]): The lead data sent to the backend.
+        photo_file_id (Mapped[Optional[str]]): Telegram file_id of the business card photo.
+        photo_file_unique_id (Mapped[Optional[str]]): Its file_unique_id, the photo cache key.
+        summary (Mapped[str]): The rendered lead summary shown to the user.
+        status (Mapped[str]): One of pending, processing, sent or failed.
+        attempts (Mapped[int]): How many delivery attempts were made.
+        next_attempt_at (Mapped[datetime]): When the row becomes due for the next attempt.
+        last_error (Mapped[Optional[str]]): The error of the last failed attempt.
+    """
+
+    PENDING = "pending"
+    PROCESSING = "processing"
+    SENT = "sent"
+    FAILED = "failed"
+
+    id: Mapped[int_pk]
+    idempotency_key: Mapped[str] = mapped_column(String(64), unique=True)
+    telegram_id: Mapped[int] = mapped_column(BIGINT)
+    chat_id: Mapped[int] = mapped_column(BIGINT)
+    message_id: Mapped[Optional[int]] = mapped_column(BIGINT)
+    payload: Mapped[dict[str, Any]] = mapped_column(JSON)
+    photo_file_id: Mapped[Optional[str]] = mapped_column(String(256))
+    photo_file_unique_id: Mapped[Optional[str]] = mapped_column(String(64))
+    summary: Mapped[str] = mapped_column(Text)
+    status: Mapped[str] = mapped_column(
+        String(16), server_default=text("'pending'"), index=True
+    )
+    attempts: Mapped[int] = mapped_column(Integer, server_default=text("0"))
+    next_attempt_at: Mapped[datetime] = mapped_column(TIMESTAMP)
+    last_error: Mapped[Optional[str]] = mapped_column(Text)
+
+    def __repr__(self):
+        return f"<LeadSubmission {self.id} {self.idempotency_key} {self.status}>"
@@ -0,0 +1,131 @@
+from datetime import datetime, timedelta
+from typing import Any, Optional
+
+from sqlalchemy import select, update
+from sqlalchemy.exc import IntegrityError
+
+from infrastructure.database.models import LeadSubmission
+from infrastructure.database.repo.base import BaseRepo
+
+
+class LeadSubmissionRepo(BaseRepo):
+    async def enqueue(
+        self,
+        idempotency_key: str,
+        telegram_id: int,
+        chat_id: int,
+        message_id: Optional[int],
+        payload: dict[str, Any],
+        summary: str,
+        photo_file_id: Optional[str] = None,
+        photo_file_unique_id: Optional[str] = None,
+    ) -> Optional[LeadSubmission]:
+        """
+        Stores a lead in the outbox so that it is delivered in the background.
+        :param idempotency_key: The key that identifies this lead draft.
+        :param telegram_id: The Telegram ID of the staff member.
+        :param chat_id: The chat of the summary message.
+        :param message_id: The summary message to edit with the final status.
+        :param payload: The lead data for the backend.
+        :param summary: The rendered lead summary.
+        :param photo_file_id: Telegram file_id of the business card photo, if any.
+        :param photo_file_unique_id: Telegram file_unique_id of the same photo, if known.
+        :return: The stored LeadSubmission object, None if the key is already queued.
+        """
+        submission = LeadSubmission(
+            idempotency_key=idempotency_key,
+            telegram_id=telegram_id,
+            chat_id=chat_id,
+            message_id=message_id,
+            payload=payload,
+            summary=summary,
+            photo_file_id=photo_file_id,
+            photo_file_unique_id=photo_file_unique_id,
+            status=LeadSubmission.PENDING,
+            attempts=0,
+            next_attempt_at=datetime.now(),
+        )
+        self.session.add(submission)
+        try:
+            await self.session.commit()
+        except IntegrityError:
+            await self.session.rollback()
+            return None
+        return submission
+
+    async def claim_due(self, limit: int) -> list[LeadSubmission]:
+        """
+        Marks up to ``limit`` due pending rows as processing and returns them.
+        A row is only returned if this call was the one that switched it, so
+        several workers (or bot replicas) never deliver the same row twice.
+        """
+        candidates = await self.session.scalars(
+            select(LeadSubmission)
+            .where(
+                LeadSubmission.status == LeadSubmission.PENDING,
+                LeadSubmission.next_attempt_at <= datetime.now(),
+            )
+            .order_by(LeadSubmission.id)
+            .limit(limit)
+        )
+        claimed = []
+        for submission in candidates.all():
+            result = await self.session.execute(
+                update(LeadSubmission)
+                .where(
+                    LeadSubmission.id == submission.id,
+                    LeadSubmission.status == LeadSubmission.PENDING,
+                )
+                .values(status=LeadSubmission.PROCESSING)
+            )
+            if result.rowcount == 1:
+                submission.status = LeadSubmission.PROCESSING
+                claimed.append(submission)
+        await self.session.commit()
+        return claimed
+
+    async def mark_sent(self, submission_id: int) -> None:
+        await self._set(
+            submission_id, status=LeadSubmission.SENT, last_error=None
+        )
+
+    async def mark_failed(self, submission_id: int, attempts: int, error: str) -> None:
+        await self._set(
+            submission_id,
+            status=LeadSubmission.FAILED,
+            attempts=attempts,
+            last_error=error,
+        )
+
+    async def reschedule(
+        self, submission_id: int, attempts: int, error: str, delay: float
+    ) -> None:
+        """Puts a row back to pending, due again after ``delay`` seconds."""
+        await self._set(
+            submission_id,
+            status=LeadSubmission.PENDING,
+            attempts=attempts,
+            last_error=error,
+            next_attempt_at=datetime.now() + timedelta(seconds=delay),
+        )
+
+    async def release_processing(self) -> int:
+        """
+        Returns rows left in processing (e.g. after a crash) to the queue.
+        :return: The number of released rows.
+        """
+        result = await self.session.execute(
+            update(LeadSubmission)
+            .where(LeadSubmission.status == LeadSubmission.PROCESSING)
+            .values(status=LeadSubmission.PENDING)
+        )
+        await self.session.commit()
+        return result.rowcount
+
+    async def _set(self, submission_id: int, **values) -> None:
+        await self.session.execute(
+            update(LeadSubmission)
+            .where(LeadSubmission.id == submission_id)
+            .values(**values)
+        )
+        await self.session.commit()
@@ -2,6 +2,7 @@ from dataclasses import dataclass
 
 from sqlalchemy.ext.asyncio import AsyncSession
 
+from infrastructure.database.repo.lead_submissions import LeadSubmissionRepo
 from infrastructure.database.repo.users import UserRepo
 from infrastructure.database.setup import create_engine
 
@@ -23,6 +24,13 @@ class RequestsRepo:
         """
         return UserRepo(self.session)
 
+    @property
+    def lead_submissions(self) -> LeadSubmissionRepo:
+        """
+        The LeadSubmission repository manages the lead submission outbox.
+        """
+        return LeadSubmissionRepo(self.session)
+
 
 if __name__ == "__main__":
     from infrastructure.database.setup import create_session_pool
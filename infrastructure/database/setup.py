@@ -1,3 +1,4 @@
+from sqlalchemy import event
 from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker
 
 from tgbot.config import DbConfig
@@ -15,6 +16,42 @@ def create_engine(db: DbConfig, echo=False):
     return engine
 
 
+def create_sqlite_engine(path: str, echo=False):
+    """
+    Creates an engine for a local SQLite database file (used when Postgres is not configured).
+    """
+    engine = create_async_engine(
+        f"sqlite+aiosqlite:///{path}",
+        connect_args={"timeout": 30},
+        future=True,
+        echo=echo,
+    )
+
+    @event.listens_for(engine.sync_engine, "connect")
+    def set_sqlite_pragma(dbapi_connection, connection_record):
+        # WAL lets the bot read while a worker writes
+        cursor = dbapi_connection.cursor()
+        cursor.execute("PRAGMA journal_mode=WAL")
+        cursor.execute("PRAGMA synchronous=NORMAL")
+        cursor.close()
+
+    return engine
+
+
+async def create_tables(engine, *tables):
+    """
+    Creates the given tables if they don't exist yet.
+    Use it for embedded databases that are not managed by Alembic migrations.
+    """
+    from infrastructure.database.models import Base
+
+    async with engine.begin() as conn:
+        await conn.run_sync(
+            Base.metadata.create_all,
+            tables=[table.__table__ for table in tables],
+        )
+
+
 def create_session_pool(engine):
     session_pool = async_sessionmaker(bind=engine, expire_on_commit=False)
     return session_pool
@@ -1,12 +1,46 @@
+import uuid
+
 from infrastructure.some_api.base import BaseClient
+from infrastructure.some_api.cache import CatalogCache, OcrResultCache
 from tgbot.config import Config
 
 
+# Namespace for deterministic idempotency keys of mutating calls
+IDEMPOTENCY_NAMESPACE = uuid.UUID("5b0f3c1e-8d8a-4c55-9a53-2f4d3e6f7a10")
+
+
 class MyApi(BaseClient):
+    """Exhibition backend API client.
+
+    A single instance is meant to live for the whole dispatcher lifetime so that
+    all handlers share one keep-alive connection pool. It is created on startup,
+    handed to handlers by ``ApiMiddleware`` and closed on shutdown.
+
+    Mutating calls carry a deterministic idempotency key, which is what allows
+    ``BaseClient`` to retry them.
+    """
+
     def __init__(self, config: Config, **kwargs):
         self.api_key = config.tg_bot.token
-        self.base_url = "https://exhibition-api.interrail.uz"
-        super().__init__(base_url=self.base_url)
+        self.base_url = config.api.base_url
+        super().__init__(
+            base_url=self.base_url,
+            connector_limit=config.api.connector_limit,
+            connector_limit_per_host=config.api.connector_limit_per_host,
+            dns_cache_ttl=config.api.dns_cache_ttl,
+            keepalive_timeout=config.api.keepalive_timeout,
+        )
+        self.catalog = CatalogCache(
+            ttls={
+                "exhibitions": config.api.exhibitions_ttl,
+                "shipment_directions": config.api.shipment_directions_ttl,
+                "companies": config.api.companies_ttl,
+            },
+            max_stale=config.api.catalog_max_stale,
+        )
+        self.ocr_cache = OcrResultCache(
+            ttl=config.api.ocr_cache_ttl, max_entries=config.api.ocr_cache_size
+        )
 
     async def __aenter__(self):
         """Support for async with statement."""
@@ -16,6 +50,21 @@ class MyApi(BaseClient):
         """Ensure session is closed when exiting context."""
         await self.close()
 
+    async def close(self) -> None:
+        """Stop background catalog refreshes and close the session."""
+        self.catalog.close()
+        await super().close()
+
+    @staticmethod
+    def idempotency_key(*parts) -> str:
+        """Build a deterministic idempotency key from the given parts."""
+        return uuid.uuid5(IDEMPOTENCY_NAMESPACE, ":".join(map(str, parts))).hex
+
+    @classmethod
+    def lead_idempotency_key(cls, telegram_id, draft_id: str) -> str:
+        """Idempotency key of the create-lead call for one lead draft."""
+        return cls.idempotency_key("lead", telegram_id, draft_id)
+
     async def register(
         self,
         telegram_id: int,
@@ -36,6 +85,9 @@ class MyApi(BaseClient):
                 "first_name": first_name,
                 "last_name": last_name,
             },
+            idempotency_key=self.idempotency_key(
+                "registration", telegram_id, company_id
+            ),
             *args,
             **kwargs,
         )
@@ -48,12 +100,19 @@ class MyApi(BaseClient):
             url="/api/accounts/telegram-login/",
             headers=headers,
             json={"telegram_id": telegram_id},
+            idempotent=True,  # A lookup, safe to retry despite being a POST
             *args,
             **kwargs,
         )
         return status, result
 
     async def get_companies(self, *args, **kwargs):
+        """Return the companies catalog, served from the catalog cache."""
+        return await self.catalog.get(
+            "companies", lambda: self._fetch_companies(*args, **kwargs)
+        )
+
+    async def _fetch_companies(self, *args, **kwargs):
         headers = {"X-Telegram-Bot-API-Token": self.api_key}
         status, result = await self._make_request(
             method="GET",
@@ -65,6 +124,13 @@ class MyApi(BaseClient):
         return status, result
 
     async def get_shipment_directions(self, *args, **kwargs):
+        """Return the shipment directions catalog, served from the catalog cache."""
+        return await self.catalog.get(
+            "shipment_directions",
+            lambda: self._fetch_shipment_directions(*args, **kwargs),
+        )
+
+    async def _fetch_shipment_directions(self, *args, **kwargs):
         headers = {"X-Telegram-Bot-API-Token": self.api_key}
         status, result = await self._make_request(
             method="GET",
@@ -76,6 +142,12 @@ class MyApi(BaseClient):
         return status, result
 
     async def get_exhibitions(self, *args, **kwargs):
+        """Return the active exhibitions catalog, served from the catalog cache."""
+        return await self.catalog.get(
+            "exhibitions", lambda: self._fetch_exhibitions(*args, **kwargs)
+        )
+
+    async def _fetch_exhibitions(self, *args, **kwargs):
         headers = {"X-Telegram-Bot-API-Token": self.api_key}
         status, result = await self._make_request(
             method="GET",
@@ -87,49 +159,42 @@ class MyApi(BaseClient):
         return status, result
 
     async def create_lead(
-        self, data: dict, business_card_photo_data=None, *args, **kwargs
+        self,
+        data: dict,
+        business_card_photo_data=None,
+        *args,
+        draft_id: str | None = None,
+        idempotency_key: str | None = None,
+        **kwargs,
     ):
         """Create a lead with optional business card photo.
 
         Args:
             data: Dictionary containing lead data
             business_card_photo_data: Optional file data for business card photo
+            draft_id: Id of the lead draft; together with ``data["telegram_id"]``
+                it gives the request a deterministic idempotency key
+            idempotency_key: Explicit idempotency key, overrides ``draft_id``
+
+        Without a key the request is sent once and never retried, because a
+        retry after a timeout could create a duplicate lead.
 
         Returns:
             Tuple of (status_code, response_data)
         """
         headers = {"X-Telegram-Bot-API-Token": self.api_key}
+        if idempotency_key is None and draft_id:
+            idempotency_key = self.lead_idempotency_key(data["telegram_id"], draft_id)
 
         if business_card_photo_data:
-            # If we have a photo, use multipart form data
-            from aiohttp import FormData
-
-            # Create form data with all lead fields
-            form = FormData()
-
-            # Add all text fields from data dictionary
-            for key, value in data.items():
-                # Handle lists (like shipment_directions) by adding multiple fields with same name
-                if isinstance(value, list):
-                    for item in value:
-                        form.add_field(key, str(item))
-                else:
-                    form.add_field(key, str(value) if value is not None else "")
-
-            # Add the business card photo
-            form.add_field(
-                "business_card_photo",
-                business_card_photo_data,
-                filename="business_card.jpg",
-                content_type="image/jpeg",
-            )
-
-            # Make the request with form data
+            # If we have a photo, use multipart form data.
+            # A fresh form is built for every attempt since FormData can be sent only once.
             status, result = await self._make_request(
                 method="POST",
                 url="/api/leads/lead-create-via-telegram/",
                 headers=headers,
-                data=form,  # Use form data instead of JSON
+                data=lambda: self._lead_form(data, business_card_photo_data),
+                idempotency_key=idempotency_key,
                 *args,
                 **kwargs,
             )
@@ -140,40 +205,90 @@ class MyApi(BaseClient):
                 url="/api/leads/lead-create-via-telegram/",
                 headers=headers,
                 json=data,
+                idempotency_key=idempotency_key,
                 *args,
                 **kwargs,
             )
 
         return status, result
 
-    async def business_card_photo_ocr(self, file_data, *args, **kwargs):
+    @staticmethod
+    def _lead_form(data: dict, business_card_photo_data):
+        from aiohttp import FormData
+
+        # Create form data with all lead fields
+        form = FormData()
+
+        # Add all text fields from data dictionary
+        for key, value in data.items():
+            # Handle lists (like shipment_directions) by adding multiple fields with same name
+            if isinstance(value, list):
+                for item in value:
+                    form.add_field(key, str(item))
+            else:
+                form.add_field(key, str(value) if value is not None else "")
+
+        # Add the business card photo
+        form.add_field(
+            "business_card_photo",
+            business_card_photo_data,
+            filename="business_card.jpg",
+            content_type="image/jpeg",
+        )
+        return form
+
+    def cached_business_card_ocr(self, file_unique_id: str | None):
+        """The cached (status, response) of a photo, or None; used before downloading it."""
+        cached = self.ocr_cache.get(
+            self.ocr_cache.keys(file_unique_id, None), count_miss=False
+        )
+        if cached is None:
+            return None
+        return 200, cached
+
+    async def business_card_photo_ocr(
+        self, file_data, *args, file_unique_id: str | None = None, **kwargs
+    ):
         """Process a business card photo with OCR.
 
         Args:
             file_data: The file data to upload. This should be a bytes object or a file-like object.
                       For Telegram bot usage, you'll need to download the file from Telegram first.
+            file_unique_id: Telegram ``file_unique_id`` of the photo. Successful
+                results are cached under it and under the hash of ``file_data``,
+                so scanning the same card again does not call the backend.
 
         Returns:
             Tuple of (status_code, response_data)
         """
         from aiohttp import FormData
 
-        # Create multipart form data
-        form = FormData()
-        form.add_field(
-            "business_card_photo",
-            file_data,
-            filename="business_card.jpg",
-            content_type="image/jpeg",
-        )
+        cache_keys = self.ocr_cache.keys(file_unique_id, file_data)
+        cached = self.ocr_cache.get(cache_keys)
+        if cached is not None:
+            return 200, cached
+
+        def build_form():
+            # Create multipart form data (a fresh one for every attempt)
+            form = FormData()
+            form.add_field(
+                "business_card_photo",
+                file_data,
+                filename="business_card.jpg",
+                content_type="image/jpeg",
+            )
+            return form
 
         headers = {"X-Telegram-Bot-API-Token": self.api_key}
         status, result = await self._make_request(
             method="POST",
             url="/api/leads/business-card-ocr-via-telegram/",
             headers=headers,
-            data=form,  # Use form data instead of JSON
+            data=build_form,  # Use form data instead of JSON
+            idempotent=True,  # OCR has no side effects, safe to retry
             *args,
             **kwargs,
         )
+        if status == 200 and result and result.get("extracted_data"):
+            self.ocr_cache.put(cache_keys, status, result)
         return status, result
@@ -10,25 +10,56 @@ from aiohttp import ClientError, ClientSession, FormData, TCPConnector
 from ujson import dumps, loads
 
 if TYPE_CHECKING:
-    from collections.abc import Mapping
+    from collections.abc import Callable, Mapping
 
     from yarl import URL
 
+# Methods that can safely be repeated without side effects (RFC 9110)
+IDEMPOTENT_METHODS = frozenset({"GET", "HEAD", "OPTIONS", "PUT", "DELETE"})
+
 
 # Taken from here: https://github.com/Olegt0rr/WebServiceTemplate/blob/main/app/core/base_client.py
 class BaseClient:
     """Represents base API client."""
 
-    def __init__(self, base_url: str | URL) -> None:
+    # Concurrent identical GETs to URLs containing one of these markers share
+    # a single in-flight backend call unless ``coalesce`` is passed explicitly.
+    coalesce_url_markers: tuple[str, ...] = ("list_via_telegram",)
+
+    def __init__(
+        self,
+        base_url: str | URL,
+        connector_limit: int = 100,
+        connector_limit_per_host: int = 0,
+        dns_cache_ttl: int = 10,
+        keepalive_timeout: float = 15.0,
+    ) -> None:
         self._base_url = base_url
+        self._connector_limit = connector_limit
+        self._connector_limit_per_host = connector_limit_per_host
+        self._dns_cache_ttl = dns_cache_ttl
+        self._keepalive_timeout = keepalive_timeout
         self._session: ClientSession | None = None
+        self._in_flight: dict[tuple, asyncio.Task] = {}
+        self.coalesced_requests = 0
         self.log = logging.getLogger(self.__class__.__name__)
 
     async def _get_session(self) -> ClientSession:
-        """Get aiohttp session with cache."""
-        if self._session is None:
+        """Get aiohttp session with cache.
+
+        The session and its connector are created once and reused by every
+        request, so connections are kept alive between calls.
+        """
+        if self._session is None or self._session.closed:
             ssl_context = ssl.SSLContext()
-            connector = TCPConnector(ssl_context=ssl_context)
+            connector = TCPConnector(
+                ssl_context=ssl_context,
+                limit=self._connector_limit,
+                limit_per_host=self._connector_limit_per_host,
+                use_dns_cache=True,
+                ttl_dns_cache=self._dns_cache_ttl,
+                keepalive_timeout=self._keepalive_timeout,
+            )
             self._session = ClientSession(
                 base_url=self._base_url,
                 connector=connector,
@@ -37,22 +68,94 @@ class BaseClient:
 
         return self._session
 
+    async def _make_request(
+        self,
+        method: str,
+        url: str | URL,
+        params: Mapping[str, str] | None = None,
+        json: Mapping[str, str] | None = None,
+        headers: Mapping[str, str] | None = None,
+        data: FormData | Callable[[], FormData] | None = None,
+        coalesce: bool | None = None,
+        idempotency_key: str | None = None,
+        idempotent: bool | None = None,
+    ) -> tuple[int, dict[str, Any]]:
+        """Make request and return decoded json response.
+
+        Failed requests are retried with exponential backoff only when it is
+        safe: for idempotent methods, for requests carrying an idempotency key
+        (sent as the ``Idempotency-Key`` header) or when the caller marks the
+        request as ``idempotent``. Other mutating requests are sent once, so a
+        timeout after the backend committed never creates a duplicate.
+        Multipart bodies must be passed as a factory so that every attempt
+        gets a fresh ``FormData``.
+
+        Identical concurrent idempotent requests (same method, URL and params)
+        are coalesced: the first caller performs the request and every other
+        caller awaits the same result. Callers must not mutate the returned
+        result in that case, since it is shared.
+        """
+        if idempotency_key:
+            headers = {**(headers or {}), "Idempotency-Key": idempotency_key}
+        if idempotent is None:
+            idempotent = method.upper() in IDEMPOTENT_METHODS or bool(idempotency_key)
+        send = self._send_with_retries if idempotent else self._send_request
+
+        if coalesce is None:
+            coalesce = self._should_coalesce(method, url)
+        if not coalesce or json is not None or data is not None:
+            return await send(
+                method, url, params=params, json=json, headers=headers, data=data
+            )
+
+        key = (method.upper(), str(url), tuple(sorted((params or {}).items())))
+        task = self._in_flight.get(key)
+        if task is not None:
+            self.coalesced_requests += 1
+            self.log.debug("Coalesced request %r %r", method, url)
+        else:
+            task = asyncio.create_task(
+                send(method, url, params=params, headers=headers)
+            )
+            self._in_flight[key] = task
+            task.add_done_callback(lambda t: self._forget_in_flight(key, t))
+
+        # Shielded so that one cancelled waiter does not cancel the shared call
+        return await asyncio.shield(task)
+
+    def _should_coalesce(self, method: str, url: str | URL) -> bool:
+        if method.upper() not in ("GET", "HEAD"):
+            return False
+        return any(marker in str(url) for marker in self.coalesce_url_markers)
+
+    def _forget_in_flight(self, key: tuple, task: asyncio.Task) -> None:
+        self._in_flight.pop(key, None)
+        # Mark the exception as retrieved in case every waiter was cancelled
+        if not task.cancelled():
+            task.exception()
+
     @backoff.on_exception(
         backoff.expo,
         ClientError,
         max_time=20,
     )
-    async def _make_request(
+    async def _send_with_retries(self, *args, **kwargs) -> tuple[int, dict[str, Any]]:
+        """Send a request, retrying transport and server errors."""
+        return await self._send_request(*args, **kwargs)
+
+    async def _send_request(
         self,
         method: str,
         url: str | URL,
         params: Mapping[str, str] | None = None,
         json: Mapping[str, str] | None = None,
         headers: Mapping[str, str] | None = None,
-        data: FormData | None = None,
+        data: FormData | Callable[[], FormData] | None = None,
     ) -> tuple[int, dict[str, Any]]:
-        """Make request and return decoded json response."""
+        """Send a single request and decode the json response."""
         session = await self._get_session()
+        if data is not None and not isinstance(data, FormData):
+            data = data()
 
         self.log.debug(
             "Making request %r %r with json %r and params %r",
@@ -0,0 +1,192 @@
+from __future__ import annotations
+
+import asyncio
+import hashlib
+import logging
+import time
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from typing import TYPE_CHECKING, Any
+
+if TYPE_CHECKING:
+    from collections.abc import Awaitable, Callable, Mapping
+
+    Loader = Callable[[], Awaitable[tuple[int, Any]]]
+
+
+@dataclass
+class CacheEntry:
+    """A cached ``(status, result)`` response and the time it was fetched."""
+
+    status: int
+    result: Any
+    fetched_at: float = field(default_factory=time.monotonic)
+
+    @property
+    def age(self) -> float:
+        return time.monotonic() - self.fetched_at
+
+
+class CatalogCache:
+    """Stale-while-revalidate cache for slowly changing catalog endpoints.
+
+    Fresh entries are served from memory. Once an entry is older than its TTL
+    it is still served immediately while a single background refresh runs.
+    If the backend is down, the last good response keeps being served until
+    it is older than ``max_stale``.
+    """
+
+    def __init__(
+        self,
+        ttls: Mapping[str, float],
+        default_ttl: float = 300.0,
+        max_stale: float | None = None,
+    ) -> None:
+        self._ttls = dict(ttls)
+        self._default_ttl = default_ttl
+        self._max_stale = max_stale
+        self._entries: dict[str, CacheEntry] = {}
+        self._refreshing: dict[str, asyncio.Task] = {}
+        self.hits = 0
+        self.stale_hits = 0
+        self.misses = 0
+        self.refresh_failures = 0
+        self.log = logging.getLogger(self.__class__.__name__)
+
+    def ttl(self, key: str) -> float:
+        return self._ttls.get(key, self._default_ttl)
+
+    async def get(self, key: str, loader: Loader) -> tuple[int, Any]:
+        """Return the cached response for ``key``, loading it if needed."""
+        entry = self._entries.get(key)
+
+        if entry is not None and entry.age < self.ttl(key):
+            self.hits += 1
+            return entry.status, entry.result
+
+        if self._servable(entry):
+            self.stale_hits += 1
+            self._schedule_refresh(key, loader)
+            return entry.status, entry.result
+
+        self.misses += 1
+        # Shielded so that one cancelled caller does not cancel the shared load
+        return await asyncio.shield(self._schedule_refresh(key, loader))
+
+    def invalidate(self, key: str | None = None) -> None:
+        """Drop one cached catalog, or all of them."""
+        if key is None:
+            self._entries.clear()
+        else:
+            self._entries.pop(key, None)
+
+    def stats(self) -> dict[str, int]:
+        return {
+            "hits": self.hits,
+            "stale_hits": self.stale_hits,
+            "misses": self.misses,
+            "refresh_failures": self.refresh_failures,
+            "entries": len(self._entries),
+        }
+
+    def close(self) -> None:
+        """Cancel background refreshes that are still running."""
+        for task in self._refreshing.values():
+            task.cancel()
+        self._refreshing.clear()
+
+    def _schedule_refresh(self, key: str, loader: Loader) -> asyncio.Task:
+        # Only one refresh per key is in flight; concurrent callers share it.
+        task = self._refreshing.get(key)
+        if task is None:
+            task = asyncio.create_task(self._refresh(key, loader))
+            self._refreshing[key] = task
+            task.add_done_callback(lambda _: self._refreshing.pop(key, None))
+        return task
+
+    def _servable(self, entry: CacheEntry | None) -> bool:
+        return entry is not None and (
+            self._max_stale is None or entry.age < self._max_stale
+        )
+
+    async def _refresh(self, key: str, loader: Loader) -> tuple[int, Any]:
+        stale = self._entries.get(key)
+        try:
+            status, result = await loader()
+        except Exception as e:
+            self.refresh_failures += 1
+            if not self._servable(stale):
+                raise
+            self.log.warning("Serving stale %r catalog, refresh failed: %s", key, e)
+            return stale.status, stale.result
+
+        if status == 200 and result:
+            self._entries[key] = CacheEntry(status=status, result=result)
+            return status, result
+
+        self.refresh_failures += 1
+        if self._servable(stale):
+            self.log.warning(
+                "Serving stale %r catalog, backend answered %r", key, status
+            )
+            return stale.status, stale.result
+        return status, result
+
+
+class OcrResultCache:
+    """Bounded TTL cache of business card OCR results.
+
+    A result is stored under the Telegram ``file_unique_id`` of the photo and
+    under the SHA-256 of the uploaded bytes, so the same card is recognised
+    both when the photo is reused and when identical bytes are uploaded again.
+    Least recently used keys are evicted once there are more than
+    ``max_entries`` of them.
+    """
+
+    def __init__(self, ttl: float = 3600.0, max_entries: int = 1024) -> None:
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self._entries: OrderedDict[str, CacheEntry] = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    @staticmethod
+    def keys(file_unique_id: str | None, file_data: Any) -> list[str]:
+        """Cache keys of a photo: its ``file_unique_id`` and its content hash."""
+        keys = []
+        if file_unique_id:
+            keys.append(f"file:{file_unique_id}")
+        if isinstance(file_data, (bytes, bytearray, memoryview)):
+            keys.append(f"sha256:{hashlib.sha256(file_data).hexdigest()}")
+        return keys
+
+    def get(self, keys: list[str], count_miss: bool = True) -> Any | None:
+        """Return the cached result for the first matching key."""
+        for key in keys:
+            entry = self._entries.get(key)
+            if entry is None:
+                continue
+            if entry.age >= self.ttl:
+                del self._entries[key]
+                continue
+            self._entries.move_to_end(key)
+            self.hits += 1
+            # Remember the result under the other keys of this photo too
+            self._store(keys, entry)
+            return entry.result
+        if count_miss:
+            self.misses += 1
+        return None
+
+    def put(self, keys: list[str], status: int, result: Any) -> None:
+        self._store(keys, CacheEntry(status=status, result=result))
+
+    def stats(self) -> dict[str, int]:
+        return {"hits": self.hits, "misses": self.misses, "entries": len(self._entries)}
+
+    def _store(self, keys: list[str], entry: CacheEntry) -> None:
+        for key in keys:
+            self._entries[key] = entry
+            self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
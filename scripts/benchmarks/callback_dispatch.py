@@ -0,0 +1,163 @@
+"""
+Measure callback query dispatch with and without the callback prefix index.
+
+Feeds a mix of callback queries shaped like real lead form traffic (mostly
+direction toggles and page turns, then choice steps, back presses and OCR
+suggestions) through a Dispatcher with the bot's routers. Bot API calls go
+to an in-process session that answers immediately, so the time is spent on
+dispatch and the handlers themselves. Reports the filter evaluations and the
+latency per callback, first walking the router tree (index emptied), then
+through CallbackPrefixIndex.
+
+Usage:
+    python -m scripts.benchmarks.callback_dispatch --callbacks 5000
+"""
+
+import argparse
+import asyncio
+import datetime
+import statistics
+import time
+from typing import Any
+
+from aiogram import Bot, Dispatcher
+from aiogram.client.session.base import BaseSession
+from aiogram.dispatcher.event.handler import FilterObject
+from aiogram.fsm.storage.base import StorageKey
+from aiogram.fsm.storage.memory import MemoryStorage
+from aiogram.methods import TelegramMethod
+from aiogram.types import CallbackQuery, Chat, Message, Update, User
+
+from tgbot.handlers import callback_index, routers_list
+from tgbot.handlers.lead.core import callback_token
+from tgbot.services.direction_catalog import direction_catalog
+from tgbot.services.form_card import FormCard
+from tgbot.states.lead_form import LeadForm
+
+CHAT = Chat(id=1, type="private")
+USER = User(id=1, is_bot=False, first_name="Bench")
+
+# (state the user is in, callback data), weighted like a lead form session
+MIX = (
+    [(LeadForm.shipment_directions, f"direction:{i}") for i in range(10)]
+    + [(LeadForm.shipment_directions, f"directions:page:{p}") for p in (1, 2, 0)]
+    + [
+        (LeadForm.company_type, "company_type:forwarder"),
+        (LeadForm.mode_of_transport, "transport:containers"),
+        (LeadForm.cargo, "lead:back"),
+        (LeadForm.comments, "lead:back"),
+        (LeadForm.position, f"use_suggestion:position:{callback_token('Head of Logistics')}"),
+        (LeadForm.email, "skip:email"),
+        (LeadForm.meeting_place, "meeting_place:our_booth"),
+        (LeadForm.importance, "importance:high"),
+    ]
+)
+
+
+class InstantSession(BaseSession):
+    """Answers every Bot API call at once, without the network."""
+
+    async def make_request(
+        self, bot: Bot, method: TelegramMethod[Any], timeout: int | None = None
+    ) -> Any:
+        if method.__returning__ is bool:
+            return True
+        return Message(
+            message_id=2,
+            date=datetime.datetime.now(),
+            chat=CHAT,
+            text=getattr(method, "text", None) or "",
+        )
+
+    async def stream_content(self, *args: Any, **kwargs: Any):  # pragma: no cover
+        yield b""
+
+    async def close(self) -> None:
+        pass
+
+
+class Api:
+    async def get_shipment_directions(self):
+        return 200, {"results": []}
+
+
+filter_calls = 0
+_filter_call = FilterObject.call
+
+
+async def counting_call(self: FilterObject, *args: Any, **kwargs: Any) -> Any:
+    global filter_calls
+    filter_calls += 1
+    return await _filter_call(self, *args, **kwargs)
+
+
+async def run(name: str, dp: Dispatcher, bot: Bot, storage: MemoryStorage, callbacks: int):
+    global filter_calls
+    catalog = direction_catalog.latest
+    key = StorageKey(bot_id=bot.id, chat_id=CHAT.id, user_id=USER.id)
+    latencies = []
+    filter_calls = 0
+    for i in range(callbacks):
+        state, data = MIX[i % len(MIX)]
+        await storage.set_state(key, state)
+        await storage.set_data(
+            key,
+            {
+                "draft_id": "0" * 32,
+                "ocr_processed": True,
+                "extracted_data": {"position": "Head of Logistics"},
+                "business_card_skipped": True,
+                "directions_version": catalog.version,
+                "directions_mask": "5",
+            },
+        )
+        update = Update(
+            update_id=i,
+            callback_query=CallbackQuery(
+                id=str(i),
+                from_user=USER,
+                chat_instance="bench",
+                data=data,
+                message=Message(
+                    message_id=2, date=datetime.datetime.now(), chat=CHAT, text="form"
+                ),
+            ),
+        )
+        started = time.perf_counter()
+        await dp.feed_update(bot, update, api=Api(), form_card=FormCard())
+        latencies.append((time.perf_counter() - started) * 1_000_000)
+
+    latencies.sort()
+    print(
+        f"{name:<22} {filter_calls / callbacks:>6.1f} filters/callback  "
+        f"p50 {statistics.median(latencies):>6.0f} µs  "
+        f"p99 {latencies[int(len(latencies) * 0.99)]:>6.0f} µs"
+    )
+
+
+async def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--callbacks", type=int, default=5000)
+    args = parser.parse_args()
+
+    direction_catalog.update(
+        [{"id": d, "name": f"Direction {d}: Europe - Central Asia"} for d in range(1, 61)]
+    )
+    FilterObject.call = counting_call
+
+    storage = MemoryStorage()
+    dp = Dispatcher(storage=storage)
+    dp.include_routers(*routers_list)
+    bot = Bot(token="42:BENCH", session=InstantSession())
+
+    indexed = callback_index._routers
+    callback_index._routers = {}
+    await run("router tree walk", dp, bot, storage, args.callbacks)
+    callback_index._routers = indexed
+    callback_index.hits = callback_index.fallbacks = 0
+    await run("CallbackPrefixIndex", dp, bot, storage, args.callbacks)
+    print(callback_index.stats())
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
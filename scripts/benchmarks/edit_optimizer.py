@@ -0,0 +1,172 @@
+"""
+Measure the message edits sent for bursts of taps, with and without EditOptimizer.
+
+Taps through the shipment directions picker the way a user does when picking
+several directions quickly (toggles and page turns a fraction of a second
+apart, then a repeated "show all"), through the form routers. The in-process
+session answers like Telegram, including "message is not modified" for edits
+that change nothing. Reports the Bot API calls per burst and checks that the
+picker ends up showing the final selection either way.
+
+Usage:
+    python -m scripts.benchmarks.edit_optimizer --bursts 5 --gap 0.08
+"""
+
+import argparse
+import asyncio
+import datetime
+from collections import Counter
+from typing import Any
+
+from aiogram import Bot, Dispatcher
+from aiogram.client.session.base import BaseSession
+from aiogram.exceptions import TelegramBadRequest
+from aiogram.fsm.storage.base import StorageKey
+from aiogram.fsm.storage.memory import MemoryStorage
+from aiogram.methods import TelegramMethod
+from aiogram.types import CallbackQuery, Chat, Message, Update, User
+
+from tgbot.handlers.lead import lead_router
+from tgbot.middlewares.edit_optimizer import EditOptimizer
+from tgbot.services.direction_catalog import direction_catalog
+from tgbot.states.lead_form import LeadForm
+
+CHAT = Chat(id=1, type="private")
+USER = User(id=1, is_bot=False, first_name="Bench")
+BOT_USER = User(id=42, is_bot=True, first_name="Bot")
+PICKER_ID = 100
+
+BURST = [
+    *(f"direction:{position}" for position in (0, 2, 3, 5, 2, 6)),
+    "directions:page:1",
+    "direction:9",
+    "directions:page:0",
+    "directions:filter:clear",
+    "directions:filter:clear",
+]
+
+
+class TelegramLikeSession(BaseSession):
+    """Keeps what each message shows and rejects edits that change nothing."""
+
+    def __init__(self) -> None:
+        super().__init__()
+        self.calls: Counter = Counter()
+        self.shown: dict[int, tuple] = {}
+
+    async def make_request(
+        self, bot: Bot, method: TelegramMethod[Any], timeout: int | None = None
+    ) -> Any:
+        self.calls[type(method).__name__] += 1
+        message_id = getattr(method, "message_id", None)
+        if message_id is not None:
+            markup = getattr(method, "reply_markup", None)
+            shown = (
+                getattr(method, "text", None) or self.shown.get(message_id, (None,))[0],
+                markup.model_dump_json() if markup is not None else None,
+            )
+            if self.shown.get(message_id) == shown:
+                raise TelegramBadRequest(
+                    method=method,
+                    message="Bad Request: message is not modified: specified new "
+                    "message content and reply markup are exactly the same",
+                )
+            self.shown[message_id] = shown
+        return True
+
+    async def stream_content(self, *args: Any, **kwargs: Any):  # pragma: no cover
+        yield b""
+
+    async def close(self) -> None:
+        pass
+
+
+class Api:
+    async def get_shipment_directions(self):
+        return 200, {
+            "results": [
+                {"id": d, "name": f"Direction {d}: Europe - Central Asia"}
+                for d in range(1, 21)
+            ]
+        }
+
+
+async def play(
+    dp: Dispatcher, storage: MemoryStorage, optimizer: EditOptimizer | None, args
+) -> tuple[TelegramLikeSession, set]:
+    session = TelegramLikeSession()
+    if optimizer is not None:
+        session.middleware(optimizer)
+    bot = Bot(token="42:BENCH", session=session)
+    key = StorageKey(bot_id=bot.id, chat_id=CHAT.id, user_id=USER.id)
+    catalog = await direction_catalog.refresh(Api())
+    shown = set()
+    update_id = 0
+    for _ in range(args.bursts):
+        await storage.set_state(key, LeadForm.shipment_directions)
+        await storage.set_data(
+            key,
+            {
+                "draft_id": "0" * 32,
+                "directions_version": catalog.version,
+                "directions_mask": "0",
+                "directions_page": 0,
+                "directions_filter": "",
+            },
+        )
+        for data in BURST:
+            update_id += 1
+            update = Update(
+                update_id=update_id,
+                callback_query=CallbackQuery(
+                    id=str(update_id),
+                    from_user=USER,
+                    chat_instance="bench",
+                    data=data,
+                    message=Message(
+                        message_id=PICKER_ID,
+                        date=datetime.datetime.now(),
+                        chat=CHAT,
+                        from_user=BOT_USER,
+                        text="picker",
+                    ),
+                ),
+            )
+            await dp.feed_update(bot, update, api=Api())
+            await asyncio.sleep(args.gap)
+        # Let the held edit go out before checking what the user sees
+        await asyncio.sleep(args.debounce * 2)
+        mask = (await storage.get_data(key))["directions_mask"]
+        shown.add((mask, session.shown[PICKER_ID][1]))
+    return session, shown
+
+
+async def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--bursts", type=int, default=5)
+    parser.add_argument("--gap", type=float, default=0.08, help="seconds between taps")
+    parser.add_argument("--debounce", type=float, default=0.3)
+    args = parser.parse_args()
+
+    storage = MemoryStorage()
+    dp = Dispatcher(storage=storage)
+    dp.include_router(lead_router)
+
+    results = []
+    for name, optimizer in (
+        ("every edit sent", None),
+        ("EditOptimizer", EditOptimizer(debounce=args.debounce)),
+    ):
+        session, shown = await play(dp, storage, optimizer, args)
+        results.append(shown)
+        edits = session.calls["EditMessageReplyMarkup"] + session.calls["EditMessageText"]
+        print(
+            f"{name:<16} {edits / args.bursts:>5.1f} edits/burst of {len(BURST)} taps  "
+            f"{sum(session.calls.values()) / args.bursts:>5.1f} calls/burst"
+            + (f"  {optimizer.stats()}" if optimizer is not None else "")
+        )
+    assert results[0] == results[1], "the picker must end up the same"
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,181 @@
+"""
+Measure the outbound Bot API traffic of one completed lead, with and without the form card.
+
+Plays a lead from skipping the business card to picking the importance
+(typed answers, choice buttons, two shipment directions) through the bot's
+form routers. Bot API calls go to an in-process session that records them and
+answers at once; each request body is built like the aiohttp session builds
+it, to count the bytes sent. Reports the calls and bytes per lead for the
+form as it was (a new message per typed answer), the form card, and the form
+card that also deletes the user's answers.
+
+Usage:
+    python -m scripts.benchmarks.form_card --leads 20
+"""
+
+import argparse
+import asyncio
+import datetime
+from collections import Counter
+from typing import Any
+
+from aiogram import Bot, Dispatcher
+from aiogram.client.session.aiohttp import AiohttpSession
+from aiogram.fsm.storage.base import StorageKey
+from aiogram.fsm.storage.memory import MemoryStorage
+from aiogram.methods import TelegramMethod
+from aiogram.types import CallbackQuery, Chat, Message, Update, User
+
+from tgbot.handlers.lead import lead_router
+from tgbot.services.form_card import FormCard
+from tgbot.states.lead_form import LeadForm
+
+CHAT = Chat(id=1, type="private")
+USER = User(id=1, is_bot=False, first_name="Bench")
+BOT_USER = User(id=42, is_bot=True, first_name="Bot")
+
+# A lead as it is typed and tapped, starting at the business card step
+LEAD = [
+    "skip",
+    "Aziz Karimov",
+    "Head of Logistics",
+    "+998 90 123 45 67",
+    "aziz.karimov@silkroad-cargo.uz",
+    "Silk Road Cargo LLC",
+    "Amir Temur street 108, Tashkent, Uzbekistan",
+    "Freight forwarding",
+    ("company_type:forwarder",),
+    "Textiles, dried fruit, machinery parts",
+    ("transport:containers",),
+    "40 containers",
+    ("direction:0",),
+    ("direction:3",),
+    ("directions:done",),
+    "Interested in the China - Central Asia rail service",
+    ("meeting_place:our_booth",),
+    ("importance:high",),
+]
+
+
+class RecordingSession(AiohttpSession):
+    """Records every Bot API call and its body size, without the network."""
+
+    def __init__(self) -> None:
+        super().__init__()
+        self.calls: Counter = Counter()
+        self.bytes = 0
+        self.last_message_id = 1000
+        # The message whose buttons the user taps next
+        self.keyboard_message_id = None
+
+    async def make_request(
+        self, bot: Bot, method: TelegramMethod[Any], timeout: int | None = None
+    ) -> Any:
+        form = self.build_form_data(bot, method)
+        self.bytes += sum(len(str(value).encode()) for _, _, value in form._fields)
+        self.calls[type(method).__name__] += 1
+
+        message_id = getattr(method, "message_id", None)
+        if message_id is None and method.__returning__ is not bool:
+            self.last_message_id += 1
+            message_id = self.last_message_id
+        if getattr(method, "reply_markup", None) is not None:
+            self.keyboard_message_id = message_id
+        if method.__returning__ is bool:
+            return True
+        return Message(
+            message_id=message_id,
+            date=datetime.datetime.now(),
+            chat=CHAT,
+            from_user=BOT_USER,
+            text=getattr(method, "text", None) or "",
+        )
+
+
+class Api:
+    async def get_shipment_directions(self):
+        return 200, {
+            "results": [
+                {"id": d, "name": f"Direction {d}: Europe - Central Asia"}
+                for d in range(1, 21)
+            ]
+        }
+
+
+async def play(
+    dp: Dispatcher, storage: MemoryStorage, form_card: FormCard, leads: int
+) -> RecordingSession:
+    session = RecordingSession()
+    bot = Bot(token="42:BENCH", session=session)
+    key = StorageKey(bot_id=bot.id, chat_id=CHAT.id, user_id=USER.id)
+    update_id = 0
+    for _ in range(leads):
+        await storage.set_state(key, LeadForm.business_card_photo)
+        await storage.set_data(
+            key, {"draft_id": "0" * 32, "ocr_processed": False, "extracted_data": {}}
+        )
+        for step in LEAD:
+            update_id += 1
+            if isinstance(step, tuple):
+                update = Update(
+                    update_id=update_id,
+                    callback_query=CallbackQuery(
+                        id=str(update_id),
+                        from_user=USER,
+                        chat_instance="bench",
+                        data=step[0],
+                        message=Message(
+                            message_id=session.keyboard_message_id,
+                            date=datetime.datetime.now(),
+                            chat=CHAT,
+                            from_user=BOT_USER,
+                            text="form",
+                        ),
+                    ),
+                )
+            else:
+                update = Update(
+                    update_id=update_id,
+                    message=Message(
+                        message_id=update_id,
+                        date=datetime.datetime.now(),
+                        chat=CHAT,
+                        from_user=USER,
+                        text=step,
+                    ),
+                )
+            await dp.feed_update(bot, update, api=Api(), form_card=form_card)
+        # The lead is complete: the summary waits for confirmation
+        assert (await storage.get_data(key)).get("importance") == "high"
+    await bot.session.close()
+    return session
+
+
+async def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--leads", type=int, default=20)
+    args = parser.parse_args()
+
+    modes = [
+        ("new message per answer", FormCard()),
+        ("form card", FormCard(enabled=True)),
+        ("form card, delete replies", FormCard(enabled=True, delete_replies=True)),
+    ]
+    storage = MemoryStorage()
+    dp = Dispatcher(storage=storage)
+    dp.include_router(lead_router)
+    for name, form_card in modes:
+        session = await play(dp, storage, form_card, args.leads)
+        calls = sum(session.calls.values())
+        by_method = ", ".join(
+            f"{method} {count / args.leads:g}"
+            for method, count in sorted(session.calls.items())
+        )
+        print(
+            f"{name:<26} {calls / args.leads:>5.1f} calls/lead  "
+            f"{session.bytes / args.leads / 1024:>6.1f} KiB/lead  ({by_method})"
+        )
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,95 @@
+"""
+Compare the per-update latency of the FSM storages available without Redis
+(MemoryStorage, SqliteStorage) with aiogram's RedisStorage.
+
+Every update runs a typical form handler (read state, read data, update data,
+set state) through the buffered FSM context, like the bot does. For
+SqliteStorage the time of the background flushes is reported as well, since
+that is where the disk writes happen.
+
+Usage (Redis is optional, the SQLite file is created in a temporary directory):
+    python -m scripts.benchmarks.fsm_latency --updates 5000
+    python -m scripts.benchmarks.fsm_latency --url redis://localhost:6379/15
+"""
+
+import argparse
+import asyncio
+import os
+import statistics
+import tempfile
+import time
+
+from aiogram.fsm.storage.base import BaseStorage, StorageKey
+from aiogram.fsm.storage.memory import MemoryStorage
+from aiogram.fsm.storage.redis import DefaultKeyBuilder, RedisStorage
+
+from scripts.benchmarks.fsm_storage import BOT_ID, handler, make_draft
+from tgbot.middlewares.fsm_buffer import BufferedFSMContext
+from tgbot.storage import SqliteStorage
+
+
+async def run(name: str, storage: BaseStorage, drafts: int, updates: int) -> None:
+    keys = [StorageKey(bot_id=BOT_ID, chat_id=i, user_id=i) for i in range(drafts)]
+    for i, key in enumerate(keys):
+        await storage.set_state(key, "LeadForm:comments")
+        await storage.set_data(key, make_draft(i))
+
+    latencies = []
+    for i in range(updates):
+        key = keys[i % drafts]
+        started = time.perf_counter()
+        # Its first read loads state and data, as the dispatcher does in the bot
+        state = BufferedFSMContext(storage, key)
+        await handler(state, i)
+        await state.flush()
+        latencies.append((time.perf_counter() - started) * 1000)
+        # Give background tasks (the SQLite flusher) a chance to run
+        await asyncio.sleep(0)
+
+    latencies.sort()
+    line = (
+        f"{name:<16} "
+        f"p50 {statistics.median(latencies):>7.3f} ms  "
+        f"p99 {latencies[int(len(latencies) * 0.99)]:>7.3f} ms  "
+        f"max {latencies[-1]:>7.3f} ms"
+    )
+    if isinstance(storage, SqliteStorage):
+        started = time.perf_counter()
+        await storage.flush()
+        flush_ms = (time.perf_counter() - started) * 1000
+        line += f"  (last flush {flush_ms:.1f} ms, {storage.commits} commits)"
+    print(line)
+
+    for key in keys:
+        await storage.set_state(key, None)
+        await storage.set_data(key, {})
+
+
+async def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--url", help="Redis URL; RedisStorage is skipped without it")
+    parser.add_argument("--drafts", type=int, default=200)
+    parser.add_argument("--updates", type=int, default=2000)
+    parser.add_argument("--flush-interval", type=float, default=0.2)
+    args = parser.parse_args()
+
+    await run("MemoryStorage", MemoryStorage(), args.drafts, args.updates)
+
+    with tempfile.TemporaryDirectory() as directory:
+        sqlite = SqliteStorage(
+            os.path.join(directory, "fsm.sqlite3"), flush_interval=args.flush_interval
+        )
+        await sqlite.open()
+        await run("SqliteStorage", sqlite, args.drafts, args.updates)
+        await sqlite.close()
+
+    if args.url:
+        redis = RedisStorage.from_url(
+            args.url, key_builder=DefaultKeyBuilder(with_bot_id=True, with_destiny=True)
+        )
+        await run("RedisStorage", redis, args.drafts, args.updates)
+        await redis.close()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
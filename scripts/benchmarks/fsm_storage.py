@@ -0,0 +1,124 @@
+"""
+Compare aiogram's RedisStorage with CompactRedisStorage.
+
+Measures the Redis memory used by one lead draft and the Redis commands and
+time spent by a typical form handler (read state, read data, update data,
+set state), with and without the buffered FSM context.
+
+Usage (needs a running Redis, uses and cleans up only its own keys):
+    python -m scripts.benchmarks.fsm_storage --url redis://localhost:6379/15
+"""
+
+import argparse
+import asyncio
+import time
+
+from aiogram.fsm.context import FSMContext
+from aiogram.fsm.storage.base import StorageKey
+from aiogram.fsm.storage.redis import DefaultKeyBuilder, RedisStorage
+from redis.asyncio import Redis
+
+from tgbot.middlewares.fsm_buffer import BufferedFSMContext
+from tgbot.storage import CompactRedisStorage
+
+BOT_ID = 999_000_001
+
+
+def make_draft(i: int) -> dict:
+    return {
+        "draft_id": f"{i:032x}",
+        "exhibition_id": "12",
+        "exhibition": "Transport Logistic Central Asia 2025",
+        "business_card_photo": "AgACAgIAAxkBAAIBQ2Z" + "x" * 60,
+        "ocr_processed": True,
+        "extracted_data": {
+            "full_name": "Alexander Ivanov",
+            "position": "Head of Logistics",
+            "phone": "+998 90 123 45 67",
+            "email": "a.ivanov@example.com",
+            "company_name": "Silk Road Freight LLC",
+            "company_address": "Tashkent, Amir Temur street 1",
+        },
+        "full_name": "Alexander Ivanov",
+        "position": "Head of Logistics",
+        "phone_number": "+998 90 123 45 67",
+        "email": "a.ivanov@example.com",
+        "company_name": "Silk Road Freight LLC",
+        "company_address": "Tashkent, Amir Temur street 1",
+        "available_directions": [
+            {"id": d, "name": f"Direction {d}: Europe - Central Asia - China"}
+            for d in range(60)
+        ],
+        "selected_directions": [str(d) for d in range(0, 60, 7)],
+    }
+
+
+async def commands_processed(redis: Redis) -> int:
+    info = await redis.info("stats")
+    return info["total_commands_processed"]
+
+
+async def handler(state: FSMContext, i: int) -> None:
+    await state.get_state()
+    data = await state.get_data()
+    await state.update_data(comments=f"Comment {i}")
+    await state.get_data()
+    await state.set_state("LeadForm:meeting_place")
+    assert data["draft_id"]
+
+
+async def run(name: str, storage, redis: Redis, drafts: int, buffered: bool) -> None:
+    keys = [StorageKey(bot_id=BOT_ID, chat_id=i, user_id=i) for i in range(drafts)]
+    for i, key in enumerate(keys):
+        await storage.set_state(key, "LeadForm:comments")
+        await storage.set_data(key, make_draft(i))
+
+    memory = 0
+    for redis_key in await redis.keys(f"*{BOT_ID}*"):
+        memory += await redis.memory_usage(redis_key) or 0
+
+    before = await commands_processed(redis)
+    started = time.perf_counter()
+    for i, key in enumerate(keys):
+        if buffered:
+            # Its first read loads state and data, as the dispatcher does in the bot
+            state = BufferedFSMContext(storage, key)
+            await handler(state, i)
+            await state.flush()
+        else:
+            await handler(FSMContext(storage, key), i)
+    elapsed = time.perf_counter() - started
+    # Minus the INFO command itself
+    commands = await commands_processed(redis) - before - 1
+
+    print(
+        f"{name:<28} {memory / drafts:>10.0f} B/draft "
+        f"{commands / drafts:>6.1f} cmds/handler "
+        f"{elapsed / drafts * 1000:>7.2f} ms/handler"
+    )
+
+    for redis_key in await redis.keys(f"*{BOT_ID}*"):
+        await redis.delete(redis_key)
+
+
+async def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--url", default="redis://localhost:6379/15")
+    parser.add_argument("--drafts", type=int, default=500)
+    args = parser.parse_args()
+
+    redis = Redis.from_url(args.url)
+    stock = RedisStorage(
+        redis, key_builder=DefaultKeyBuilder(with_bot_id=True, with_destiny=True)
+    )
+    compact = CompactRedisStorage(redis, ttl=7 * 24 * 3600)
+
+    await run("RedisStorage", stock, redis, args.drafts, buffered=False)
+    await run("RedisStorage + buffer", stock, redis, args.drafts, buffered=True)
+    await run("CompactRedisStorage", compact, redis, args.drafts, buffered=False)
+    await run("CompactRedisStorage + buffer", compact, redis, args.drafts, buffered=True)
+    await redis.aclose()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
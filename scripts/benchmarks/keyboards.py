@@ -0,0 +1,155 @@
+"""
+Measure what the static inline keyboards cost per form step.
+
+For every keyboard that does not depend on the draft, builds the request body
+of a sendMessage call the way the handlers did before (a new markup built for
+every step and serialized by the default session) and the way they do now
+(the shared markup, serialized once by KeyboardCacheSession). Reports time and
+memory allocated per step, measured with tracemalloc, and checks that both
+produce the same form fields.
+
+Usage:
+    python -m scripts.benchmarks.keyboards --steps 20000
+"""
+
+import argparse
+import time
+import tracemalloc
+from typing import Callable, List
+
+from aiogram import Bot
+from aiogram.client.session.aiohttp import AiohttpSession
+from aiogram.methods import SendMessage
+from aiogram.types import InlineKeyboardButton, InlineKeyboardMarkup
+
+from tgbot.keyboards.inline import (
+    BACK_MARKUP,
+    COMPANY_TYPE_CHOICES,
+    COMPANY_TYPE_MARKUP,
+    CONFIRM_MARKUP,
+    IMPORTANCE_MARKUP,
+    MEETING_PLACE_MARKUP,
+    MODE_OF_TRANSPORT_CHOICES,
+    TRANSPORT_MARKUP,
+    KeyboardCacheSession,
+)
+
+TEXT = "📋 <b>Lead Information Summary</b>\n\n" + "🏭 <b>Company name:</b> Silk Road\n" * 12
+
+
+def back_row() -> List[InlineKeyboardButton]:
+    return [InlineKeyboardButton(text="⬅️ Back", callback_data="lead:back")]
+
+
+# The static keyboards built like the handlers built them before
+FRESH_MARKUPS: List[Callable[[], InlineKeyboardMarkup]] = [
+    lambda: InlineKeyboardMarkup(inline_keyboard=[back_row()]),
+    lambda: InlineKeyboardMarkup(
+        inline_keyboard=[
+            *(
+                [InlineKeyboardButton(text=label, callback_data=f"company_type:{value}")]
+                for value, label in COMPANY_TYPE_CHOICES
+            ),
+            back_row(),
+        ]
+    ),
+    lambda: InlineKeyboardMarkup(
+        inline_keyboard=[
+            *(
+                [InlineKeyboardButton(text=label, callback_data=f"transport:{value}")]
+                for value, label in MODE_OF_TRANSPORT_CHOICES
+            ),
+            back_row(),
+        ]
+    ),
+    lambda: InlineKeyboardMarkup(
+        inline_keyboard=[
+            [InlineKeyboardButton(text="Our Booth", callback_data="meeting_place:our_booth")],
+            [
+                InlineKeyboardButton(
+                    text="Partner Booth", callback_data="meeting_place:partner_booth"
+                )
+            ],
+            back_row(),
+        ]
+    ),
+    lambda: InlineKeyboardMarkup(
+        inline_keyboard=[
+            [InlineKeyboardButton(text="⚪ Low", callback_data="importance:low")],
+            [InlineKeyboardButton(text="🟡 Medium", callback_data="importance:medium")],
+            [InlineKeyboardButton(text="🟢 High", callback_data="importance:high")],
+            back_row(),
+        ]
+    ),
+    lambda: InlineKeyboardMarkup(
+        inline_keyboard=[
+            [InlineKeyboardButton(text="✅ Confirm", callback_data="lead:confirm")],
+            [InlineKeyboardButton(text="❌ Cancel", callback_data="lead:cancel")],
+            [InlineKeyboardButton(text="🔄 Restart", callback_data="lead:restart")],
+        ]
+    ),
+]
+
+
+SHARED_MARKUPS = [
+    BACK_MARKUP,
+    COMPANY_TYPE_MARKUP,
+    TRANSPORT_MARKUP,
+    MEETING_PLACE_MARKUP,
+    IMPORTANCE_MARKUP,
+    CONFIRM_MARKUP,
+]
+
+
+def fields(session: AiohttpSession, bot: Bot, markup: InlineKeyboardMarkup) -> list:
+    method = SendMessage(chat_id=42, text=TEXT, parse_mode="HTML", reply_markup=markup)
+    form = session.build_form_data(bot, method)
+    return sorted((options["name"], value) for options, _, value in form._fields)
+
+
+def measure(name: str, step: Callable[[int], None], steps: int) -> None:
+    started = time.perf_counter()
+    for i in range(steps):
+        step(i)
+    elapsed = time.perf_counter() - started
+
+    # Peak traced memory of a step = what it allocates before freeing it again
+    samples = min(steps, 1000)
+    peaks = 0
+    tracemalloc.start()
+    for i in range(samples):
+        tracemalloc.reset_peak()
+        baseline = tracemalloc.get_traced_memory()[0]
+        step(i)
+        peaks += tracemalloc.get_traced_memory()[1] - baseline
+    tracemalloc.stop()
+    print(
+        f"{name:<28} {elapsed / steps * 1_000_000:>7.1f} µs/step  "
+        f"{peaks / samples / 1024:>7.1f} KiB allocated/step"
+    )
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--steps", type=int, default=20000)
+    args = parser.parse_args()
+
+    bot = Bot(token="42:TEST")
+    default_session = AiohttpSession()
+    cached_session = KeyboardCacheSession()
+
+    for fresh, shared in zip(FRESH_MARKUPS, SHARED_MARKUPS):
+        assert fields(default_session, bot, fresh()) == fields(cached_session, bot, shared)
+
+    def before(i: int) -> None:
+        fields(default_session, bot, FRESH_MARKUPS[i % len(FRESH_MARKUPS)]())
+
+    def after(i: int) -> None:
+        fields(cached_session, bot, SHARED_MARKUPS[i % len(SHARED_MARKUPS)])
+
+    measure("built + serialized per step", before, args.steps)
+    measure("shared, serialized once", after, args.steps)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,157 @@
+"""
+Measure the cost of rendering the lead summary at every form step.
+
+Fills a draft step by step with a catalog of realistic size, rendering the
+summary twice per step like the handlers do (after the answer and again when
+the next prompt is edited). Compares rendering from scratch, as the summary
+was built before, with SummaryRenderer, and checks that both produce the
+same text.
+
+Usage:
+    python -m scripts.benchmarks.lead_summary --directions 60 --drafts 500
+"""
+
+import argparse
+import time
+
+from tgbot.handlers.lead.core import (
+    COMPANY_TYPE_CHOICES,
+    IMPORTANCE_CHOICES,
+    MODE_OF_TRANSPORT_CHOICES,
+    SummaryRenderer,
+)
+from tgbot.services.direction_catalog import direction_catalog
+
+
+def render_from_scratch(data: dict) -> str:
+    """The summary as it was built before: layout, choices and names on every call."""
+    summary = "📋 <b>Lead Information Summary</b>\n\n"
+    total_fields = 17
+    filled_fields = 0
+    field_map = {
+        "exhibition": ("🎪 <b>Exhibition:</b>", None),
+        "full_name": ("📝 <b>Full Name:</b>", None),
+        "position": ("🏢 <b>Position in the company:</b>", None),
+        "phone_number": ("📱 <b>Phone number:</b>", None),
+        "email": ("📧 <b>Email address:</b>", None),
+        "company_name": ("🏭 <b>Company name:</b>", None),
+        "company_address": ("🏢 <b>Company address:</b>", None),
+        "sphere_of_activity": ("🔍 <b>Sphere of activity:</b>", None),
+        "company_type": ("📊 <b>Company type:</b>", COMPANY_TYPE_CHOICES),
+        "cargo": ("📦 <b>Cargo:</b>", None),
+        "mode_of_transport": (
+            "🚢 <b>Preferred mode of transport:</b>",
+            MODE_OF_TRANSPORT_CHOICES,
+        ),
+        "shipment_volume": ("📏 <b>Monthly shipment volume:</b>", None),
+        "comments": ("💬 <b>Comments:</b>", None),
+        "meeting_place": ("🤝 <b>Meeting place:</b>", None),
+        "importance": ("📌 <b>Lead importance:</b>", list(IMPORTANCE_CHOICES)),
+    }
+    for key, (label_prefix, choices) in field_map.items():
+        value = data.get(key)
+        if value:
+            display_value = value
+            if choices:
+                display_value = next((label for val, label in choices if val == value), value)
+            summary += f"{label_prefix} {display_value}\n"
+            filled_fields += 1
+
+    selected = data.get("selected_directions") or []
+    if selected:
+        names = direction_catalog.names(data.get("directions_version"), selected)
+        if names:
+            summary += f"🗺️ <b>Directions:</b> {', '.join(names)}\n"
+        else:
+            summary += f"🗺️ <b>Directions:</b> {len(selected)} selected\n"
+        filled_fields += 1
+
+    if data.get("business_card_photo"):
+        summary += "📸 <b>Business Card:</b> Uploaded\n"
+        filled_fields += 1
+
+    percentage = int((filled_fields / total_fields) * 100)
+    summary += (
+        "\n\n<b>Progress:</b> ["
+        + "█" * (percentage // 10)
+        + "░" * (10 - (percentage // 10))
+        + f"] {percentage}%\n"
+    )
+    summary += f"<b>Completed:</b> {filled_fields}/{total_fields} fields"
+    return summary
+
+
+def form_steps(i: int, version: str) -> list[dict]:
+    """The answers of one lead, one dict per form step."""
+    return [
+        {"draft_id": f"{i:032x}", "exhibition": "Transport Logistic Central Asia 2025"},
+        {"business_card_photo": f"AgACAgIAAxkBAAIBQ2Z{i}"},
+        {"full_name": f"Alexander Ivanov {i}"},
+        {"position": "Head of Logistics"},
+        {"phone_number": "+998 90 123 45 67"},
+        {"email": f"a.ivanov{i}@example.com"},
+        {"company_name": "Silk Road Freight LLC"},
+        {"company_address": "Tashkent, Amir Temur street 1"},
+        {"sphere_of_activity": "Freight forwarding"},
+        {"company_type": "forwarder"},
+        {"cargo": "Cotton, textile"},
+        {"mode_of_transport": "containers"},
+        {"shipment_volume": "40 containers"},
+        {
+            "directions_version": version,
+            "selected_directions": [str(d) for d in range(0, 60, 7)],
+        },
+        {"comments": f"Comment {i}"},
+        {"meeting_place": "Booth B12"},
+        {"importance": "high"},
+    ]
+
+
+def run(name: str, render, drafts: int, version: str) -> list[float]:
+    per_step = [0.0] * 17
+    for i in range(drafts):
+        data: dict = {}
+        for step, answers in enumerate(form_steps(i, version)):
+            data.update(answers)
+            started = time.perf_counter()
+            render(data)
+            render(data)
+            per_step[step] += time.perf_counter() - started
+    total = sum(per_step) / drafts * 1_000_000
+    print(f"{name:<20} {total / 17:>8.1f} µs/step  {total:>8.1f} µs/lead")
+    return per_step
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--directions", type=int, default=60)
+    parser.add_argument("--drafts", type=int, default=500)
+    args = parser.parse_args()
+
+    catalog = direction_catalog.update(
+        [
+            {"id": d, "name": f"Direction {d}: Europe - Central Asia - China"}
+            for d in range(args.directions)
+        ]
+    )
+    checked = SummaryRenderer()
+    data: dict = {}
+    for step, answers in enumerate(form_steps(0, catalog.version), start=1):
+        data.update(answers)
+        assert checked.render(data) == render_from_scratch(data), f"step {step} differs"
+
+    renderer = SummaryRenderer()
+    baseline = run("from scratch", render_from_scratch, args.drafts, catalog.version)
+    memoized = run("SummaryRenderer", renderer.render, args.drafts, catalog.version)
+    print()
+
+    print("step  from scratch  SummaryRenderer  (µs for two renders)")
+    for step, (before, after) in enumerate(zip(baseline, memoized), start=1):
+        print(
+            f"{step:>4}  {before / args.drafts * 1_000_000:>12.1f}"
+            f"  {after / args.drafts * 1_000_000:>15.1f}"
+        )
+
+
+if __name__ == "__main__":
+    main()
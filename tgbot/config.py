@@ -1,4 +1,4 @@
-from dataclasses import dataclass
+from dataclasses import dataclass, field
 from typing import Optional
 
 from environs import Env
@@ -100,12 +100,36 @@ class RedisConfig:
     redis_port : Optional(int)
         The port where Redis server is listening.
     redis_host : Optional(str)
-        The host where Redis server is located.
+        The host where Redis server is located (in cluster mode, one of the startup nodes).
+    mode : str
+        The Redis topology: "single" (one server) or "cluster" (Redis Cluster).
+    nodes : list[str]
+        More "host:port" startup nodes of the cluster, in cluster mode.
+    max_connections : int
+        The maximum number of connections in the pool (per cluster node in cluster mode).
+    fsm_storage : str
+        The FSM storage backend: "compact" (one hash per chat) or "aiogram" (aiogram's RedisStorage).
+    fsm_ttl : Optional(int)
+        How long an idle FSM draft is kept, in seconds (None keeps it forever).
+    fsm_compress_threshold : int
+        FSM data larger than this many bytes is stored compressed.
+    fsm_l1_size : int
+        How many chats' FSM records are cached in process memory (0 disables the cache).
+    fsm_l1_ttl : float
+        How long an in-process FSM record is trusted, in seconds.
     """
 
     redis_pass: Optional[str]
     redis_port: Optional[int]
     redis_host: Optional[str]
+    mode: str = "single"
+    nodes: list[str] = field(default_factory=list)
+    max_connections: int = 50
+    fsm_storage: str = "compact"
+    fsm_ttl: Optional[int] = 7 * 24 * 3600
+    fsm_compress_threshold: int = 1024
+    fsm_l1_size: int = 1000
+    fsm_l1_ttl: float = 30.0
 
     def dsn(self) -> str:
         """
@@ -124,9 +148,27 @@ class RedisConfig:
         redis_pass = env.str("REDIS_PASSWORD")
         redis_port = env.int("REDIS_PORT")
         redis_host = env.str("REDIS_HOST")
+        mode = env.str("REDIS_MODE", "single")
+        nodes = env.list("REDIS_NODES", [])
+        max_connections = env.int("REDIS_MAX_CONNECTIONS", 50)
+        fsm_storage = env.str("REDIS_FSM_STORAGE", "compact")
+        fsm_ttl = env.int("REDIS_FSM_TTL", 7 * 24 * 3600) or None
+        fsm_compress_threshold = env.int("REDIS_FSM_COMPRESS_THRESHOLD", 1024)
+        fsm_l1_size = env.int("REDIS_FSM_L1_SIZE", 1000)
+        fsm_l1_ttl = env.float("REDIS_FSM_L1_TTL", 30.0)
 
         return RedisConfig(
-            redis_pass=redis_pass, redis_port=redis_port, redis_host=redis_host
+            redis_pass=redis_pass,
+            redis_port=redis_port,
+            redis_host=redis_host,
+            mode=mode,
+            nodes=nodes,
+            max_connections=max_connections,
+            fsm_storage=fsm_storage,
+            fsm_ttl=fsm_ttl,
+            fsm_compress_threshold=fsm_compress_threshold,
+            fsm_l1_size=fsm_l1_size,
+            fsm_l1_ttl=fsm_l1_ttl,
         )
 
 
@@ -171,6 +213,365 @@ class WebhookConfig:
             use_webhook=use_webhook
         )
 
+@dataclass
+class ApiConfig:
+    """
+    Backend API client configuration class.
+
+    This class holds the settings for the shared HTTP connection pool used by MyApi.
+
+    Attributes
+    ----------
+    base_url : str
+        The base URL of the exhibition backend API.
+    connector_limit : int
+        The total number of simultaneous connections in the pool.
+    connector_limit_per_host : int
+        The number of simultaneous connections to the same host (0 means no limit).
+    dns_cache_ttl : int
+        How long resolved DNS entries are cached, in seconds.
+    keepalive_timeout : float
+        How long an idle keep-alive connection is kept open, in seconds.
+    exhibitions_ttl : float
+        How long the exhibitions catalog is served without revalidation, in seconds.
+    shipment_directions_ttl : float
+        How long the shipment directions catalog is served without revalidation, in seconds.
+    companies_ttl : float
+        How long the companies catalog is served without revalidation, in seconds.
+    catalog_max_stale : float
+        How long a stale catalog may still be served while the backend is unavailable, in seconds.
+    ocr_cache_ttl : float
+        How long a business card OCR result is reused for the same photo, in seconds.
+    ocr_cache_size : int
+        The maximum number of cached OCR result keys.
+    """
+
+    base_url: str
+    connector_limit: int = 100
+    connector_limit_per_host: int = 0
+    dns_cache_ttl: int = 300
+    keepalive_timeout: float = 30.0
+    exhibitions_ttl: float = 300.0
+    shipment_directions_ttl: float = 900.0
+    companies_ttl: float = 900.0
+    catalog_max_stale: float = 86400.0
+    ocr_cache_ttl: float = 3600.0
+    ocr_cache_size: int = 1024
+
+    @staticmethod
+    def from_env(env: Env):
+        """
+        Creates the ApiConfig object from environment variables.
+        """
+        base_url = env.str("API_BASE_URL", "https://exhibition-api.interrail.uz")
+        connector_limit = env.int("API_CONNECTOR_LIMIT", 100)
+        connector_limit_per_host = env.int("API_CONNECTOR_LIMIT_PER_HOST", 0)
+        dns_cache_ttl = env.int("API_DNS_CACHE_TTL", 300)
+        keepalive_timeout = env.float("API_KEEPALIVE_TIMEOUT", 30.0)
+        exhibitions_ttl = env.float("API_EXHIBITIONS_TTL", 300.0)
+        shipment_directions_ttl = env.float("API_SHIPMENT_DIRECTIONS_TTL", 900.0)
+        companies_ttl = env.float("API_COMPANIES_TTL", 900.0)
+        catalog_max_stale = env.float("API_CATALOG_MAX_STALE", 86400.0)
+        ocr_cache_ttl = env.float("API_OCR_CACHE_TTL", 3600.0)
+        ocr_cache_size = env.int("API_OCR_CACHE_SIZE", 1024)
+
+        return ApiConfig(
+            base_url=base_url,
+            connector_limit=connector_limit,
+            connector_limit_per_host=connector_limit_per_host,
+            dns_cache_ttl=dns_cache_ttl,
+            keepalive_timeout=keepalive_timeout,
+            exhibitions_ttl=exhibitions_ttl,
+            shipment_directions_ttl=shipment_directions_ttl,
+            companies_ttl=companies_ttl,
+            catalog_max_stale=catalog_max_stale,
+            ocr_cache_ttl=ocr_cache_ttl,
+            ocr_cache_size=ocr_cache_size,
+        )
+
+
+@dataclass
+class OutboxConfig:
+    """
+    Lead submission outbox configuration class.
+
+    Confirmed leads are stored in the outbox and delivered to the backend by background workers.
+
+    Attributes
+    ----------
+    backend : str
+        Where the outbox is stored: "sqlite" (default) or "postgres" (uses DbConfig).
+    sqlite_path : str
+        The SQLite database file used by the "sqlite" backend.
+    workers : int
+        The number of concurrent delivery workers.
+    max_attempts : int
+        How many delivery attempts are made before a lead is marked as failed.
+    poll_interval : float
+        How often the outbox is polled for due rows, in seconds.
+    """
+
+    backend: str = "sqlite"
+    sqlite_path: str = "data/outbox.sqlite3"
+    workers: int = 4
+    max_attempts: int = 8
+    poll_interval: float = 2.0
+
+    @staticmethod
+    def from_env(env: Env):
+        """
+        Creates the OutboxConfig object from environment variables.
+        """
+        backend = env.str("OUTBOX_BACKEND", "sqlite")
+        sqlite_path = env.str("OUTBOX_SQLITE_PATH", "data/outbox.sqlite3")
+        workers = env.int("OUTBOX_WORKERS", 4)
+        max_attempts = env.int("OUTBOX_MAX_ATTEMPTS", 8)
+        poll_interval = env.float("OUTBOX_POLL_INTERVAL", 2.0)
+
+        return OutboxConfig(
+            backend=backend,
+            sqlite_path=sqlite_path,
+            workers=workers,
+            max_attempts=max_attempts,
+            poll_interval=poll_interval,
+        )
+
+
+@dataclass
+class PhotoCacheConfig:
+    """
+    Business card photo cache configuration class.
+
+    Attributes
+    ----------
+    directory : str
+        The directory where downloaded photos are stored.
+    max_bytes : int
+        The maximum total size of the cached photos, in bytes.
+    max_age : float
+        How long a photo is kept, in seconds.
+    file_info_ttl : float
+        How long a Telegram get_file result (download link) is reused, in seconds.
+    """
+
+    directory: str = "data/photos"
+    max_bytes: int = 200 * 1024 * 1024
+    max_age: float = 24 * 3600
+    file_info_ttl: float = 55 * 60
+
+    @staticmethod
+    def from_env(env: Env):
+        """
+        Creates the PhotoCacheConfig object from environment variables.
+        """
+        directory = env.str("PHOTO_CACHE_DIR", "data/photos")
+        max_bytes = env.int("PHOTO_CACHE_MAX_MB", 200) * 1024 * 1024
+        max_age = env.float("PHOTO_CACHE_MAX_AGE", 24 * 3600)
+        file_info_ttl = env.float("TELEGRAM_FILE_INFO_TTL", 55 * 60)
+
+        return PhotoCacheConfig(
+            directory=directory,
+            max_bytes=max_bytes,
+            max_age=max_age,
+            file_info_ttl=file_info_ttl,
+        )
+
+
+@dataclass
+class OcrConfig:
+    """
+    Business card OCR configuration class.
+
+    Attributes
+    ----------
+    min_side : int
+        The smallest Telegram photo size whose shorter side is at least this many pixels is used for OCR.
+    max_side : int
+        Photos are downscaled so that their longer side is at most this many pixels before the upload.
+    jpeg_quality : int
+        The JPEG quality used when a photo is recompressed.
+    recompress : bool
+        Whether photos are downscaled and recompressed (requires Pillow).
+    workers : int
+        The number of processes used to recompress photos.
+    max_in_flight : int
+        The maximum number of OCR calls running at once, for all users.
+    per_user_limit : int
+        The maximum number of OCR calls running at once for one user.
+    queue_size : int
+        The maximum number of business cards waiting for OCR.
+    queue_deadline : float
+        How long a business card may wait for OCR before the user is asked to fill in the form manually, in seconds.
+    """
+
+    min_side: int = 1000
+    max_side: int = 1600
+    jpeg_quality: int = 85
+    recompress: bool = True
+    workers: int = 2
+    max_in_flight: int = 4
+    per_user_limit: int = 1
+    queue_size: int = 100
+    queue_deadline: float = 20.0
+
+    @staticmethod
+    def from_env(env: Env):
+        """
+        Creates the OcrConfig object from environment variables.
+        """
+        min_side = env.int("OCR_MIN_SIDE", 1000)
+        max_side = env.int("OCR_MAX_SIDE", 1600)
+        jpeg_quality = env.int("OCR_JPEG_QUALITY", 85)
+        recompress = env.bool("OCR_RECOMPRESS", True)
+        workers = env.int("OCR_IMAGE_WORKERS", 2)
+        max_in_flight = env.int("OCR_MAX_IN_FLIGHT", 4)
+        per_user_limit = env.int("OCR_PER_USER_LIMIT", 1)
+        queue_size = env.int("OCR_QUEUE_SIZE", 100)
+        queue_deadline = env.float("OCR_QUEUE_DEADLINE", 20.0)
+
+        return OcrConfig(
+            min_side=min_side,
+            max_side=max_side,
+            jpeg_quality=jpeg_quality,
+            recompress=recompress,
+            workers=workers,
+            max_in_flight=max_in_flight,
+            per_user_limit=per_user_limit,
+            queue_size=queue_size,
+            queue_deadline=queue_deadline,
+        )
+
+
+@dataclass
+class FsmStorageConfig:
+    """
+    Local FSM storage configuration class, used when Redis is disabled.
+
+    Attributes
+    ----------
+    backend : str
+        Where lead drafts are kept: "sqlite" (default, survives restarts) or "memory".
+    sqlite_path : str
+        The SQLite database file used by the "sqlite" backend.
+    flush_interval : float
+        How often changed drafts are written to disk, in seconds.
+    """
+
+    backend: str = "sqlite"
+    sqlite_path: str = "data/fsm.sqlite3"
+    flush_interval: float = 0.2
+
+    @staticmethod
+    def from_env(env: Env):
+        """
+        Creates the FsmStorageConfig object from environment variables.
+        """
+        backend = env.str("FSM_STORAGE", "sqlite")
+        sqlite_path = env.str("FSM_SQLITE_PATH", "data/fsm.sqlite3")
+        flush_interval = env.float("FSM_FLUSH_INTERVAL", 0.2)
+
+        return FsmStorageConfig(
+            backend=backend,
+            sqlite_path=sqlite_path,
+            flush_interval=flush_interval,
+        )
+
+
+@dataclass
+class DraftsConfig:
+    """
+    Lead draft lifecycle configuration class.
+
+    Attributes
+    ----------
+    idle_timeout : float
+        How long a draft of an inactive chat is kept in memory, in seconds.
+    sweep_interval : float
+        How often idle drafts are looked for, in seconds.
+    sweep_batch : int
+        The maximum number of drafts expired per sweep.
+    """
+
+    idle_timeout: float = 24 * 3600
+    sweep_interval: float = 60.0
+    sweep_batch: int = 500
+
+    @staticmethod
+    def from_env(env: Env):
+        """
+        Creates the DraftsConfig object from environment variables.
+        """
+        idle_timeout = env.float("DRAFT_IDLE_TIMEOUT", 24 * 3600)
+        sweep_interval = env.float("DRAFT_SWEEP_INTERVAL", 60.0)
+        sweep_batch = env.int("DRAFT_SWEEP_BATCH", 500)
+
+        return DraftsConfig(
+            idle_timeout=idle_timeout,
+            sweep_interval=sweep_interval,
+            sweep_batch=sweep_batch,
+        )
+
+
+@dataclass
+class FormCardConfig:
+    """
+    Lead form card configuration class.
+
+    Attributes
+    ----------
+    enabled : bool
+        Whether the prompts after typed answers edit one message per draft instead of sending a new one.
+    delete_replies : bool
+        Whether the user's typed answers are deleted, so the form card stays the last message.
+    """
+
+    enabled: bool = False
+    delete_replies: bool = False
+
+    @staticmethod
+    def from_env(env: Env):
+        """
+        Creates the FormCardConfig object from environment variables.
+        """
+        enabled = env.bool("FORM_CARD", False)
+        delete_replies = env.bool("FORM_CARD_DELETE_REPLIES", False)
+
+        return FormCardConfig(enabled=enabled, delete_replies=delete_replies)
+
+
+@dataclass
+class EditOptimizerConfig:
+    """
+    Outbound message edit optimizer configuration class.
+
+    Attributes
+    ----------
+    debounce : float
+        Edits of the same message sent within this many seconds of the previous one are coalesced, 0 disables it.
+    max_messages : int
+        The number of most recently used bot messages whose last text and keyboard are remembered.
+    dedup_ttl : float
+        For how many seconds after it was sent the remembered content is trusted to drop identical edits.
+    """
+
+    debounce: float = 0.3
+    max_messages: int = 10000
+    dedup_ttl: float = 10.0
+
+    @staticmethod
+    def from_env(env: Env):
+        """
+        Creates the EditOptimizerConfig object from environment variables.
+        """
+        debounce = env.float("EDIT_DEBOUNCE", 0.3)
+        max_messages = env.int("EDIT_TRACKED_MESSAGES", 10000)
+        dedup_ttl = env.float("EDIT_DEDUP_TTL", 10.0)
+
+        return EditOptimizerConfig(
+            debounce=debounce, max_messages=max_messages, dedup_ttl=dedup_ttl
+        )
+
+
 @dataclass
 class Miscellaneous:
     """
@@ -203,6 +604,22 @@ class Config:
         Holds the values for miscellaneous settings.
     webhook : WebhookConfig
         Holds the settings related to the webhook configuration.
+    api : ApiConfig
+        Holds the settings related to the backend API client.
+    outbox : OutboxConfig
+        Holds the settings related to the lead submission outbox.
+    photo_cache : PhotoCacheConfig
+        Holds the settings related to the business card photo cache.
+    ocr : OcrConfig
+        Holds the settings related to the business card OCR.
+    fsm : FsmStorageConfig
+        Holds the settings related to the local FSM storage (without Redis).
+    drafts : DraftsConfig
+        Holds the settings related to expiring idle lead drafts.
+    form_card : FormCardConfig
+        Holds the settings related to the lead form card.
+    edits : EditOptimizerConfig
+        Holds the settings related to trimming outbound message edits.
     db : Optional[DbConfig]
         Holds the settings specific to the database (default is None).
     redis : Optional[RedisConfig]
@@ -212,6 +629,14 @@ class Config:
     tg_bot: TgBot
     misc: Miscellaneous
     webhook: WebhookConfig
+    api: ApiConfig
+    outbox: OutboxConfig
+    photo_cache: PhotoCacheConfig
+    ocr: OcrConfig
+    fsm: FsmStorageConfig
+    drafts: DraftsConfig
+    form_card: FormCardConfig
+    edits: EditOptimizerConfig
     db: Optional[DbConfig] = None
     redis: Optional[RedisConfig] = None
 
@@ -229,10 +654,21 @@ def load_config(path: str = None) -> Config:
     env = Env()
     env.read_env(path)
 
+    outbox = OutboxConfig.from_env(env)
+    tg_bot = TgBot.from_env(env)
+
     return Config(
-        tg_bot=TgBot.from_env(env),
-        # db=DbConfig.from_env(env),
-        # redis=RedisConfig.from_env(env),
+        tg_bot=tg_bot,
+        db=DbConfig.from_env(env) if outbox.backend == "postgres" else None,
+        redis=RedisConfig.from_env(env) if tg_bot.use_redis else None,
         webhook=WebhookConfig.from_env(env),
+        api=ApiConfig.from_env(env),
+        outbox=outbox,
+        photo_cache=PhotoCacheConfig.from_env(env),
+        ocr=OcrConfig.from_env(env),
+        fsm=FsmStorageConfig.from_env(env),
+        drafts=DraftsConfig.from_env(env),
+        form_card=FormCardConfig.from_env(env),
+        edits=EditOptimizerConfig.from_env(env),
         misc=Miscellaneous(),
     )
@@ -1,10 +1,36 @@
 """Import all routers and add them to routers_list."""
 
 from .admin import admin_router
+from .callback_index import CallbackPrefixIndex
 from .lead import lead_router
+from .lead.business_card import business_card_router
+from .lead.confirmation import confirmation_router
+from .lead.form_fields import form_fields_router
+from .lead.navigation import navigation_router
 from .user import user_router
 
+# Callback data prefix -> routers handling it, in the order of routers_list
+callback_index = CallbackPrefixIndex()
+callback_index.register(user_router, "company", "retry_registration")
+callback_index.register(
+    business_card_router, "exhibition", "business_card", "ocr", "use_suggestion"
+)
+callback_index.register(
+    form_fields_router,
+    "company_type",
+    "transport",
+    "skip",
+    "retry_fetch_directions",
+    "direction",
+    "directions",
+    "meeting_place",
+    "importance",
+)
+callback_index.register(navigation_router, "lead")
+callback_index.register(confirmation_router, "lead")
+
 routers_list = [
+    callback_index.router,
     admin_router,
     user_router,
     lead_router,
@@ -12,5 +38,6 @@ routers_list = [
 ]
 
 __all__ = [
+    "callback_index",
     "routers_list",
 ]
@@ -1,8 +1,17 @@
+from typing import Optional
+
 from aiogram import Router
-from aiogram.filters import CommandStart
+from aiogram.filters import Command, CommandStart
+from aiogram.fsm.storage.base import BaseStorage
 from aiogram.types import Message
 
+from infrastructure.some_api.api import MyApi
 from tgbot.filters.admin import AdminFilter
+from tgbot.middlewares.fsm_buffer import FSMBufferMiddleware
+from tgbot.services.draft_lifecycle import DraftLifecycle
+from tgbot.services.ocr_pipeline import OcrPipeline
+from tgbot.services.photo_cache import PhotoCache
+from tgbot.storage import CachedStorage
 
 admin_router = Router()
 admin_router.message.filter(AdminFilter())
@@ -11,3 +20,76 @@ admin_router.message.filter(AdminFilter())
 @admin_router.message(CommandStart())
 async def admin_start(message: Message):
     await message.reply("Welcome, admin!")
+
+
+@admin_router.message(Command("stats"))
+async def admin_stats(
+    message: Message,
+    api: MyApi,
+    photo_cache: PhotoCache,
+    ocr_pipeline: OcrPipeline,
+    fsm_buffer: FSMBufferMiddleware,
+    fsm_storage: BaseStorage,
+    draft_lifecycle: Optional[DraftLifecycle] = None,
+):
+    """Show runtime counters of the bot's caches and queues."""
+    catalog = api.catalog.stats()
+    photos = photo_cache.stats()
+    ocr = ocr_pipeline.ocr_image.stats()
+    ocr_jobs = ocr_pipeline.stats()
+    ocr_results = api.ocr_cache.stats()
+    fsm = fsm_buffer.stats()
+    served_from_cache = catalog["hits"] + catalog["stale_hits"]
+    l1_text = ""
+    if isinstance(fsm_storage, CachedStorage):
+        l1 = fsm_storage.stats()
+        l1_text = (
+            "\n\n🧠 <b>FSM memory cache</b>\n"
+            f"Hit rate: {l1['hit_rate']}% ({l1['hits']} hits, {l1['misses']} misses)\n"
+            f"Cached: {l1['entries']} chats, {l1['bytes'] // 1024} KB\n"
+            f"Invalidations: {l1['invalidations']}"
+        )
+    drafts_text = ""
+    if draft_lifecycle is not None:
+        drafts = draft_lifecycle.stats()
+        drafts_text = (
+            "\n\n📝 <b>Lead drafts</b>\n"
+            f"Live: {drafts['live_drafts']}\n"
+            f"Chats tracked: {drafts['tracked_chats']}\n"
+            f"Expired: {drafts['expired']}\n"
+            f"Reclaimed: {drafts['reclaimed_bytes'] // 1024} KB"
+        )
+    await message.reply(
+        "📊 <b>Catalog cache</b>\n"
+        f"Hits: {catalog['hits']}\n"
+        f"Stale hits: {catalog['stale_hits']}\n"
+        f"Misses: {catalog['misses']}\n"
+        f"Refresh failures: {catalog['refresh_failures']}\n"
+        f"Backend calls saved: {served_from_cache}\n\n"
+        "🔀 <b>Request coalescing</b>\n"
+        f"Absorbed requests: {api.coalesced_requests}\n\n"
+        "📸 <b>Photo cache</b>\n"
+        f"Hits: {photos['hits']}\n"
+        f"Misses: {photos['misses']}\n"
+        f"Cached: {photos['photos']} photos, {photos['bytes'] // 1024} KB\n\n"
+        "🪪 <b>Background OCR</b>\n"
+        f"Queue depth: {ocr_jobs['queue_depth']}\n"
+        f"In flight: {ocr_jobs['in_flight']}\n"
+        f"Processed: {ocr_jobs['processed']}\n"
+        f"Failed: {ocr_jobs['failed']}\n"
+        f"Shed (rejected / expired): {ocr_jobs['rejected']} / {ocr_jobs['expired']}\n\n"
+        "🖼 <b>OCR uploads</b>\n"
+        f"Cards: {ocr['cards']}\n"
+        f"Saved: {ocr['bytes_saved'] // 1024} KB\n\n"
+        "🧾 <b>OCR result cache</b>\n"
+        f"Hits: {ocr_results['hits']}\n"
+        f"Misses: {ocr_results['misses']}\n"
+        f"Entries: {ocr_results['entries']}\n\n"
+        "💾 <b>FSM storage</b>\n"
+        f"Updates: {fsm['updates']}\n"
+        f"Ops per update: {fsm['requested_ops_per_update']} requested, "
+        f"{fsm['storage_ops_per_update']} sent to storage"
+        + l1_text
+        + drafts_text,
+        parse_mode="HTML",
+    )
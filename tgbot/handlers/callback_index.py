@@ -0,0 +1,89 @@
+"""Dispatch callback queries by the prefix of their data instead of walking every router."""
+
+import logging
+from contextvars import ContextVar
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Set, Tuple
+
+from aiogram import Router
+from aiogram.dispatcher.event.bases import UNHANDLED
+from aiogram.types import CallbackQuery
+
+# Callback query id and the routers the index propagated it to without a
+# result, for the walk over the router tree that follows in the same task
+_tried: ContextVar[Optional[Tuple[str, Tuple[Router, ...]]]] = ContextVar(
+    "callback_index_tried", default=None
+)
+
+
+class CallbackPrefixIndex:
+    """
+    Hash index from the prefix of ``callback.data`` (the part before the first
+    ``:``) to the routers whose callback handlers use it.
+
+    ``router`` is included in front of all other routers. Its only handler
+    looks the prefix up once and propagates the callback to the owning
+    routers only, so the filters of unrelated handlers are never evaluated.
+    If the prefix is not indexed or none of its routers handles the callback,
+    the callback falls through to the usual walk over the router tree, so a
+    missing registration costs time but never changes behaviour. Registered
+    routers get an outer middleware that skips them in that walk when the
+    index has already propagated the callback to them, so their filters are
+    not evaluated twice.
+
+    Routers are propagated to directly, so their parents must not have
+    callback_query root filters; register them in the order they are
+    included in the tree.
+    """
+
+    def __init__(self) -> None:
+        self._routers: Dict[str, List[Router]] = {}
+        self._skipping: Set[Router] = set()
+        self.router = Router(name="callback_index")
+        self.router.callback_query.register(self._dispatch)
+        self.hits = 0
+        self.fallbacks = 0
+        self.log = logging.getLogger(self.__class__.__name__)
+
+    def register(self, router: Router, *prefixes: str) -> None:
+        for prefix in prefixes:
+            self._routers.setdefault(prefix, []).append(router)
+        if router not in self._skipping:
+            router.callback_query.outer_middleware(self._skip_tried(router))
+            self._skipping.add(router)
+
+    def stats(self) -> dict:
+        return {
+            "prefixes": len(self._routers),
+            "hits": self.hits,
+            "fallbacks": self.fallbacks,
+        }
+
+    async def _dispatch(self, callback: CallbackQuery, **data: Any) -> Any:
+        prefix = (callback.data or "").split(":", 1)[0]
+        tried: Tuple[Router, ...] = ()
+        _tried.set(None)
+        for router in self._routers.get(prefix, ()):
+            response = await router.propagate_event(
+                update_type="callback_query", event=callback, **data
+            )
+            if response is not UNHANDLED:
+                self.hits += 1
+                return response
+            tried += (router,)
+        self.fallbacks += 1
+        _tried.set((callback.id, tried))
+        return UNHANDLED
+
+    @staticmethod
+    def _skip_tried(router: Router):
+        async def skip_tried(
+            handler: Callable[[CallbackQuery, Dict[str, Any]], Awaitable[Any]],
+            event: CallbackQuery,
+            data: Dict[str, Any],
+        ) -> Any:
+            tried = _tried.get()
+            if tried is not None and tried[0] == event.id and router in tried[1]:
+                return UNHANDLED
+            return await handler(event, data)
+
+        return skip_tried
@@ -2,6 +2,8 @@
 Business card photo handling and form initialization.
 """
 
+import uuid
+
 from aiogram import F, Router
 from aiogram.filters import Command, StateFilter
 from aiogram.fsm.context import FSMContext
@@ -13,25 +15,24 @@ from aiogram.types import (
 )
 
 from infrastructure.some_api.api import MyApi  # Ensure this path is correct
-from tgbot.config import load_config  # Ensure this path is correct
+from tgbot.keyboards.inline import (
+    BACK_MARKUP,
+    CONFIRM_MARKUP,
+    SKIP_BUSINESS_CARD_MARKUP,
+)
+from tgbot.services.form_card import FormCard
+from tgbot.services.ocr_pipeline import OcrJob, OcrPipeline, ocr_contact_values
 from tgbot.states.lead_form import LeadForm  # Ensure this path is correct
 
 from .core import (
+    CALLBACK_STASH_KEY,
+    callback_token,
     generate_summary,
     is_valid_email,
     is_valid_phone,
-    truncate_for_callback,
+    stash_callback_values,
 )  # Relative import
-
-# Define callback data limits from navigation.py or centrally
-SUGGESTION_VALUE_MAX_BYTES = {
-    "name": 38,
-    "position": 30,
-    "phone": 35,
-    "email": 35,
-    "company": 30,
-    "company_address": 25,
-}
+from .steps import ANSWER_KEYS, FORM_STEPS, NEXT_STEP, STEPS, SUGGESTION_STEPS
 
 business_card_router = Router()
 
@@ -41,17 +42,11 @@ async def show_summary(message: Message, state: FSMContext):
     data = await state.get_data()
     summary_text = await generate_summary(data)
     final_text = f"{summary_text}\n\n<b>✅ Lead Information Complete</b>\n\nPlease review the information above and confirm if it's correct."
-    keyboard_rows = [
-        [InlineKeyboardButton(text="✅ Confirm", callback_data="lead:confirm")],
-        [InlineKeyboardButton(text="❌ Cancel", callback_data="lead:cancel")],
-        [InlineKeyboardButton(text="🔄 Restart", callback_data="lead:restart")],
-    ]
-    markup = InlineKeyboardMarkup(inline_keyboard=keyboard_rows)
-    await message.answer(final_text, parse_mode="HTML", reply_markup=markup)
+    await message.answer(final_text, parse_mode="HTML", reply_markup=CONFIRM_MARKUP)
 
 
 @business_card_router.message(Command(commands=["lead"]))
-async def cmd_lead(message: Message, state: FSMContext):
+async def cmd_lead(message: Message, state: FSMContext, api: MyApi):
     """
     Start the lead form collection process with exhibition selection.
 
@@ -59,58 +54,64 @@ async def cmd_lead(message: Message, state: FSMContext):
     selecting the exhibition, followed by an optional business card scan.
     """
     await state.clear()
-    await state.update_data(ocr_processed=False, extracted_data={})
+    # draft_id identifies this lead draft (used for the submission idempotency key)
+    await state.update_data(
+        ocr_processed=False, extracted_data={}, draft_id=uuid.uuid4().hex
+    )
 
     # Load exhibitions from API
-    config = load_config()
-
     try:
-        async with MyApi(config=config) as api:
-            status, response = await api.get_exhibitions()
-
-            if status == 200 and "results" in response and response["results"]:
-                # Create keyboard with exhibition options
-                keyboard_rows = []
-
-                for exhibition in response["results"]:
-                    exhibition_id = exhibition["id"]
-                    exhibition_name = exhibition["name"]
-                    keyboard_rows.append(
-                        [
-                            InlineKeyboardButton(
-                                text=exhibition_name,
-                                callback_data=f"exhibition:{exhibition_id}:{exhibition_name}",
-                            )
-                        ]
-                    )
-
-                # Add back button
+        status, response = await api.get_exhibitions()
+
+        if status == 200 and "results" in response and response["results"]:
+            # Create keyboard with exhibition options
+            keyboard_rows = []
+            # Names stay in the draft; the buttons only carry the exhibition id
+            exhibition_names = {}
+
+            for exhibition in response["results"]:
+                exhibition_id = str(exhibition["id"])
+                exhibition_name = exhibition["name"]
+                exhibition_names[exhibition_id] = exhibition_name
                 keyboard_rows.append(
-                    [InlineKeyboardButton(text="⬅️ Cancel", callback_data="lead:cancel")]
+                    [
+                        InlineKeyboardButton(
+                            text=exhibition_name,
+                            callback_data=f"exhibition:{exhibition_id}",
+                        )
+                    ]
                 )
 
-                markup = InlineKeyboardMarkup(inline_keyboard=keyboard_rows)
+            # Add back button
+            keyboard_rows.append(
+                [InlineKeyboardButton(text="⬅️ Cancel", callback_data="lead:cancel")]
+            )
+
+            markup = InlineKeyboardMarkup(inline_keyboard=keyboard_rows)
 
-                instructions = """
+            instructions = """
 📋 <b>Lead Information Form</b>
 
 Let's start by selecting the exhibition where you met this lead.
 
 <b>Step 1/17:</b> Please select the exhibition from the list below.
-                """
+            """
 
-                await message.answer(
-                    instructions,
-                    parse_mode="HTML",
-                    reply_markup=markup,
-                )
-                await state.set_state(LeadForm.exhibition_selection)
-            else:
-                # If API call fails or no exhibitions, show error and cancel form
-                await message.answer(
-                    "❌ <b>Error:</b> Unable to retrieve exhibitions. Please try again later.",
-                    parse_mode="HTML",
-                )
+            await state.update_data(
+                {CALLBACK_STASH_KEY: stash_callback_values({}, exhibition_names)}
+            )
+            await message.answer(
+                instructions,
+                parse_mode="HTML",
+                reply_markup=markup,
+            )
+            await state.set_state(LeadForm.exhibition_selection)
+        else:
+            # If API call fails or no exhibitions, show error and cancel form
+            await message.answer(
+                "❌ <b>Error:</b> Unable to retrieve exhibitions. Please try again later.",
+                parse_mode="HTML",
+            )
     except Exception as e:
         # Handle any exceptions
         await message.answer(
@@ -127,25 +128,16 @@ async def exhibition_selected(callback: CallbackQuery, state: FSMContext):
     """
     await callback.answer()
 
-    # Extract exhibition ID and name from callback data
-    # Format: "exhibition:id:name"
-    parts = callback.data.split(":")
-    if len(parts) >= 3:
-        exhibition_id = parts[1]
-        exhibition_name = ":".join(parts[2:])  # Handle names with colons
+    # Format: "exhibition:id"; the name was stashed when the list was sent
+    exhibition_id = callback.data.split(":", 1)[1]
+    data = await state.get_data()
+    exhibition_name = (data.get(CALLBACK_STASH_KEY) or {}).get(exhibition_id)
+    if exhibition_name is not None:
 
         # Save exhibition data to state
         await state.update_data(exhibition_id=exhibition_id, exhibition=exhibition_name)
 
-        # Create inline keyboard with Skip button for business card
-        keyboard = [
-            [
-                InlineKeyboardButton(
-                    text="⏩ Skip Business Card", callback_data="business_card:skip"
-                )
-            ]
-        ]
-        markup = InlineKeyboardMarkup(inline_keyboard=keyboard)
+        markup = SKIP_BUSINESS_CARD_MARKUP
 
         instructions = f"""
 📋 <b>Lead Information Form</b>
@@ -178,9 +170,9 @@ Now, let's continue with the business card to automatically fill in contact deta
         )
         await state.set_state(LeadForm.business_card_photo)
     else:
-        # Handle invalid callback data
+        # Unknown id, or the list belongs to an earlier /lead
         await callback.message.edit_text(
-            "❌ <b>Error:</b> Invalid exhibition selection. Please try again.",
+            "❌ <b>Error:</b> Invalid exhibition selection. Please send /lead again.",
             parse_mode="HTML",
         )
 
@@ -189,29 +181,13 @@ Now, let's continue with the business card to automatically fill in contact deta
     StateFilter(LeadForm.business_card_photo),
     F.text.func(lambda text: text and text.lower() == "skip"),
 )
-async def skip_business_card_text(message: Message, state: FSMContext):
+async def skip_business_card_text(
+    message: Message, state: FSMContext, form_card: FormCard
+):
     """Skip the business card photo upload via text."""
     data = await state.get_data()
     # Check if it's an initial skip (no other data collected beyond OCR flags)
-    is_initial_skip = not any(
-        key in data
-        for key in [
-            "full_name",
-            "position",
-            "phone_number",
-            "email",
-            "company_name",
-            "company_address",
-            "sphere_of_activity",
-            "company_type",
-            "cargo",
-            "mode_of_transport",
-            "shipment_volume",
-            "selected_directions",
-            "comments",
-            "meeting_place",
-        ]
-    )
+    is_initial_skip = not any(key in data for key in ANSWER_KEYS)
 
     if is_initial_skip:
         await state.update_data(
@@ -220,35 +196,16 @@ async def skip_business_card_text(message: Message, state: FSMContext):
             business_card_skipped=True,
             extracted_data={},
         )
-        await message.answer(
-            "<b>Manual form filling selected.</b>\n\nLet's proceed with the form step by step.",
-            parse_mode="HTML",
-        )
-
-        # Prompt for full name (Step 2)
-        keyboard = [[InlineKeyboardButton(text="⬅️ Back", callback_data="lead:back")]]
-        # Check if there was a "full_name" from a previous attempt before skip, though unlikely here
-        extracted_data = data.get("extracted_data", {})
-        if data.get("ocr_processed") and extracted_data.get(
-            "full_name"
-        ):  # Should be false if initial skip
-            val = extracted_data.get("full_name")
-            safe_val = truncate_for_callback(val, SUGGESTION_VALUE_MAX_BYTES["name"])
-            keyboard.insert(
-                0,
-                [
-                    InlineKeyboardButton(
-                        text=f"Use: {val}",
-                        callback_data=f"use_suggestion:name:{safe_val}",
-                    )
-                ],
-            )
-
-        markup = InlineKeyboardMarkup(inline_keyboard=keyboard)
-        await message.answer(
+        # Prompt for full name; the OCR suggestion should not exist after an
+        # initial skip, but is offered if there is one
+        markup = STEPS[LeadForm.full_name.state].markup(data)
+        await form_card.show(
+            message,
+            state,
             "<b>Step 3/17:</b> What is the full name?",
-            parse_mode="HTML",
-            reply_markup=markup,
+            markup,
+            notice="<b>Manual form filling selected.</b>\n\n"
+            "Let's proceed with the form step by step.",
         )
         await state.set_state(LeadForm.full_name)
     else:  # Final skip (at the end of the form)
@@ -278,25 +235,7 @@ async def skip_business_card_button(callback: CallbackQuery, state: FSMContext):
         is_initial_skip = True
     else:
         # Otherwise use the normal data check for final states
-        is_initial_skip = not any(
-            key in data
-            for key in [
-                "full_name",
-                "position",
-                "phone_number",
-                "email",
-                "company_name",
-                "company_address",
-                "sphere_of_activity",
-                "company_type",
-                "cargo",
-                "mode_of_transport",
-                "shipment_volume",
-                "selected_directions",
-                "comments",
-                "meeting_place",
-            ]
-        )
+        is_initial_skip = not any(key in data for key in ANSWER_KEYS)
 
     await state.update_data(
         business_card_photo=None,
@@ -310,10 +249,7 @@ async def skip_business_card_button(callback: CallbackQuery, state: FSMContext):
 
     if is_initial_skip:
         # Go to the first form field (full name)
-        keyboard_rows = [
-            [InlineKeyboardButton(text="⬅️ Back", callback_data="lead:back")]
-        ]
-        markup = InlineKeyboardMarkup(inline_keyboard=keyboard_rows)
+        markup = BACK_MARKUP
         await callback.message.answer(
             "<b>Manual form filling selected.</b>\n\n"
             "<b>Step 3/17:</b> What is the full name?",
@@ -327,7 +263,7 @@ async def skip_business_card_button(callback: CallbackQuery, state: FSMContext):
 
 
 @business_card_router.message(StateFilter(LeadForm.business_card_photo), F.text)
-async def process_skip_text(message: Message, state: FSMContext):
+async def process_skip_text(message: Message, state: FSMContext, form_card: FormCard):
     """Handle text messages during business card photo state, including 'skip'."""
     # Check if the message is a variation of 'skip'
     if message.text.lower().strip() in ["skip", "skip card", "skip business card"]:
@@ -335,25 +271,7 @@ async def process_skip_text(message: Message, state: FSMContext):
         data = await state.get_data()
 
         # Check if it's an initial skip (no other data collected beyond OCR flags)
-        is_initial_skip = not any(
-            key in data
-            for key in [
-                "full_name",
-                "position",
-                "phone_number",
-                "email",
-                "company_name",
-                "company_address",
-                "sphere_of_activity",
-                "company_type",
-                "cargo",
-                "mode_of_transport",
-                "shipment_volume",
-                "selected_directions",
-                "comments",
-                "meeting_place",
-            ]
-        )
+        is_initial_skip = not any(key in data for key in ANSWER_KEYS)
 
         await state.update_data(
             business_card_photo=None,
@@ -364,15 +282,12 @@ async def process_skip_text(message: Message, state: FSMContext):
 
         if is_initial_skip:
             # Go to the first form field (full name)
-            keyboard_rows = [
-                [InlineKeyboardButton(text="⬅️ Back", callback_data="lead:back")]
-            ]
-            markup = InlineKeyboardMarkup(inline_keyboard=keyboard_rows)
-            await message.answer(
+            await form_card.show(
+                message,
+                state,
                 "<b>Manual form filling selected.</b>\n\n"
                 "<b>Step 3/17:</b> What is the full name?",
-                parse_mode="HTML",
-                reply_markup=markup,
+                BACK_MARKUP,
             )
             await state.set_state(LeadForm.full_name)
         else:
@@ -389,235 +304,114 @@ async def process_skip_text(message: Message, state: FSMContext):
 
 
 @business_card_router.message(StateFilter(LeadForm.business_card_photo), F.photo)
-async def process_business_card_photo(message: Message, state: FSMContext):
-    """Process the business card photo (can be at start or end of form)."""
-    processing_msg = await message.answer(
-        "<b>⏳ Processing business card...</b> This may take a moment.",
-        parse_mode="HTML",
-    )
-    photo_id = message.photo[-1].file_id
+async def process_business_card_photo(
+    message: Message, state: FSMContext, ocr_pipeline: OcrPipeline
+):
+    """
+    Process the business card photo (can be at start or end of form).
+
+    OCR runs in the background; the form moves on right away and the
+    extracted details are offered as suggestions once they arrive.
+    """
+    # The lead is submitted with the largest size; OCR gets the smallest size
+    # that is still sharp enough
+    card_file_id = message.photo[-1].file_id
+    card_file_unique_id = message.photo[-1].file_unique_id
+    photo = ocr_pipeline.ocr_image.choose(message.photo)
+    data = await state.get_data()
 
     # If this photo is submitted at the end, previous data exists.
     # If at the start, data is minimal.
     await state.update_data(
-        business_card_photo=photo_id, business_card_skipped=False
-    )  # Explicitly not skipped
-
-    config = load_config()
-    extracted_data_from_ocr = {}
-    ocr_success = False
-
-    try:
-        bot = message.bot
-        file = await bot.get_file(photo_id)
-        file_content = await bot.download_file(file.file_path)
-        async with MyApi(config=config) as api:
-            ocr_status, ocr_response = await api.business_card_photo_ocr(file_content)
-
-        if ocr_status == 200 and ocr_response and ocr_response.get("extracted_data"):
-            extracted_data_from_ocr = ocr_response.get("extracted_data", {})
-            ocr_success = True
-            await state.update_data(
-                extracted_data=extracted_data_from_ocr, ocr_processed=True
-            )
-
-    except Exception as e:
-        print(f"Error processing business card photo: {e}")
-        # No need to set ocr_processed to True here
-
-    await processing_msg.delete()
-
-    current_data = await state.get_data()
-    # Check if this is an initial upload (minimal other data fields present)
-    is_initial_upload = not any(
-        key in current_data
-        for key in [
-            "full_name",
-            "position",
-            "phone_number",
-            "email",
-            "company_name",
-            "company_address",  # etc.
-            "meeting_place",  # Meeting place is the last step before final business card prompt
-        ]
-        if key
-        not in [
-            "business_card_photo",
-            "ocr_processed",
-            "extracted_data",
-            "business_card_skipped",
-        ]
+        business_card_photo=card_file_id,
+        # Lets the outbox find the submitted size in the photo cache
+        business_card_photo_unique_id=card_file_unique_id,
+        business_card_skipped=False,  # Explicitly not skipped
+        ocr_pending=True,
+        ocr_processed=False,
+        extracted_data={},
     )
-
-    if not ocr_success or not extracted_data_from_ocr:
-        await message.answer(
-            "<b>⚠️ Could not extract information from the business card.</b>",
-            parse_mode="HTML",
+    position = ocr_pipeline.submit(
+        OcrJob(
+            key=state.key,
+            draft_id=data.get("draft_id"),
+            photo=photo,
+            original_size=message.photo[-1].file_size,
+            card_file_id=card_file_id,
         )
-        if is_initial_upload:
-            await message.answer(
-                "Let's fill in the form manually.\n\n<b>Step 3/17:</b> What is the full name?",
-                parse_mode="HTML",
-                reply_markup=InlineKeyboardMarkup(
-                    inline_keyboard=[
-                        [InlineKeyboardButton(text="⬅️ Back", callback_data="lead:back")]
-                    ]
-                ),
-            )
-            await state.set_state(LeadForm.full_name)
-        else:  # OCR failed at the end of the form
-            await show_summary(message, state)
-        return
-
-    # OCR Succeeded
-    extracted_fields_summary = []
-    if extracted_data_from_ocr.get("full_name"):
-        extracted_fields_summary.append(
-            f"📝 Name: {extracted_data_from_ocr['full_name']}"
-        )
-    if extracted_data_from_ocr.get("position"):
-        extracted_fields_summary.append(
-            f"🏢 Position: {extracted_data_from_ocr['position']}"
-        )
-    phone = extracted_data_from_ocr.get("phone") or extracted_data_from_ocr.get(
-        "phone_number"
     )
-    if phone:
-        extracted_fields_summary.append(f"📱 Phone: {phone}")
-    if extracted_data_from_ocr.get("email"):
-        extracted_fields_summary.append(f"📧 Email: {extracted_data_from_ocr['email']}")
-    if extracted_data_from_ocr.get("company_name"):
-        extracted_fields_summary.append(
-            f"🏭 Company: {extracted_data_from_ocr['company_name']}"
-        )
-    if extracted_data_from_ocr.get("company_address"):
-        extracted_fields_summary.append(
-            f"🏢 Address: {extracted_data_from_ocr['company_address']}"
-        )
+    if position is None:
+        await state.update_data(ocr_pending=False)
 
-    if is_initial_upload:
-        # Auto-fill valid data if initial upload
-        if extracted_data_from_ocr.get("full_name"):
-            await state.update_data(full_name=extracted_data_from_ocr.get("full_name"))
-        if extracted_data_from_ocr.get("position"):
-            await state.update_data(position=extracted_data_from_ocr.get("position"))
-        if phone:
-            await state.update_data(phone_number=phone)
-        if extracted_data_from_ocr.get("email"):
-            await state.update_data(email=extracted_data_from_ocr.get("email"))
-        if extracted_data_from_ocr.get("company_name"):
-            await state.update_data(
-                company_name=extracted_data_from_ocr.get("company_name")
-            )
-        if extracted_data_from_ocr.get("company_address"):
-            await state.update_data(
-                company_address=extracted_data_from_ocr.get("company_address")
-            )
+    # Check if this is an initial upload (no form answers yet)
+    is_initial_upload = not any(key in data for key in ANSWER_KEYS)
 
-        # Store all_fields_present for ocr:confirm logic
-        all_contact_fields_present = (
-            bool(extracted_data_from_ocr.get("full_name"))
-            and bool(extracted_data_from_ocr.get("position"))
-            and bool(phone)
-            and bool(extracted_data_from_ocr.get("email"))
-            and bool(extracted_data_from_ocr.get("company_name"))
-            and bool(extracted_data_from_ocr.get("company_address"))
+    if position is not None:
+        status_text = (
+            "<b>📸 Business card received.</b> Reading it in the background, "
+            "the extracted details will be suggested as you fill in the form."
+        )
+        if ocr_pipeline.is_busy(position):
+            status_text += f"\nYou are <b>#{position}</b> in the queue."
+    else:
+        status_text = (
+            "<b>⚠️ The business card cannot be read right now.</b> "
+            "The photo is saved, please fill in the details manually."
         )
-        await state.update_data(all_contact_fields_present=all_contact_fields_present)
 
-        ocr_summary_text = "\n".join(extracted_fields_summary)
-        keyboard = [
-            [
-                InlineKeyboardButton(
-                    text="✅ Confirm and Continue", callback_data="ocr:confirm"
-                )
-            ],
-            [
-                InlineKeyboardButton(
-                    text="✏️ Edit Step by Step", callback_data="ocr:step_by_step"
-                )
-            ],
-            [InlineKeyboardButton(text="⬅️ Back", callback_data="lead:back")],
-        ]
-        markup = InlineKeyboardMarkup(inline_keyboard=keyboard)
+    if is_initial_upload:
         await message.answer(
-            f"<b>✅ Information extracted:</b>\n\n{ocr_summary_text}\n\nPlease confirm or choose to edit.",
+            f"{status_text}\n\n<b>Step 3/17:</b> What is the full name?",
             parse_mode="HTML",
-            reply_markup=markup,
+            reply_markup=BACK_MARKUP,
         )
-        await state.set_state("ocr_confirmation")  # Transient state
+        await state.set_state(LeadForm.full_name)
     else:  # Business card uploaded at the end of the form
-        await message.answer(
-            f"<b>✅ Business card processed.</b> Extracted (for reference):\n"
-            + "\n".join(extracted_fields_summary),
-            parse_mode="HTML",
-        )
+        await message.answer(status_text, parse_mode="HTML")
         await show_summary(message, state)
 
 
+# Contact detail steps that OCR can fill, in form order
+OCR_FORM_STEPS = tuple(step for step in FORM_STEPS if step.suggestion)
+
+
 @business_card_router.callback_query(F.data == "ocr:confirm")
 async def ocr_confirm_cb(callback: CallbackQuery, state: FSMContext):
-    current_state = await state.get_state()
-    if current_state != "ocr_confirmation":
+    """Fill the contact fields the user has not entered yet with the OCR result."""
+    data = await state.get_data()
+    extracted_data = data.get("extracted_data") or {}
+    if not data.get("ocr_processed") or not extracted_data:
         await callback.answer("This action is not available right now.")
         return
 
-    await callback.answer("Data confirmed! Proceeding...")
+    # Never overwrite what the user already typed
+    filled = {
+        field: value
+        for field, value in ocr_contact_values(extracted_data).items()
+        if not data.get(field)
+    }
+    await state.update_data(**filled)
+    await callback.answer(f"Filled {len(filled)} empty field(s).")
     await callback.message.edit_reply_markup(reply_markup=None)  # Clear buttons
 
-    data = await state.get_data()
-    summary = await generate_summary(data)  # Summary with auto-filled data
-
-    # Determine next step based on what was auto-filled by OCR
-    # If all_contact_fields_present (name, pos, valid phone, valid email, company), go to sphere.
-    # Otherwise, go to the first non-filled/invalid field among these.
-
-    next_step_message = ""
-    next_fsm_state = None
+    current_state = await state.get_state()
+    contact_states = {step.state.state for step in OCR_FORM_STEPS}
+    if current_state not in contact_states | {"ocr_confirmation"}:
+        # The user is already past the contact details
+        if filled and current_state == LeadForm.business_card_photo.state:
+            await show_summary(callback.message, state)
+        return
 
-    # This logic matches the one in the original process_business_card_initial's ocr:confirm part
-    if data.get("all_contact_fields_present"):
-        next_step_message = (
-            f"{summary}\n\n<b>Step 9/17:</b> What is the company's sphere of activity?"
-        )
-        next_fsm_state = LeadForm.sphere_of_activity
-    elif not data.get("full_name"):
-        next_step_message = f"{summary}\n\n<b>Step 3/17:</b> What is the full name?"
-        next_fsm_state = LeadForm.full_name
-    elif not data.get("position"):
-        next_step_message = (
-            f"{summary}\n\n<b>Step 4/17:</b> What is the position in the company?"
-        )
-        next_fsm_state = LeadForm.position
-    elif not data.get(
-        "phone_number"
-    ):  # This implies extracted phone was invalid or not present
-        next_step_message = f"{summary}\n\n<b>Step 5/17:</b> What is the phone number (enter personal and office number using '/' between them)?"
-        next_fsm_state = LeadForm.phone_number
-    elif not data.get("email"):  # Implies extracted email was invalid or not present
-        next_step_message = f"{summary}\n\n<b>Step 6/17:</b> What is the email address?"
-        next_fsm_state = LeadForm.email
-    elif not data.get("company_name"):
-        next_step_message = f"{summary}\n\n<b>Step 7/17:</b> What is the company name?"
-        next_fsm_state = LeadForm.company_name
-    elif not data.get("company_address"):
-        next_step_message = f"{summary}\n\n<b>Step 8/17:</b> What is the company address?"
-        next_fsm_state = LeadForm.company_address
-    else:  # Should be caught by all_contact_fields_present, but as a fallback
-        next_step_message = (
-            f"{summary}\n\n<b>Step 9/17:</b> What is the company's sphere of activity?"
-        )
-        next_fsm_state = LeadForm.sphere_of_activity
+    data = await state.get_data()
 
-    reply_markup = InlineKeyboardMarkup(
-        inline_keyboard=[
-            [InlineKeyboardButton(text="⬅️ Back", callback_data="lead:back")]
-        ]
-    )
-    await callback.message.answer(
-        next_step_message, parse_mode="HTML", reply_markup=reply_markup
+    # Continue with the first contact field that is still empty
+    next_step = next(
+        (step for step in OCR_FORM_STEPS if not data.get(step.field)),
+        NEXT_STEP[OCR_FORM_STEPS[-1].state.state],
     )
-    await state.set_state(next_fsm_state)
+    prompt, reply_markup = await next_step.render(data)
+    await callback.message.answer(prompt, parse_mode="HTML", reply_markup=reply_markup)
+    await state.set_state(next_step.state)
 
 
 @business_card_router.callback_query(F.data == "ocr:step_by_step")
@@ -646,33 +440,11 @@ async def ocr_step_by_step_cb(callback: CallbackQuery, state: FSMContext):
         ocr_processed=ocr_was_processed_flag,  # Preserve
     )
 
-    current_summary = await generate_summary(
-        await state.get_data()
-    )  # Will be mostly empty
-
-    keyboard_rows = []
-    # Add suggestion for full_name if available from OCR
-    if ocr_was_processed_flag and extracted_ocr_data.get("full_name"):
-        val = extracted_ocr_data.get("full_name")
-        safe_val = truncate_for_callback(val, SUGGESTION_VALUE_MAX_BYTES["name"])
-        keyboard_rows.append(
-            [
-                InlineKeyboardButton(
-                    text=f"Use: {val}", callback_data=f"use_suggestion:name:{safe_val}"
-                )
-            ]
-        )
-    keyboard_rows.append(
-        [InlineKeyboardButton(text="⬅️ Back", callback_data="lead:back")]
-    )
-    markup = InlineKeyboardMarkup(inline_keyboard=keyboard_rows)
-
-    await callback.message.answer(
-        f"{current_summary}\n\n<b>Step 3/17:</b> What is the full name?",
-        parse_mode="HTML",
-        reply_markup=markup,
-    )
-    await state.set_state(LeadForm.full_name)
+    # The summary will be mostly empty; the OCR suggestion is offered for the name
+    full_name_step = STEPS[LeadForm.full_name.state]
+    prompt, markup = await full_name_step.render(await state.get_data())
+    await callback.message.answer(prompt, parse_mode="HTML", reply_markup=markup)
+    await state.set_state(full_name_step.state)
 
 
 @business_card_router.callback_query(
@@ -685,132 +457,34 @@ async def use_suggestion_cb(callback: CallbackQuery, state: FSMContext):
         return
 
     field_type = parts[1]
-    value_from_cb = parts[2]
+    token = parts[2]
+    step = SUGGESTION_STEPS.get(field_type)
+    if step is None:
+        await callback.message.answer(
+            f"Unknown field type for suggestion: {field_type}"
+        )
+        return
 
     data = await state.get_data()
-    extracted_data_state = data.get("extracted_data", {})
-    ocr_processed_state = data.get(
-        "ocr_processed", True
-    )  # Assume true if suggestion is used
-
-    actual_value_to_use = value_from_cb
-    if value_from_cb.endswith("...") and extracted_data_state.get(
-        field_type if field_type not in ["company", "company_address"] else (
-            "company_name" if field_type == "company" else "company_address"
+    # The callback carries a token of the OCR value; the value is in the draft
+    actual_value_to_use = step.extracted_value(data.get("extracted_data") or {})
+    if actual_value_to_use is None or callback_token(actual_value_to_use) != token:
+        await callback.answer(
+            "This suggestion is no longer available.", show_alert=True
         )
-    ):
-        if field_type == "name" and extracted_data_state.get("full_name"):
-            actual_value_to_use = extracted_data_state.get("full_name")
-        elif field_type == "position" and extracted_data_state.get("position"):
-            actual_value_to_use = extracted_data_state.get("position")
-        elif field_type == "phone" and (
-            extracted_data_state.get("phone")
-            or extracted_data_state.get("phone_number")
-        ):
-            actual_value_to_use = extracted_data_state.get(
-                "phone"
-            ) or extracted_data_state.get("phone_number")
-        elif field_type == "email" and extracted_data_state.get("email"):
-            actual_value_to_use = extracted_data_state.get("email")
-        elif field_type == "company" and extracted_data_state.get("company_name"):
-            actual_value_to_use = extracted_data_state.get("company_name")
-        elif field_type == "company_address" and extracted_data_state.get("company_address"):
-            actual_value_to_use = extracted_data_state.get("company_address")
+        return
 
     await callback.answer(
         f"{field_type.replace('_', ' ').title()} set to: {actual_value_to_use[:30]}..."
     )  # Show truncated in answer
 
-    # Update state and prepare for next step
-    updated_fields = {
-        "extracted_data": extracted_data_state,  # Preserve
-        "ocr_processed": ocr_processed_state,  # Preserve
-    }
-    next_prompt = ""
-    next_fsm_state = None
-    suggestion_for_next_step_field = None
-    suggestion_for_next_step_value_cb = None
-
-    if field_type == "name":
-        updated_fields["full_name"] = actual_value_to_use
-        next_prompt = "<b>Step 4/17:</b> What is your position in the company?"
-        next_fsm_state = LeadForm.position
-        if ocr_processed_state and extracted_data_state.get("position"):
-            suggestion_for_next_step_field = "position"
-            suggestion_for_next_step_value_cb = extracted_data_state.get("position")
-
-    elif field_type == "position":
-        updated_fields["position"] = actual_value_to_use
-        next_prompt = "<b>Step 5/17:</b> What is your phone number?"
-        next_fsm_state = LeadForm.phone_number
-        phone_val = extracted_data_state.get("phone") or extracted_data_state.get(
-            "phone_number"
-        )
-        if ocr_processed_state and phone_val:
-            suggestion_for_next_step_field = "phone"
-            suggestion_for_next_step_value_cb = phone_val
-
-    elif field_type == "phone":
-        updated_fields["phone_number"] = actual_value_to_use
-        next_prompt = "<b>Step 6/17:</b> What is your email address?"
-        next_fsm_state = LeadForm.email
-        if ocr_processed_state and extracted_data_state.get("email"):
-            suggestion_for_next_step_field = "email"
-            suggestion_for_next_step_value_cb = extracted_data_state.get("email")
-
-    elif field_type == "email":
-        updated_fields["email"] = actual_value_to_use
-        next_prompt = "<b>Step 7/17:</b> What is your company name?"
-        next_fsm_state = LeadForm.company_name
-        if ocr_processed_state and extracted_data_state.get("company_name"):
-            suggestion_for_next_step_field = "company"
-            suggestion_for_next_step_value_cb = extracted_data_state.get("company_name")
-
-    elif field_type == "company":
-        updated_fields["company_name"] = actual_value_to_use
-        next_prompt = "<b>Step 8/17:</b> What is the company address?"
-        next_fsm_state = LeadForm.company_address
-        if ocr_processed_state and extracted_data_state.get("company_address"):
-            suggestion_for_next_step_field = "company_address"
-            suggestion_for_next_step_value_cb = extracted_data_state.get("company_address")
-
-    elif field_type == "company_address":
-        updated_fields["company_address"] = actual_value_to_use
-        next_prompt = "<b>Step 9/17:</b> What is your company's sphere of activity?"
-        next_fsm_state = LeadForm.sphere_of_activity
-        # No typical OCR suggestion for sphere_of_activity
-
-    else:
-        await callback.message.answer(
-            f"Unknown field type for suggestion: {field_type}"
-        )
-        return
-
-    await state.update_data(**updated_fields)
-    new_data = await state.get_data()
-    summary_after_suggestion = await generate_summary(new_data)
-
-    next_step_keyboard_rows = []
-    if suggestion_for_next_step_field and suggestion_for_next_step_value_cb:
-        max_b = SUGGESTION_VALUE_MAX_BYTES.get(suggestion_for_next_step_field, 30)
-        safe_sugg_val = truncate_for_callback(suggestion_for_next_step_value_cb, max_b)
-        next_step_keyboard_rows.append(
-            [
-                InlineKeyboardButton(
-                    text=f"Use: {suggestion_for_next_step_value_cb}",
-                    callback_data=f"use_suggestion:{suggestion_for_next_step_field}:{safe_sugg_val}",
-                )
-            ]
-        )
-    next_step_keyboard_rows.append(
-        [InlineKeyboardButton(text="⬅️ Back", callback_data="lead:back")]
-    )
-    next_step_markup = InlineKeyboardMarkup(inline_keyboard=next_step_keyboard_rows)
+    new_data = await state.update_data({step.field: actual_value_to_use})
+    next_step = NEXT_STEP[step.state.state]
+    prompt, next_step_markup = await next_step.render(new_data)
 
     await callback.message.edit_text(  # Edit the message that had the suggestion button
-        f"{summary_after_suggestion}\n\n{next_prompt}",
+        prompt,
         parse_mode="HTML",
         reply_markup=next_step_markup,
     )
-    if next_fsm_state:
-        await state.set_state(next_fsm_state)
+    await state.set_state(next_step.state)
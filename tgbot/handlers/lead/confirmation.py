@@ -2,6 +2,8 @@
 Confirmation and submission handlers for the lead form.
 """
 
+import uuid
+
 from aiogram import F, Router
 from aiogram.fsm.context import FSMContext
 from aiogram.types import (
@@ -10,8 +12,8 @@ from aiogram.types import (
     InlineKeyboardMarkup,
 )  # Added IKM
 
-from infrastructure.some_api.api import MyApi  # Ensure this path is correct
-from tgbot.config import load_config  # Ensure this path is correct
+from infrastructure.some_api.api import MyApi
+from tgbot.services.lead_outbox import LeadOutbox
 from tgbot.states.lead_form import LeadForm  # Ensure this path is correct
 
 from .core import generate_summary  # Import generate_summary to show filled data
@@ -20,20 +22,18 @@ confirmation_router = Router()
 
 
 @confirmation_router.callback_query(F.data == "lead:confirm")
-async def confirm_lead(callback: CallbackQuery, state: FSMContext):
+async def confirm_lead(
+    callback: CallbackQuery, state: FSMContext, lead_outbox: LeadOutbox
+):
     # Get the summary of filled data
     data = await state.get_data()
-    summary_text = await generate_summary(data)
+    if not data:
+        # The draft was already submitted (e.g. the button was pressed twice)
+        await callback.answer("This lead has already been submitted.")
+        return
 
-    # Edit the existing message to show processing state
-    await callback.message.edit_text(
-        f"{summary_text}\n\n<b>⏳ Processing...</b>\n\nSubmitting your lead information. Please wait.",
-        parse_mode="HTML",
-        reply_markup=None,  # Remove any existing buttons
-    )
+    summary_text = await generate_summary(data)
 
-    data = await state.get_data()
-    config = load_config()
     lead_data_payload = {
         "telegram_id": str(callback.from_user.id),
         "category_id": data.get("exhibition_id"),
@@ -58,48 +58,43 @@ async def confirm_lead(callback: CallbackQuery, state: FSMContext):
         "importance": data.get("importance"),
     }
 
-    status_code = 500  # Default to error
-    api_response_msg = {"error": "Submission failed due to an unexpected issue."}
-
-    async with MyApi(config=config) as api:
-        try:
-            business_card_photo_id = data.get("business_card_photo")
-            photo_bytes = None
-            if business_card_photo_id:
-                try:
-                    bot_instance = callback.bot
-                    file_info = await bot_instance.get_file(business_card_photo_id)
-                    photo_bytes = await bot_instance.download_file(file_info.file_path)
-                except Exception as e_photo:
-                    print(f"Error downloading business card photo: {e_photo}")
-                    # Continue without the photo
-
-            status_code, api_response_msg = await api.create_lead(
-                lead_data_payload, photo_bytes
-            )
-
-        except Exception as e_submit:
-            print(f"Error submitting lead to API: {e_submit}")
-            api_response_msg = {"error": f"API submission error: {e_submit}"}
-
-    # Update the same message with result
-    if status_code in (200, 201):
-        await callback.message.edit_text(
-            f"{summary_text}\n\n<b>✅ Success!</b>\n\n"
-            "Thank you! The lead information has been submitted successfully.",
-            parse_mode="HTML",
+    # Drafts started before draft ids existed get a random one
+    draft_id = data.get("draft_id") or uuid.uuid4().hex
+
+    # Store the lead in the outbox; a background worker submits it to the API
+    # and edits this message with the final status.
+    try:
+        submission = await lead_outbox.submit(
+            idempotency_key=MyApi.lead_idempotency_key(
+                callback.from_user.id, draft_id
+            ),
+            telegram_id=callback.from_user.id,
+            chat_id=callback.message.chat.id,
+            message_id=callback.message.message_id,
+            payload=lead_data_payload,
+            summary=summary_text,
+            photo_file_id=data.get("business_card_photo"),
+            photo_file_unique_id=data.get("business_card_photo_unique_id"),
         )
-    else:
-        error_detail = api_response_msg.get("detail") or api_response_msg.get(
-            "error", "Unknown error"
-        )
-        await callback.message.edit_text(
-            f"{summary_text}\n\n<b>❌ Error!</b>\n\n"
-            "There was a problem submitting the lead information.\n\n"
-            f"<b>Error:</b> {error_detail}\n\n"
-            "Please try again or contact support if the issue persists.",
-            parse_mode="HTML",
+    except Exception as e_submit:
+        print(f"Error storing lead in the outbox: {e_submit}")
+        await callback.answer(
+            "Could not save the lead. Please try again.", show_alert=True
         )
+        return
+
+    if submission is None:
+        # A concurrent press of the same button already queued this draft
+        await callback.answer("This lead has already been submitted.")
+        return
+
+    await callback.message.edit_text(
+        f"{summary_text}\n\n<b>📨 Lead received!</b>\n\n"
+        "Your lead is being submitted in the background. "
+        "This message will be updated with the result.",
+        parse_mode="HTML",
+        reply_markup=None,  # Remove any existing buttons
+    )
 
     await state.clear()
     await callback.answer()
@@ -119,7 +114,9 @@ async def cancel_lead(callback: CallbackQuery, state: FSMContext):
 @confirmation_router.callback_query(F.data == "lead:restart")
 async def restart_lead_form(callback: CallbackQuery, state: FSMContext):
     await state.clear()
-    await state.update_data(ocr_processed=False, extracted_data={})  # Reset OCR flags
+    await state.update_data(
+        ocr_processed=False, extracted_data={}, draft_id=uuid.uuid4().hex
+    )  # Reset OCR flags and start a new draft
 
     # Send initial message for business card step (Option B from previous discussion)
     await callback.message.edit_reply_markup(
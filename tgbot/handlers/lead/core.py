@@ -1,190 +1,248 @@
+import hashlib
 import re
-from typing import List, Optional, Tuple
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Any, Dict, Optional, Tuple
 
-# Constants for choices
-COMPANY_TYPE_CHOICES: List[Tuple[str, str]] = [
-    ("importer_exporter", "Importer/Exporter"),
-    ("forwarder", "Forwarder"),
-    ("agent", "Agent"),
-]
+from aiogram.types import InlineKeyboardButton, InlineKeyboardMarkup
 
-MODE_OF_TRANSPORT_CHOICES: List[Tuple[str, str]] = [
-    ("wagons", "Wagons"),
-    ("containers", "Containers"),
-    ("lcl", "LCL"),
-    ("air", "Air"),
-    ("auto", "Auto"),
-]
+from tgbot.keyboards.inline import (
+    COMPANY_TYPE_CHOICES,
+    DIRECTIONS_DONE_BTN,
+    IMPORTANCE_CHOICES,
+    MODE_OF_TRANSPORT_CHOICES,
+    back_markup,
+)
+from tgbot.services.direction_catalog import DirectionCatalogVersion, direction_catalog
 
 
-def truncate_for_callback(text: str, max_bytes: int, suffix: str = "...") -> str:
+# Draft key of the values offered on buttons; callbacks only carry their token
+CALLBACK_STASH_KEY = "callback_stash"
+# Telegram shows at most 100 buttons on one keyboard
+CALLBACK_STASH_SIZE = 100
+
+
+def callback_token(value: str) -> str:
+    """A short, stable token standing in for ``value`` in callback data."""
+    return hashlib.blake2b(value.encode("utf-8"), digest_size=4).hexdigest()
+
+
+def stash_callback_values(data: dict, values: Dict[str, str]) -> Dict[str, str]:
+    """
+    The draft's callback stash with ``values`` (token -> full value) added.
+
+    The stash keeps the ``CALLBACK_STASH_SIZE`` most recently added tokens, so
+    it stays bounded however many keyboards the chat is shown. Store the
+    result under ``CALLBACK_STASH_KEY``.
     """
-    Truncates a string to fit a specific byte limit for Telegram callback data,
-    appending a suffix if truncation occurs.
+    stash = dict(data.get(CALLBACK_STASH_KEY) or {})
+    for token, value in values.items():
+        stash.pop(token, None)
+        stash[token] = value
+    for token in list(stash)[: max(0, len(stash) - CALLBACK_STASH_SIZE)]:
+        del stash[token]
+    return stash
+
+
+DIRECTIONS_PROMPT = (
+    "Please select the shipment directions (you can select multiple). "
+    "Type a few letters to filter the list."
+)
+# Directions shown per page of the shipment directions picker
+DIRECTIONS_PAGE_SIZE = 8
+# Longest filter kept in the draft (it is also shown on the clear button)
+DIRECTIONS_FILTER_MAX_LENGTH = 32
+
+
+def direction_picker_markup(
+    catalog: DirectionCatalogVersion,
+    mask: Optional[str],
+    page: int = 0,
+    prefix: str = "",
+) -> InlineKeyboardMarkup:
     """
-    encoded_suffix = suffix.encode("utf-8")
-    suffix_len = len(encoded_suffix)
-
-    encoded_text = text.encode("utf-8")
-    if len(encoded_text) <= max_bytes:
-        return text
-
-    # Adjust max_bytes to account for suffix if text needs truncation
-    # Ensure there's enough space for at least one character before the suffix
-    adjusted_max_bytes = max_bytes - suffix_len
-    if adjusted_max_bytes <= 0:  # Not enough space even for suffix + a character
-        # Force truncate to max_bytes if no space for suffix
-        # This might cut a multi-byte char, but it's a fallback.
-        return encoded_text[:max_bytes].decode("utf-8", "ignore")
-
-    truncated_bytes = bytearray()
-    current_bytes_len = 0
-    for char in text:
-        char_encoded = char.encode("utf-8")
-        char_len = len(char_encoded)
-        if current_bytes_len + char_len > adjusted_max_bytes:
-            break
-        truncated_bytes.extend(char_encoded)
-        current_bytes_len += char_len
-
-    # Check if anything was actually truncated to decide if suffix is needed
-    if len(truncated_bytes) < len(encoded_text):
-        return truncated_bytes.decode("utf-8", "ignore") + suffix
-    else:  # Should not happen if len(encoded_text) > max_bytes initially
-        return text
-
-
-async def get_previous_state(current_state: str) -> Optional[str]:
-    """Determine the previous state based on the current state.
-    Returns the name of the previous state in the form flow.
+    One page of the shipment directions picker.
+
+    ``mask`` is the draft's selection (see ``DirectionCatalogVersion.encode``)
+    and ``prefix`` the filter typed by the user. Buttons carry the position of
+    the direction in the catalog, so a toggle only needs to flip one bit.
     """
-    state_flow = [
-        "exhibition_selection",
-        "business_card_photo",
-        "full_name",
-        "position",
-        "phone_number",
-        "email",
-        "company_name",
-        "company_address",
-        "sphere_of_activity",
-        "company_type",
-        "cargo",
+    positions = catalog.search(prefix)
+    pages = max(1, -(-len(positions) // DIRECTIONS_PAGE_SIZE))
+    page = min(max(page, 0), pages - 1)
+    bits = int(mask or "0", 16)
+
+    rows = []
+    for i in positions[page * DIRECTIONS_PAGE_SIZE : (page + 1) * DIRECTIONS_PAGE_SIZE]:
+        name = catalog.directions[i][1]
+        rows.append(
+            [
+                InlineKeyboardButton(
+                    text=f"☑️ {name}" if bits >> i & 1 else name,
+                    callback_data=f"direction:{i}",
+                )
+            ]
+        )
+    if pages > 1:
+        rows.append(
+            [
+                InlineKeyboardButton(
+                    text="◀️", callback_data=f"directions:page:{(page - 1) % pages}"
+                ),
+                InlineKeyboardButton(
+                    text=f"{page + 1}/{pages}", callback_data=f"directions:page:{page}"
+                ),
+                InlineKeyboardButton(
+                    text="▶️", callback_data=f"directions:page:{(page + 1) % pages}"
+                ),
+            ]
+        )
+    if prefix:
+        rows.append(
+            [
+                InlineKeyboardButton(
+                    text=f"✖️ Clear filter “{prefix}”", callback_data="directions:filter:clear"
+                )
+            ]
+        )
+    selected = bin(bits).count("1")
+    rows.append(
+        [DIRECTIONS_DONE_BTN]
+        if not selected
+        else [InlineKeyboardButton(text=f"✅ Done ({selected})", callback_data="directions:done")]
+    )
+    return back_markup(rows)
+
+
+@dataclass(frozen=True)
+class SummaryField:
+    """One line of the lead summary: the draft key, its label and display names of choices."""
+
+    key: str
+    label: str
+    choices: Optional[Dict[str, str]] = None
+
+
+# Summary layout, in display order; directions and the business card follow
+SUMMARY_FIELDS: Tuple[SummaryField, ...] = (
+    SummaryField("exhibition", "🎪 <b>Exhibition:</b>"),
+    SummaryField("full_name", "📝 <b>Full Name:</b>"),
+    SummaryField("position", "🏢 <b>Position in the company:</b>"),
+    SummaryField("phone_number", "📱 <b>Phone number:</b>"),
+    SummaryField("email", "📧 <b>Email address:</b>"),
+    SummaryField("company_name", "🏭 <b>Company name:</b>"),
+    SummaryField("company_address", "🏢 <b>Company address:</b>"),
+    SummaryField("sphere_of_activity", "🔍 <b>Sphere of activity:</b>"),
+    SummaryField("company_type", "📊 <b>Company type:</b>", dict(COMPANY_TYPE_CHOICES)),
+    SummaryField("cargo", "📦 <b>Cargo:</b>"),
+    SummaryField(
         "mode_of_transport",
-        "shipment_volume",
-        "shipment_directions",
-        "comments",
-        "meeting_place",
-        "importance",
-    ]
-
-    # Special handling for transient states
-    if current_state == "ocr_confirmation":
-        return "business_card_photo"
-
-    try:
-        current_index = state_flow.index(current_state)
-        if current_index > 0:
-            return state_flow[current_index - 1]
-        else:
-            return None
-    except ValueError:
-        return None
+        "🚢 <b>Preferred mode of transport:</b>",
+        dict(MODE_OF_TRANSPORT_CHOICES),
+    ),
+    SummaryField("shipment_volume", "📏 <b>Monthly shipment volume:</b>"),
+    SummaryField("comments", "💬 <b>Comments:</b>"),
+    SummaryField("meeting_place", "🤝 <b>Meeting place:</b>"),
+    SummaryField("importance", "📌 <b>Lead importance:</b>", dict(IMPORTANCE_CHOICES)),
+)
 
+# The fields above plus shipment directions and the business card
+SUMMARY_TOTAL_FIELDS = len(SUMMARY_FIELDS) + 2
 
-async def generate_summary(data: dict) -> str:
-    """Generate a summary of the lead information collected so far.
-    Only shows fields that have been filled in.
+_SUMMARY_FIELDS_BY_KEY = {field.key: field for field in SUMMARY_FIELDS}
+
+
+def _field_line(field: SummaryField, value: Any) -> str:
+    display_value = field.choices.get(value, value) if field.choices else value
+    return f"{field.label} {display_value}\n"
+
+
+def summary_line(data: dict, key: str) -> str:
+    """The summary line of one draft field, empty while it has no value."""
+    value = data.get(key)
+    return _field_line(_SUMMARY_FIELDS_BY_KEY[key], value) if value else ""
+
+
+class SummaryRenderer:
     """
-    summary = "📋 <b>Lead Information Summary</b>\n\n"
-    total_fields = 17  # Updated to include exhibition, importance, and company_address
-    filled_fields = 0
-
-    # Define importance choices for display
-    IMPORTANCE_CHOICES = [
-        ("low", "Low"),
-        ("medium", "Medium"),
-        ("high", "High"),
-    ]
-
-    field_map = {
-        "exhibition": ("🎪 <b>Exhibition:</b>", None),
-        "full_name": ("📝 <b>Full Name:</b>", None),
-        "position": ("🏢 <b>Position in the company:</b>", None),
-        "phone_number": ("📱 <b>Phone number:</b>", None),
-        "email": ("📧 <b>Email address:</b>", None),
-        "company_name": ("🏭 <b>Company name:</b>", None),
-        "company_address": ("🏢 <b>Company address:</b>", None),
-        "sphere_of_activity": ("🔍 <b>Sphere of activity:</b>", None),
-        "company_type": ("📊 <b>Company type:</b>", COMPANY_TYPE_CHOICES),
-        "cargo": ("📦 <b>Cargo:</b>", None),
-        "mode_of_transport": (
-            "🚢 <b>Preferred mode of transport:</b>",
-            MODE_OF_TRANSPORT_CHOICES,
-        ),
-        "shipment_volume": ("📏 <b>Monthly shipment volume:</b>", None),
-        # shipment_directions is handled specially
-        "comments": ("💬 <b>Comments:</b>", None),
-        "meeting_place": ("🤝 <b>Meeting place:</b>", None),
-        "importance": ("📌 <b>Lead importance:</b>", IMPORTANCE_CHOICES),
-    }
-
-    for key, (label_prefix, choices) in field_map.items():
-        value = data.get(key)
-        if value:
-            display_value = value
-            if choices:
-                display_value = next(
-                    (label for val, label in choices if val == value), value
-                )
-            summary += f"{label_prefix} {display_value}\n"
-            filled_fields += 1
-
-    # Shipment directions (special handling)
-    directions_filled = False
-    if data.get("selected_directions") and data.get("available_directions"):
-        selected_directions_ids = data.get("selected_directions", set())
-        # Ensure selected_directions_ids is a set of strings for comparison
-        if isinstance(selected_directions_ids, list):
-            selected_directions_ids = {str(d_id) for d_id in selected_directions_ids}
-        else:  # If it's already a set, ensure elements are strings
-            selected_directions_ids = {str(d_id) for d_id in selected_directions_ids}
-
-        available_directions = data.get("available_directions", [])
-        direction_names = [
-            direction.get("name")
-            for direction in available_directions
-            if str(direction.get("id")) in selected_directions_ids
+    Renders the lead summary shown after every form step.
+
+    The layout and the progress bars are built once, so a render only formats
+    the lines of the filled fields. The directions line, which joins names
+    from the catalog, is cached by catalog version and selection because many
+    drafts pick the same directions.
+    """
+
+    def __init__(self, directions_cache_size: int = 1024) -> None:
+        self.directions_cache_size = directions_cache_size
+        self._progress = tuple(
+            self._render_progress(filled) for filled in range(SUMMARY_TOTAL_FIELDS + 1)
+        )
+        self._directions: "OrderedDict[tuple, str]" = OrderedDict()
+
+    def render(self, data: dict) -> str:
+        lines = [
+            _field_line(field, data[field.key])
+            for field in SUMMARY_FIELDS
+            if data.get(field.key)
         ]
-        if direction_names:
-            summary += f"🗺️ <b>Directions:</b> {', '.join(direction_names)}\n"
-            directions_filled = True
-            filled_fields += 1
-
-    # Business card handling
-    business_card_filled = bool(data.get("business_card_photo"))
-    if business_card_filled:
-        summary += "📸 <b>Business Card:</b> Uploaded\n"
-        filled_fields += 1
-
-    # Adjust filled_fields if business_card_photo was present but not counted by loop
-    # This logic for filled_fields can be simplified if business_card is always step 1.
-    # Let's assume total_fields = 14 includes it.
-
-    progress_percentage = (
-        int((filled_fields / total_fields) * 100) if total_fields > 0 else 0
-    )
+        selected = tuple(data.get("selected_directions") or ())
+        if selected:
+            catalog = direction_catalog.get(data.get("directions_version"))
+            lines.append(self._directions_line(catalog, selected))
+        if data.get("business_card_photo"):
+            lines.append("📸 <b>Business Card:</b> Uploaded\n")
+        return (
+            "📋 <b>Lead Information Summary</b>\n\n"
+            + "".join(lines)
+            + self._progress[len(lines)]
+        )
 
-    progress_bar = (
-        "\n\n<b>Progress:</b> ["
-        + "█" * (progress_percentage // 10)
-        + "░" * (10 - (progress_percentage // 10))
-        + f"] {progress_percentage}%\n"
-    )
-    progress_bar += f"<b>Completed:</b> {filled_fields}/{total_fields} fields"
-    summary += progress_bar
+    def _directions_line(
+        self, catalog: Optional[DirectionCatalogVersion], selected: Tuple[str, ...]
+    ) -> str:
+        if catalog is None:  # Catalog not loaded yet
+            return f"🗺️ <b>Directions:</b> {len(selected)} selected\n"
 
-    return summary
+        cache_key = (catalog.version, selected)
+        line = self._directions.get(cache_key)
+        if line is not None:
+            self._directions.move_to_end(cache_key)
+            return line
+
+        # Names come from the shared catalog index
+        names = [catalog.by_id[str(i)] for i in selected if str(i) in catalog.by_id]
+        if not names:
+            # The selection predates this catalog; not cached, a refresh may
+            # bring the draft's version back
+            return f"🗺️ <b>Directions:</b> {len(selected)} selected, no longer listed\n"
+
+        line = f"🗺️ <b>Directions:</b> {', '.join(names)}\n"
+        self._directions[cache_key] = line
+        if len(self._directions) > self.directions_cache_size:
+            self._directions.popitem(last=False)
+        return line
+
+    @staticmethod
+    def _render_progress(filled: int) -> str:
+        percentage = int(filled / SUMMARY_TOTAL_FIELDS * 100)
+        return (
+            "\n\n<b>Progress:</b> ["
+            + "█" * (percentage // 10)
+            + "░" * (10 - percentage // 10)
+            + f"] {percentage}%\n"
+            + f"<b>Completed:</b> {filled}/{SUMMARY_TOTAL_FIELDS} fields"
+        )
+
+
+summary_renderer = SummaryRenderer()
+
+
+async def generate_summary(data: dict) -> str:
+    """Generate a summary of the lead information collected so far.
+    Only shows fields that have been filled in.
+    """
+    return summary_renderer.render(data)
 
 
 def is_valid_email(email: str) -> bool:
@@ -2,668 +2,450 @@
 Form field handlers for processing user input for each field in the lead form.
 """
 
-from aiogram import F, Router
+from aiogram import F, Router, html
+from aiogram.exceptions import TelegramBadRequest
 from aiogram.filters import StateFilter
 from aiogram.fsm.context import FSMContext
-from aiogram.types import (
-    CallbackQuery,
-    InlineKeyboardButton,
-    InlineKeyboardMarkup,
-    Message,
-)
+from aiogram.types import CallbackQuery, Message
 
 from infrastructure.some_api.api import MyApi  # Ensure this path is correct
-from tgbot.config import load_config  # Ensure this path is correct
+from tgbot.keyboards.inline import (
+    CONFIRM_MARKUP,
+    RETRY_DIRECTIONS_MARKUP,
+    SKIP_BUSINESS_CARD_MARKUP,
+)
+from tgbot.services.direction_catalog import direction_catalog
+from tgbot.services.form_card import FormCard
 from tgbot.states.lead_form import LeadForm  # Ensure this path is correct
 
-from .business_card import show_summary  # Relative import
 from .core import (  # Relative import
-    COMPANY_TYPE_CHOICES,
-    MODE_OF_TRANSPORT_CHOICES,
+    DIRECTIONS_FILTER_MAX_LENGTH,
+    DIRECTIONS_PROMPT,
+    IMPORTANCE_CHOICES,
+    direction_picker_markup,
     generate_summary,
     is_empty_or_whitespace,
-    is_valid_email,
-    is_valid_phone,
-    truncate_for_callback,  # Import the new utility
+    summary_line,
+)
+from .steps import (
+    CHOICE_STEPS,
+    NEXT_STEP,
+    STEPS,
+    TEXT_STEPS,
+    FormStep,
+    StepFilter,
 )
 
 form_fields_router = Router()
 
-# Define callback data limits from navigation.py or centrally
-SUGGESTION_VALUE_MAX_BYTES = {
-    "name": 38,
-    "position": 30,
-    "phone": 35,
-    "email": 35,
-    "company": 30,
-    "company_address": 25,
-}
-
-
-async def _fetch_and_set_shipment_directions(message: Message, state: FSMContext):
+async def _fetch_and_set_shipment_directions(
+    message: Message, state: FSMContext, api: MyApi, form_card: FormCard
+):
     """Helper to fetch directions and set up the next step or error."""
     data = await state.get_data()
     summary = await generate_summary(data)
-    config = load_config()
-
-    async with MyApi(config=config) as api:
-        status, response = await api.get_shipment_directions()
-
-    if status != 200 or not response:
-        retry_keyboard = [
-            [
-                InlineKeyboardButton(
-                    text="🔄 Try Again", callback_data="retry_fetch_directions"
-                )
-            ],
-            [InlineKeyboardButton(text="⬅️ Back", callback_data="lead:back")],
-        ]
-        retry_markup = InlineKeyboardMarkup(inline_keyboard=retry_keyboard)
-        await message.answer(
-            f"{summary}\n\n❌ Unable to fetch shipment directions. Please try again later or go back.",
-            parse_mode="HTML",
-            reply_markup=retry_markup,
+
+    try:
+        catalog = await direction_catalog.refresh(api)
+    except Exception as e:
+        print(f"Error fetching shipment directions: {e}")
+        catalog = None
+
+    if catalog is None:
+        error = "❌ Unable to fetch shipment directions. Please try again later or go back."
+        await form_card.show(
+            message,
+            state,
+            f"{summary}\n\n{error}",
+            RETRY_DIRECTIONS_MARKUP,
+            compact=error,
         )
         # Stay in LeadForm.shipment_volume state for retry
         return False
 
-    directions_data = (
-        response.get("results") if isinstance(response, dict) else response
-    )
-    if not isinstance(directions_data, list) or not directions_data:
-        await message.answer(
-            f"{summary}\n\n❌ No shipment directions available. Please try again later.",
-            parse_mode="HTML",
-            reply_markup=InlineKeyboardMarkup(
-                inline_keyboard=[
-                    [InlineKeyboardButton(text="⬅️ Back", callback_data="lead:back")]
-                ]
-            ),
-        )
-        return False  # Stay in current state or allow back
-
-    await state.update_data(
-        available_directions=directions_data, selected_directions=set()
-    )
-
-    keyboard_rows = []
-    for direction in directions_data:
-        dir_id = direction.get("id")
-        dir_name = direction.get("name")
-        if dir_id and dir_name:
-            keyboard_rows.append(
-                [
-                    InlineKeyboardButton(
-                        text=dir_name, callback_data=f"direction:{dir_id}"
-                    )
-                ]
-            )
-
-    keyboard_rows.append(
-        [InlineKeyboardButton(text="✅ Done", callback_data="directions:done")]
-    )
-    keyboard_rows.append(
-        [InlineKeyboardButton(text="⬅️ Back", callback_data="lead:back")]
-    )
-    markup = InlineKeyboardMarkup(inline_keyboard=keyboard_rows)
-
-    await message.answer(
-        f"{summary}\n\n<b>Step 14/17:</b> Please select the shipment directions (you can select multiple):",
-        parse_mode="HTML",
-        reply_markup=markup,
-    )
-    await state.set_state(LeadForm.shipment_directions)
+    # Only the catalog version and a selection mask are stored in the draft,
+    # names live in the shared index
+    data = await state.update_data(
+        directions_version=catalog.version,
+        directions_mask="0",
+        directions_page=0,
+        directions_filter="",
+        selected_directions=[],
+    )
+
+    directions_step = STEPS[LeadForm.shipment_directions.state]
+    prompt, markup = await directions_step.render(data)
+    await form_card.show(
+        message,
+        state,
+        prompt,
+        markup,
+        compact=f"{summary_line(data, 'shipment_volume')}\n{directions_step.step_line}",
+    )
+    await state.set_state(directions_step.state)
     return True
 
 
-@form_fields_router.message(StateFilter(LeadForm.full_name))
-async def process_full_name(message: Message, state: FSMContext):
-    if is_empty_or_whitespace(message.text):
-        await message.answer(
-            "❌ <b>Error:</b> Name cannot be empty. Please enter your full name.",
-            parse_mode="HTML",
-        )
-        return
-    await state.update_data(full_name=message.text)
-    data = await state.get_data()
-    summary = await generate_summary(data)
-    extracted_data = data.get("extracted_data", {})
-    keyboard_rows = []
-    if data.get("ocr_processed") and extracted_data.get("position"):
-        val = extracted_data.get("position")
-        safe_val = truncate_for_callback(val, SUGGESTION_VALUE_MAX_BYTES["position"])
-        keyboard_rows.append(
-            [
-                InlineKeyboardButton(
-                    text=f"Use: {val}",
-                    callback_data=f"use_suggestion:position:{safe_val}",
-                )
-            ]
-        )
-    keyboard_rows.append(
-        [InlineKeyboardButton(text="⬅️ Back", callback_data="lead:back")]
-    )
-    markup = InlineKeyboardMarkup(inline_keyboard=keyboard_rows)
-    await message.answer(
-        f"{summary}\n\n<b>Step 4/17:</b> What is the position in the company?",
-        parse_mode="HTML",
-        reply_markup=markup,
-    )
-    await state.set_state(LeadForm.position)
-
-
-@form_fields_router.message(StateFilter(LeadForm.position))
-async def process_position(message: Message, state: FSMContext):
-    if is_empty_or_whitespace(message.text):  # Added validation
-        await message.answer(
-            "❌ <b>Error:</b> Position cannot be empty.", parse_mode="HTML"
-        )
-        return
-    await state.update_data(position=message.text)
-    data = await state.get_data()
-    summary = await generate_summary(data)
-    extracted_data = data.get("extracted_data", {})
-    keyboard_rows = []
-    phone_val = extracted_data.get("phone") or extracted_data.get("phone_number")
-    if data.get("ocr_processed") and phone_val:
-        safe_val = truncate_for_callback(phone_val, SUGGESTION_VALUE_MAX_BYTES["phone"])
-        keyboard_rows.append(
-            [
-                InlineKeyboardButton(
-                    text=f"Use: {phone_val}",
-                    callback_data=f"use_suggestion:phone:{safe_val}",
-                )
-            ]
+async def _draft_directions(data: dict, api: MyApi):
+    """
+    Return the catalog version the draft's selection mask refers to, and the mask.
+
+    Versions are content hashes, so after a restart an unchanged catalog is
+    indexed under the same version again. If the catalog has changed, the mask
+    can no longer be mapped: the picker starts over on the newest version from
+    the directions confirmed earlier (if any), dropping those that are gone.
+    """
+    version = data.get("directions_version")
+    catalog = direction_catalog.get_exact(version)
+    if catalog is None:
+        try:
+            catalog = await direction_catalog.refresh(api)
+        except Exception as e:
+            print(f"Error fetching shipment directions: {e}")
+            return None, "0"
+        if catalog is None:
+            return None, "0"
+        if catalog.version != version:
+            return catalog, catalog.encode(data.get("selected_directions") or [])
+    return catalog, data.get("directions_mask") or "0"
+
+
+async def _edit_direction_picker(
+    callback: CallbackQuery, catalog, mask: str, page: int, prefix: str
+):
+    """Re-render only the keyboard of the picker message."""
+    try:
+        await callback.message.edit_reply_markup(
+            reply_markup=direction_picker_markup(catalog, mask, page, prefix)
         )
-    keyboard_rows.append(
-        [InlineKeyboardButton(text="⬅️ Back", callback_data="lead:back")]
-    )
-    markup = InlineKeyboardMarkup(inline_keyboard=keyboard_rows)
-    await message.answer(
-        f"{summary}\n\n<b>Step 5/17:</b> What is the phone number (enter personal and office number using '/' between them)",
-        parse_mode="HTML",
-        reply_markup=markup,
-    )
-    await state.set_state(LeadForm.phone_number)
+    except TelegramBadRequest as e:
+        # The same page was rendered again (e.g. a double tap)
+        if "message is not modified" not in str(e):
+            raise
 
 
-@form_fields_router.message(StateFilter(LeadForm.phone_number))
-async def process_phone_number(message: Message, state: FSMContext):
+@form_fields_router.message(StepFilter(TEXT_STEPS))
+async def process_text_step(
+    message: Message, state: FSMContext, form_step: FormStep, form_card: FormCard
+):
+    """Store the answer of a plain text step and ask the next one."""
     if is_empty_or_whitespace(message.text):
-        await message.answer(
-            "❌ <b>Error:</b> Phone number cannot be empty.", parse_mode="HTML"
-        )
+        await message.answer(f"❌ <b>Error:</b> {form_step.empty_error}", parse_mode="HTML")
         return
-    if not is_valid_phone(message.text):
-        await message.answer(
-            "❌ <b>Error:</b> Invalid phone number format.", parse_mode="HTML"
-        )
+    if form_step.validator is not None and not form_step.validator(message.text):
+        await message.answer(f"❌ <b>Error:</b> {form_step.invalid_error}", parse_mode="HTML")
         return
-    await state.update_data(phone_number=message.text)
-    data = await state.get_data()
-    summary = await generate_summary(data)
-    extracted_data = data.get("extracted_data", {})
-    keyboard_rows = []
-    if data.get("ocr_processed") and extracted_data.get("email"):
-        val = extracted_data.get("email")
-        safe_val = truncate_for_callback(val, SUGGESTION_VALUE_MAX_BYTES["email"])
-        keyboard_rows.append(
-            [
-                InlineKeyboardButton(
-                    text=f"Use: {val}", callback_data=f"use_suggestion:email:{safe_val}"
-                )
-            ]
-        )
-    keyboard_rows.append(
-        [InlineKeyboardButton(text="Skip Email", callback_data="skip:email")]
-    )
-    keyboard_rows.append(
-        [InlineKeyboardButton(text="⬅️ Back", callback_data="lead:back")]
-    )
-    markup = InlineKeyboardMarkup(inline_keyboard=keyboard_rows)
-    await message.answer(
-        f"{summary}\n\n<b>Step 6/17:</b> What is the email address?",
-        parse_mode="HTML",
-        reply_markup=markup,
-    )
-    await state.set_state(LeadForm.email)
+    data = await state.update_data({form_step.field: message.text})
+    next_step = NEXT_STEP[form_step.state.state]
+    prompt, markup = await next_step.render(data)
+    await form_card.show(
+        message,
+        state,
+        prompt,
+        markup,
+        compact=f"{summary_line(data, form_step.field)}\n{next_step.step_line}",
+    )
+    await state.set_state(next_step.state)
+
+
+@form_fields_router.callback_query(StepFilter(CHOICE_STEPS))
+async def process_choice_step(
+    callback: CallbackQuery, state: FSMContext, form_step: FormStep, form_card: FormCard
+):
+    """Store the button picked on a choice step and ask the next one."""
+    value = callback.data.split(":", 1)[1]
+    data = await state.update_data({form_step.field: value})
+    label = form_step.choices.get(value, value)
+    next_step = NEXT_STEP[form_step.state.state]
+    prompt, markup = await next_step.render(data)
+    selected = f"{form_step.selected_text}: <b>{label}</b>"
+    await form_card.edit(
+        callback.message,
+        state,
+        f"{selected}\n\n{prompt}",
+        markup,
+        compact=f"{selected}\n\n{next_step.step_line}",
+    )
+    await state.set_state(next_step.state)
+    await callback.answer()
 
 
 @form_fields_router.callback_query(LeadForm.email, F.data == "skip:email")
-async def skip_email(callback: CallbackQuery, state: FSMContext):
+async def skip_email(callback: CallbackQuery, state: FSMContext, form_card: FormCard):
     # Set empty email and proceed to next step
-    await state.update_data(email="")
-    data = await state.get_data()
-    summary = await generate_summary(data)
-    extracted_data = data.get("extracted_data", {})
-    keyboard_rows = []
-    if data.get("ocr_processed") and extracted_data.get("company_name"):
-        val = extracted_data.get("company_name")
-        safe_val = truncate_for_callback(val, SUGGESTION_VALUE_MAX_BYTES["company"])
-        keyboard_rows.append(
-            [
-                InlineKeyboardButton(
-                    text=f"Use: {val}",
-                    callback_data=f"use_suggestion:company:{safe_val}",
-                )
-            ]
-        )
-    keyboard_rows.append(
-        [InlineKeyboardButton(text="⬅️ Back", callback_data="lead:back")]
-    )
-    markup = InlineKeyboardMarkup(inline_keyboard=keyboard_rows)
-    
-    await callback.message.edit_text(
-        f"Email skipped.\n\n{summary}\n\n<b>Step 7/17:</b> What is the company name?",
-        parse_mode="HTML",
-        reply_markup=markup,
-    )
-    await state.set_state(LeadForm.company_name)
+    data = await state.update_data(email="")
+    next_step = NEXT_STEP[LeadForm.email.state]
+    prompt, markup = await next_step.render(data)
+    await form_card.edit(
+        callback.message,
+        state,
+        f"Email skipped.\n\n{prompt}",
+        markup,
+        compact=f"Email skipped.\n\n{next_step.step_line}",
+    )
+    await state.set_state(next_step.state)
     await callback.answer()
 
 
-@form_fields_router.message(StateFilter(LeadForm.email))
-async def process_email(message: Message, state: FSMContext):
+@form_fields_router.message(StateFilter(LeadForm.shipment_volume))
+async def process_shipment_volume(
+    message: Message, state: FSMContext, api: MyApi, form_card: FormCard
+):
     if is_empty_or_whitespace(message.text):
         await message.answer(
-            "❌ <b>Error:</b> Email cannot be empty.", parse_mode="HTML"
-        )
-        return
-    if not is_valid_email(message.text):
-        await message.answer(
-            "❌ <b>Error:</b> Invalid email format.", parse_mode="HTML"
+            "❌ <b>Error:</b> Shipment volume cannot be empty.", parse_mode="HTML"
         )
         return
-    await state.update_data(email=message.text)
-    data = await state.get_data()
-    summary = await generate_summary(data)
-    extracted_data = data.get("extracted_data", {})
-    keyboard_rows = []
-    if data.get("ocr_processed") and extracted_data.get("company_name"):
-        val = extracted_data.get("company_name")
-        safe_val = truncate_for_callback(val, SUGGESTION_VALUE_MAX_BYTES["company"])
-        keyboard_rows.append(
-            [
-                InlineKeyboardButton(
-                    text=f"Use: {val}",
-                    callback_data=f"use_suggestion:company:{safe_val}",
-                )
-            ]
-        )
-    keyboard_rows.append(
-        [InlineKeyboardButton(text="⬅️ Back", callback_data="lead:back")]
-    )
-    markup = InlineKeyboardMarkup(inline_keyboard=keyboard_rows)
-    await message.answer(
-        f"{summary}\n\n<b>Step 7/17:</b> What is the company name?",
-        parse_mode="HTML",
-        reply_markup=markup,
-    )
-    await state.set_state(LeadForm.company_name)
+    await state.update_data(shipment_volume=message.text)
+    await _fetch_and_set_shipment_directions(message, state, api, form_card)
 
 
-@form_fields_router.message(StateFilter(LeadForm.company_name))
-async def process_company_name(message: Message, state: FSMContext):
-    if is_empty_or_whitespace(message.text):
-        await message.answer(
-            "❌ <b>Error:</b> Company name cannot be empty.", parse_mode="HTML"
+@form_fields_router.callback_query(
+    LeadForm.shipment_volume, F.data == "retry_fetch_directions"
+)
+async def retry_fetch_shipment_directions_cb(
+    callback: CallbackQuery, state: FSMContext, api: MyApi, form_card: FormCard
+):
+    await callback.answer("Retrying to fetch shipment directions...")
+    # Edit the "retry" message to indicate processing, then call the helper
+    try:
+        await callback.message.edit_text(
+            f"{await generate_summary(await state.get_data())}\n\n⏳ Retrying to fetch shipment directions...",
+            parse_mode="HTML",
+            reply_markup=None,
         )
-        return
-    await state.update_data(company_name=message.text)
-    data = await state.get_data()
-    summary = await generate_summary(data)
-    markup = InlineKeyboardMarkup(
-        inline_keyboard=[
-            [InlineKeyboardButton(text="⬅️ Back", callback_data="lead:back")]
-        ]
-    )
-    await message.answer(
-        f"{summary}\n\n<b>Step 8/17:</b> What is the company address?",
-        parse_mode="HTML",
-        reply_markup=markup,
-    )
-    await state.set_state(LeadForm.company_address)
+    except Exception:  # If edit fails, proceed anyway
+        pass
+    await _fetch_and_set_shipment_directions(callback.message, state, api, form_card)
 
 
-@form_fields_router.message(StateFilter(LeadForm.company_address))
-async def process_company_address(message: Message, state: FSMContext):
-    if is_empty_or_whitespace(message.text):
-        await message.answer(
-            "❌ <b>Error:</b> Company address cannot be empty.", parse_mode="HTML"
+@form_fields_router.callback_query(
+    LeadForm.shipment_directions, F.data.startswith("direction:")
+)
+async def process_direction_selection(
+    callback: CallbackQuery, state: FSMContext, api: MyApi
+):
+    data = await state.get_data()
+    catalog, mask = await _draft_directions(data, api)
+    if catalog is None:
+        await callback.answer(
+            "Unable to fetch shipment directions. Please try again later.",
+            show_alert=True,
         )
         return
-    await state.update_data(company_address=message.text)
-    data = await state.get_data()
-    summary = await generate_summary(data)
-    markup = InlineKeyboardMarkup(
-        inline_keyboard=[
-            [InlineKeyboardButton(text="⬅️ Back", callback_data="lead:back")]
-        ]
-    )
-    await message.answer(
-        f"{summary}\n\n<b>Step 9/17:</b> What is the company's sphere of activity?",
-        parse_mode="HTML",
-        reply_markup=markup,
-    )
-    await state.set_state(LeadForm.sphere_of_activity)
 
-
-@form_fields_router.message(StateFilter(LeadForm.sphere_of_activity))
-async def process_sphere_of_activity(message: Message, state: FSMContext):
-    if is_empty_or_whitespace(message.text):  # Added validation
-        await message.answer(
-            "❌ <b>Error:</b> Sphere of activity cannot be empty.", parse_mode="HTML"
+    position = int(callback.data.split(":")[1])
+    if catalog.version != data.get("directions_version"):
+        # The keyboard was built for a catalog version that is gone
+        await state.update_data(
+            directions_version=catalog.version,
+            directions_mask=mask,
+            directions_page=0,
+            directions_filter="",
         )
-        return
-    await state.update_data(sphere_of_activity=message.text)
-    data = await state.get_data()
-    summary = await generate_summary(data)
-    keyboard_rows = []
-    for value, label in COMPANY_TYPE_CHOICES:
-        keyboard_rows.append(
-            [InlineKeyboardButton(text=label, callback_data=f"company_type:{value}")]
+        await _edit_direction_picker(callback, catalog, mask, 0, "")
+        await callback.answer(
+            "The list of directions has been updated, please check your selection.",
+            show_alert=True,
         )
-    keyboard_rows.append(
-        [InlineKeyboardButton(text="⬅️ Back", callback_data="lead:back")]
+        return
+    if position >= len(catalog.directions):
+        await callback.answer()
+        return
+
+    mask, selected = catalog.toggle(mask, position)
+    await state.update_data(directions_mask=mask)
+    await _edit_direction_picker(
+        callback,
+        catalog,
+        mask,
+        data.get("directions_page", 0),
+        data.get("directions_filter", ""),
     )
-    markup = InlineKeyboardMarkup(inline_keyboard=keyboard_rows)
-    await message.answer(
-        f"{summary}\n\n<b>Step 10/17:</b> What is the company type?",
-        parse_mode="HTML",
-        reply_markup=markup,
+    action_text = "added to" if selected else "removed from"
+    await callback.answer(
+        f"{catalog.directions[position][1]} {action_text} your selected directions."
     )
-    await state.set_state(LeadForm.company_type)
 
 
 @form_fields_router.callback_query(
-    LeadForm.company_type, F.data.startswith("company_type:")
+    LeadForm.shipment_directions, F.data.startswith("directions:page:")
 )
-async def process_company_type(callback: CallbackQuery, state: FSMContext):
-    company_type_val = callback.data.split(":")[1]
-    await state.update_data(company_type=company_type_val)
+async def process_directions_page(
+    callback: CallbackQuery, state: FSMContext, api: MyApi
+):
+    page = int(callback.data.split(":")[2])
     data = await state.get_data()
-    summary = await generate_summary(data)
-    company_type_label = next(
-        (label for value, label in COMPANY_TYPE_CHOICES if value == company_type_val),
-        company_type_val,
-    )
-
-    next_step_markup = InlineKeyboardMarkup(
-        inline_keyboard=[
-            [InlineKeyboardButton(text="⬅️ Back", callback_data="lead:back")]
-        ]
-    )
-
-    await callback.message.edit_text(
-        f"Selected company type: <b>{company_type_label}</b>\n\n{summary}\n\n<b>Step 11/17:</b> What type of cargo does company handle?",
-        parse_mode="HTML",
-        reply_markup=next_step_markup,
-    )
-    await state.set_state(LeadForm.cargo)
-    await callback.answer()
-
-
-@form_fields_router.message(StateFilter(LeadForm.cargo))
-async def process_cargo(message: Message, state: FSMContext):
-    if is_empty_or_whitespace(message.text):
-        await message.answer(
-            "❌ <b>Error:</b> Cargo information cannot be empty.", parse_mode="HTML"
-        )
+    if page == data.get("directions_page", 0):
+        # The page counter button, or the only page
+        await callback.answer()
         return
-    await state.update_data(cargo=message.text)
-    data = await state.get_data()
-    summary = await generate_summary(data)
-    keyboard_rows = []
-    for value, label in MODE_OF_TRANSPORT_CHOICES:
-        keyboard_rows.append(
-            [InlineKeyboardButton(text=label, callback_data=f"transport:{value}")]
+    catalog, mask = await _draft_directions(data, api)
+    if catalog is None:
+        await callback.answer(
+            "Unable to fetch shipment directions. Please try again later.",
+            show_alert=True,
         )
-    keyboard_rows.append(
-        [InlineKeyboardButton(text="⬅️ Back", callback_data="lead:back")]
+        return
+    await state.update_data(
+        directions_version=catalog.version, directions_mask=mask, directions_page=page
     )
-    markup = InlineKeyboardMarkup(inline_keyboard=keyboard_rows)
-    await message.answer(
-        f"{summary}\n\n<b>Step 12/17:</b> What is the preferred mode of transport?",
-        parse_mode="HTML",
-        reply_markup=markup,
+    await _edit_direction_picker(
+        callback, catalog, mask, page, data.get("directions_filter", "")
     )
-    await state.set_state(LeadForm.mode_of_transport)
+    await callback.answer()
 
 
 @form_fields_router.callback_query(
-    LeadForm.mode_of_transport, F.data.startswith("transport:")
+    LeadForm.shipment_directions, F.data == "directions:filter:clear"
 )
-async def process_mode_of_transport(callback: CallbackQuery, state: FSMContext):
-    mode_val = callback.data.split(":")[1]
-    await state.update_data(mode_of_transport=mode_val)
+async def process_directions_filter_clear(
+    callback: CallbackQuery, state: FSMContext, api: MyApi
+):
     data = await state.get_data()
-    summary = await generate_summary(data)
-    mode_label = next(
-        (label for value, label in MODE_OF_TRANSPORT_CHOICES if value == mode_val),
-        mode_val,
-    )
-
-    next_step_markup = InlineKeyboardMarkup(
-        inline_keyboard=[
-            [InlineKeyboardButton(text="⬅️ Back", callback_data="lead:back")]
-        ]
-    )
-
-    await callback.message.edit_text(
-        f"Selected transport mode: <b>{mode_label}</b>\n\n{summary}\n\n<b>Step 13/17:</b> What is the monthly shipment volume?",
-        parse_mode="HTML",
-        reply_markup=next_step_markup,
-    )
-    await state.set_state(LeadForm.shipment_volume)
-    await callback.answer()
-
-
-@form_fields_router.message(StateFilter(LeadForm.shipment_volume))
-async def process_shipment_volume(message: Message, state: FSMContext):
-    if is_empty_or_whitespace(message.text):
-        await message.answer(
-            "❌ <b>Error:</b> Shipment volume cannot be empty.", parse_mode="HTML"
+    catalog, mask = await _draft_directions(data, api)
+    if catalog is None:
+        await callback.answer(
+            "Unable to fetch shipment directions. Please try again later.",
+            show_alert=True,
         )
         return
-    await state.update_data(shipment_volume=message.text)
-    await _fetch_and_set_shipment_directions(message, state)
+    await state.update_data(
+        directions_version=catalog.version,
+        directions_mask=mask,
+        directions_page=0,
+        directions_filter="",
+    )
+    await _edit_direction_picker(callback, catalog, mask, 0, "")
+    await callback.answer("Showing all directions.")
 
 
-@form_fields_router.callback_query(
-    LeadForm.shipment_volume, F.data == "retry_fetch_directions"
+@form_fields_router.message(
+    StateFilter(LeadForm.shipment_directions), F.text, F.text.lower() != "back"
 )
-async def retry_fetch_shipment_directions_cb(
-    callback: CallbackQuery, state: FSMContext
+async def process_directions_filter(
+    message: Message, state: FSMContext, api: MyApi, form_card: FormCard
 ):
-    await callback.answer("Retrying to fetch shipment directions...")
-    # Edit the "retry" message to indicate processing, then call the helper
-    try:
-        await callback.message.edit_text(
-            f"{await generate_summary(await state.get_data())}\n\n⏳ Retrying to fetch shipment directions...",
+    """Typed text filters the picker to the directions with a word starting with it."""
+    prefix = " ".join(message.text.split())[:DIRECTIONS_FILTER_MAX_LENGTH]
+    data = await state.get_data()
+    catalog, mask = await _draft_directions(data, api)
+    if catalog is None:
+        await message.answer(
+            "❌ Unable to fetch shipment directions. Please try again later.",
             parse_mode="HTML",
-            reply_markup=None,
         )
-    except Exception:  # If edit fails, proceed anyway
-        pass
-    await _fetch_and_set_shipment_directions(callback.message, state)
-
-
-@form_fields_router.callback_query(
-    LeadForm.shipment_directions, F.data.startswith("direction:")
-)
-async def process_direction_selection(callback: CallbackQuery, state: FSMContext):
-    direction_id_selected = callback.data.split(":")[1]
-    data = await state.get_data()
-    current_selected_ids = data.get("selected_directions", set())
-    if isinstance(current_selected_ids, list):  # Ensure it's a set
-        current_selected_ids = set(current_selected_ids)
-
-    if direction_id_selected in current_selected_ids:
-        current_selected_ids.remove(direction_id_selected)
-        action_text = "removed from"
-    else:
-        current_selected_ids.add(direction_id_selected)
-        action_text = "added to"
+        return
+    if not catalog.search(prefix):
+        await message.answer(
+            f"No directions match <b>{html.quote(prefix)}</b>. Try another name.",
+            parse_mode="HTML",
+        )
+        return
 
     await state.update_data(
-        selected_directions=list(current_selected_ids)
-    )  # Store as list for JSON
-
-    updated_data = await state.get_data()  # Get data again after update
-    summary = await generate_summary(updated_data)
-    available_directions = updated_data.get("available_directions", [])
-
-    keyboard_rows = []
-    selected_direction_name = f"Direction {direction_id_selected}"  # Fallback name
-    for direction in available_directions:
-        dir_id_str = str(direction.get("id"))
-        dir_name = direction.get("name")
-        if dir_id_str and dir_name:
-            if dir_id_str == direction_id_selected:
-                selected_direction_name = dir_name
-            prefix = "☑️ " if dir_id_str in current_selected_ids else ""
-            keyboard_rows.append(
-                [
-                    InlineKeyboardButton(
-                        text=f"{prefix}{dir_name}",
-                        callback_data=f"direction:{dir_id_str}",
-                    )
-                ]
-            )
-
-    keyboard_rows.append(
-        [InlineKeyboardButton(text="✅ Done", callback_data="directions:done")]
-    )
-    keyboard_rows.append(
-        [InlineKeyboardButton(text="⬅️ Back", callback_data="lead:back")]
-    )
-    markup = InlineKeyboardMarkup(inline_keyboard=keyboard_rows)
-
-    status_message = (
-        f"<b>{selected_direction_name}</b> {action_text} your selected directions."
+        directions_version=catalog.version,
+        directions_mask=mask,
+        directions_page=0,
+        directions_filter=prefix,
     )
-    await callback.message.edit_text(
-        f"{status_message}\n\n{summary}\n\n<b>Step 14/17:</b> Please select the shipment directions (you can select multiple):",
-        parse_mode="HTML",
-        reply_markup=markup,
+    await form_card.show(
+        message,
+        state,
+        f"<b>Step 14/17:</b> {DIRECTIONS_PROMPT}\n\n"
+        f"Directions matching <b>{html.quote(prefix)}</b>:",
+        direction_picker_markup(catalog, mask, 0, prefix),
     )
-    await callback.answer()
 
 
 @form_fields_router.callback_query(
     LeadForm.shipment_directions, F.data == "directions:done"
 )
-async def process_directions_done(callback: CallbackQuery, state: FSMContext):
+async def process_directions_done(
+    callback: CallbackQuery, state: FSMContext, api: MyApi, form_card: FormCard
+):
     data = await state.get_data()
-    selected_ids = data.get("selected_directions", set())
+    catalog, mask = await _draft_directions(data, api)
+    selected_ids = catalog.decode(mask) if catalog is not None else []
     if not selected_ids:
         await callback.answer(
             "Please select at least one shipment direction.", show_alert=True
         )
         return
 
-    summary = await generate_summary(data)
-    available_directions = data.get("available_directions", [])
-    selected_names = [
-        direction.get("name")
-        for direction in available_directions
-        if str(direction.get("id"))
-        in selected_ids  # selected_ids is now a set of strings
-    ]
-
-    next_step_markup = InlineKeyboardMarkup(
-        inline_keyboard=[
-            [InlineKeyboardButton(text="⬅️ Back", callback_data="lead:back")]
-        ]
+    # The summary and the submission work with the confirmed ids
+    data = await state.update_data(
+        directions_version=catalog.version, selected_directions=selected_ids
     )
+    selected_names = [catalog.by_id[d_id] for d_id in selected_ids]
 
+    next_step = NEXT_STEP[LeadForm.shipment_directions.state]
+    prompt, markup = await next_step.render(data)
+    selected = f"Selected directions: <b>{', '.join(selected_names)}</b>"
     # Edit the current message
-    await callback.message.edit_text(
-        f"Selected directions: <b>{', '.join(selected_names)}</b>\n\n{summary}\n\n<b>Step 15/17:</b> Do you have any additional comments? ",
-        parse_mode="HTML",
-        reply_markup=next_step_markup,  # Keyboard for the next step
-    )
-    await state.set_state(LeadForm.comments)
+    await form_card.edit(
+        callback.message,
+        state,
+        f"{selected}\n\n{prompt}",
+        markup,  # Keyboard for the next step
+        compact=f"{selected}\n\n{next_step.step_line}",
+    )
+    await state.set_state(next_step.state)
     await callback.answer()
 
 
 @form_fields_router.message(StateFilter(LeadForm.comments))
-async def process_comments(message: Message, state: FSMContext):
+async def process_comments(message: Message, state: FSMContext, form_card: FormCard):
     comment_text = (
         None if message.text and message.text.lower() == "none" else message.text
     )
-    await state.update_data(comments=comment_text)
-    data = await state.get_data()
-    summary = await generate_summary(data)
+    data = await state.update_data(comments=comment_text)
     confirmation_msg = (
         f"Comments saved: <b>{comment_text}</b>"
         if comment_text
         else "No comments added."
     )
 
-    keyboard_rows = [
-        [
-            InlineKeyboardButton(
-                text="Our Booth", callback_data="meeting_place:our_booth"
-            )
-        ],
-        [
-            InlineKeyboardButton(
-                text="Partner Booth", callback_data="meeting_place:partner_booth"
-            )
-        ],
-        [InlineKeyboardButton(text="⬅️ Back", callback_data="lead:back")],
-    ]
-    markup = InlineKeyboardMarkup(inline_keyboard=keyboard_rows)
-
-    await message.answer(
-        f"{confirmation_msg}\n\n{summary}\n\n<b>Step 16/17:</b> Where did the meeting take place?",
-        parse_mode="HTML",
-        reply_markup=markup,
+    next_step = NEXT_STEP[LeadForm.comments.state]
+    prompt, markup = await next_step.render(data)
+    await form_card.show(
+        message,
+        state,
+        f"{confirmation_msg}\n\n{prompt}",
+        markup,
+        compact=f"{confirmation_msg}\n\n{next_step.step_line}",
     )
-    await state.set_state(LeadForm.meeting_place)
+    await state.set_state(next_step.state)
 
 
 @form_fields_router.callback_query(
     LeadForm.meeting_place, F.data.startswith("meeting_place:")
 )
-async def process_meeting_place(callback: CallbackQuery, state: FSMContext):
+async def process_meeting_place(
+    callback: CallbackQuery, state: FSMContext, form_card: FormCard
+):
     meeting_place_val = callback.data.split(":")[1]
     meeting_place_label = (
         "Our Booth" if meeting_place_val == "our_booth" else "Partner Booth"
     )
-    await state.update_data(meeting_place=meeting_place_label)
-    data = await state.get_data()
+    data = await state.update_data(meeting_place=meeting_place_label)
 
     if data.get("business_card_photo") or data.get("business_card_skipped"):
         # Proceed to importance selection
-        summary = await generate_summary(data)
-        
-        # Create keyboard with importance options
-        keyboard_rows = [
-            [InlineKeyboardButton(text="⚪ Low", callback_data="importance:low")],
-            [InlineKeyboardButton(text="🟡 Medium", callback_data="importance:medium")],
-            [InlineKeyboardButton(text="🟢 High", callback_data="importance:high")],
-            [InlineKeyboardButton(text="⬅️ Back", callback_data="lead:back")],
-        ]
-        markup = InlineKeyboardMarkup(inline_keyboard=keyboard_rows)
-        
-        await callback.message.edit_text(
-            f"Meeting place saved: <b>{meeting_place_label}</b>\n\n{summary}\n\n<b>Step 17/17:</b> How would you rate the importance of this lead?",
-            parse_mode="HTML",
-            reply_markup=markup,
+        next_step = NEXT_STEP[LeadForm.meeting_place.state]
+        prompt, markup = await next_step.render(data)
+        saved = f"Meeting place saved: <b>{meeting_place_label}</b>"
+        await form_card.edit(
+            callback.message,
+            state,
+            f"{saved}\n\n{prompt}",
+            markup,
+            compact=f"{saved}\n\n{next_step.step_line}",
         )
-        await state.set_state(LeadForm.importance)
+        await state.set_state(next_step.state)
     else:
         # Handle case where business card is not skipped
-        keyboard_rows = [
-            [
-                InlineKeyboardButton(
-                    text="Skip Business Card", callback_data="business_card:skip"
-                )
-            ]
-        ]
-        markup = InlineKeyboardMarkup(inline_keyboard=keyboard_rows)
+        markup = SKIP_BUSINESS_CARD_MARKUP
 
         await callback.message.edit_text(
             f"Meeting place saved: <b>{meeting_place_label}</b>\n\n"
@@ -675,18 +457,15 @@ async def process_meeting_place(callback: CallbackQuery, state: FSMContext):
         await state.set_state(LeadForm.business_card_photo)
 
     await callback.answer()
+
+
 @form_fields_router.callback_query(
     LeadForm.importance, F.data.startswith("importance:")
 )
 async def process_importance(callback: CallbackQuery, state: FSMContext):
     """Process the lead importance selection and show the final summary."""
     importance_val = callback.data.split(":")[1]
-    importance_label_map = {
-        "low": "Low",
-        "medium": "Medium",
-        "high": "High"
-    }
-    importance_label = importance_label_map.get(importance_val, "Unknown")
+    importance_label = dict(IMPORTANCE_CHOICES).get(importance_val, "Unknown")
     
     # Save importance to state
     await state.update_data(importance=importance_val)
@@ -695,13 +474,7 @@ async def process_importance(callback: CallbackQuery, state: FSMContext):
     data = await state.get_data()
     summary_text = await generate_summary(data)
     
-    # Create final confirmation buttons
-    keyboard_rows = [
-        [InlineKeyboardButton(text="✅ Confirm", callback_data="lead:confirm")],
-        [InlineKeyboardButton(text="❌ Cancel", callback_data="lead:cancel")],
-        [InlineKeyboardButton(text="🔄 Restart", callback_data="lead:restart")],
-    ]
-    markup = InlineKeyboardMarkup(inline_keyboard=keyboard_rows)
+    markup = CONFIRM_MARKUP
     
     # Show final summary with confirmation options
     final_text = f"{summary_text}\n\n<b>✅ Lead Information Complete</b>\n\nPlease review the information above and confirm if it's correct."
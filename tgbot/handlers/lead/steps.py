@@ -0,0 +1,344 @@
+"""
+Declarative description of the lead form steps.
+
+Every step is described once in ``FORM_STEPS`` (prompt, draft field,
+validation, keyboard). At import time the list is compiled into lookup
+tables keyed by the raw FSM state, so handlers find the current, next and
+previous step with one dict lookup instead of per-step code.
+"""
+
+from dataclasses import dataclass
+from typing import Any, Callable, Dict, Optional, Tuple, Union
+
+from aiogram.filters import BaseFilter
+from aiogram.fsm.state import State
+from aiogram.types import (
+    CallbackQuery,
+    InlineKeyboardButton,
+    InlineKeyboardMarkup,
+    Message,
+)
+
+from tgbot.keyboards.inline import (
+    BACK_MARKUP,
+    COMPANY_TYPE_CHOICES,
+    COMPANY_TYPE_MARKUP,
+    DIRECTIONS_DONE_BTN,
+    IMPORTANCE_MARKUP,
+    MEETING_PLACE_MARKUP,
+    MODE_OF_TRANSPORT_CHOICES,
+    SKIP_BUSINESS_CARD_MARKUP,
+    SKIP_EMAIL_BTN,
+    SKIP_EMAIL_MARKUP,
+    TRANSPORT_MARKUP,
+    back_markup,
+)
+from tgbot.services.direction_catalog import direction_catalog
+from tgbot.states.lead_form import LeadForm
+
+from .core import (
+    DIRECTIONS_PROMPT,
+    callback_token,
+    direction_picker_markup,
+    generate_summary,
+    is_valid_email,
+    is_valid_phone,
+)
+
+TOTAL_STEPS = 17
+
+BUSINESS_CARD_INTRO = """
+📋 <b>Lead Information Form</b>
+
+Let's start with the business card to automatically fill in contact details.
+
+<b>📸 How to upload a business card photo:</b>
+1️⃣ Tap the paperclip (📎) icon below
+2️⃣ Select "Photo" or "Gallery"
+3️⃣ Choose a clear photo of the business card
+4️⃣ Make sure all text is readable and not blurry
+5️⃣ Tap "Send" to upload
+
+<b>💡 Tips for best results:</b>
+• Take the photo in good lighting
+• Keep the card flat and in frame
+• Avoid shadows and glare
+• Make sure all text is visible
+
+"""
+
+
+@dataclass(frozen=True)
+class FormStep:
+    """One step of the lead form."""
+
+    state: State
+    # Shown as "Step n/17"; steps without a number have no prompt of their own
+    number: Optional[int] = None
+    prompt: str = ""
+    # Text printed before the step line (after the summary)
+    intro: str = ""
+    # Draft key the answer is stored in, for the steps answered by the
+    # generic text and choice handlers
+    field: Optional[str] = None
+    # Draft key of the answer of a step answered by a dedicated handler
+    answer_key: Optional[str] = None
+    empty_error: str = ""
+    validator: Optional[Callable[[str], bool]] = None
+    invalid_error: str = ""
+    # Choice steps: callback data is "<callback_prefix>:<value>"
+    callback_prefix: Optional[str] = None
+    choices: Optional[Dict[str, str]] = None
+    selected_text: str = ""
+    # OCR suggestion offered with the prompt: (callback type, extracted_data keys)
+    suggestion: Optional[Tuple[str, Tuple[str, ...]]] = None
+    # Keyboard of the step; rows in extra_rows follow a suggestion button
+    keyboard: Optional[InlineKeyboardMarkup] = BACK_MARKUP
+    extra_rows: Tuple[Tuple[InlineKeyboardButton, ...], ...] = ()
+    keyboard_builder: Optional[Callable[[dict], InlineKeyboardMarkup]] = None
+    # The prompt is always sent as a new message, never edited in
+    new_message: bool = False
+
+    def extracted_value(self, extracted_data: Dict[str, Any]) -> Optional[str]:
+        """The OCR value of this step's suggestion, if the card had one."""
+        if not self.suggestion:
+            return None
+        for key in self.suggestion[1]:
+            if extracted_data.get(key):
+                return extracted_data[key]
+        return None
+
+    def markup(self, data: dict) -> Optional[InlineKeyboardMarkup]:
+        if self.keyboard_builder is not None:
+            return self.keyboard_builder(data)
+        value = None
+        if data.get("ocr_processed"):
+            value = self.extracted_value(data.get("extracted_data") or {})
+        if not value:
+            return self.keyboard
+        # The value stays in extracted_data; the token ties the button to it
+        token = callback_token(value)
+        rows = [
+            [
+                InlineKeyboardButton(
+                    text=f"Use: {value}",
+                    callback_data=f"use_suggestion:{self.suggestion[0]}:{token}",
+                )
+            ]
+        ]
+        rows.extend(list(row) for row in self.extra_rows)
+        return back_markup(rows)
+
+    @property
+    def step_line(self) -> str:
+        """The prompt of the step with its number, without the summary."""
+        return f"{self.intro}<b>Step {self.number}/{TOTAL_STEPS}:</b> {self.prompt}"
+
+    async def render(self, data: dict) -> Tuple[str, Optional[InlineKeyboardMarkup]]:
+        """The prompt of the step under the draft summary, and its keyboard."""
+        summary = await generate_summary(data)
+        return f"{summary}\n\n{self.step_line}", self.markup(data)
+
+
+def _directions_keyboard(data: dict) -> InlineKeyboardMarkup:
+    catalog = direction_catalog.get_exact(data.get("directions_version"))
+    if catalog is None:
+        return back_markup([[DIRECTIONS_DONE_BTN]])
+    return direction_picker_markup(
+        catalog,
+        data.get("directions_mask"),
+        data.get("directions_page", 0),
+        data.get("directions_filter", ""),
+    )
+
+
+# The form in order. Steps without ``field`` are answered by dedicated
+# handlers (file uploads, API calls, conditional transitions).
+FORM_STEPS: Tuple[FormStep, ...] = (
+    FormStep(LeadForm.exhibition_selection),
+    FormStep(
+        LeadForm.business_card_photo,
+        number=2,
+        intro=BUSINESS_CARD_INTRO,
+        prompt="Upload a business card photo or type 'skip' to enter details manually.",
+        keyboard=SKIP_BUSINESS_CARD_MARKUP,
+        new_message=True,
+    ),
+    FormStep(
+        LeadForm.full_name,
+        number=3,
+        prompt="What is the full name?",
+        field="full_name",
+        empty_error="Name cannot be empty. Please enter your full name.",
+        suggestion=("name", ("full_name",)),
+    ),
+    FormStep(
+        LeadForm.position,
+        number=4,
+        prompt="What is the position in the company?",
+        field="position",
+        empty_error="Position cannot be empty.",
+        suggestion=("position", ("position",)),
+    ),
+    FormStep(
+        LeadForm.phone_number,
+        number=5,
+        prompt="What is the phone number (enter personal and office number using '/' between them)",
+        field="phone_number",
+        empty_error="Phone number cannot be empty.",
+        validator=is_valid_phone,
+        invalid_error="Invalid phone number format.",
+        suggestion=("phone", ("phone", "phone_number")),
+    ),
+    FormStep(
+        LeadForm.email,
+        number=6,
+        prompt="What is the email address?",
+        field="email",
+        empty_error="Email cannot be empty.",
+        validator=is_valid_email,
+        invalid_error="Invalid email format.",
+        suggestion=("email", ("email",)),
+        keyboard=SKIP_EMAIL_MARKUP,
+        extra_rows=((SKIP_EMAIL_BTN,),),
+    ),
+    FormStep(
+        LeadForm.company_name,
+        number=7,
+        prompt="What is the company name?",
+        field="company_name",
+        empty_error="Company name cannot be empty.",
+        suggestion=("company", ("company_name",)),
+    ),
+    FormStep(
+        LeadForm.company_address,
+        number=8,
+        prompt="What is the company address?",
+        field="company_address",
+        empty_error="Company address cannot be empty.",
+        suggestion=("company_address", ("company_address",)),
+    ),
+    FormStep(
+        LeadForm.sphere_of_activity,
+        number=9,
+        prompt="What is the company's sphere of activity?",
+        field="sphere_of_activity",
+        empty_error="Sphere of activity cannot be empty.",
+    ),
+    FormStep(
+        LeadForm.company_type,
+        number=10,
+        prompt="What is the company type?",
+        field="company_type",
+        callback_prefix="company_type",
+        choices=dict(COMPANY_TYPE_CHOICES),
+        selected_text="Selected company type",
+        keyboard=COMPANY_TYPE_MARKUP,
+    ),
+    FormStep(
+        LeadForm.cargo,
+        number=11,
+        prompt="What type of cargo does company handle?",
+        field="cargo",
+        empty_error="Cargo information cannot be empty.",
+    ),
+    FormStep(
+        LeadForm.mode_of_transport,
+        number=12,
+        prompt="What is the preferred mode of transport?",
+        field="mode_of_transport",
+        callback_prefix="transport",
+        choices=dict(MODE_OF_TRANSPORT_CHOICES),
+        selected_text="Selected transport mode",
+        keyboard=TRANSPORT_MARKUP,
+    ),
+    FormStep(
+        LeadForm.shipment_volume,
+        number=13,
+        prompt="What is the monthly shipment volume?",
+        answer_key="shipment_volume",
+    ),
+    FormStep(
+        LeadForm.shipment_directions,
+        number=14,
+        prompt=DIRECTIONS_PROMPT,
+        answer_key="selected_directions",
+        keyboard_builder=_directions_keyboard,
+    ),
+    FormStep(
+        LeadForm.comments,
+        number=15,
+        prompt="Do you have any additional comments?",
+        answer_key="comments",
+    ),
+    FormStep(
+        LeadForm.meeting_place,
+        number=16,
+        prompt="Where did the meeting take place?",
+        answer_key="meeting_place",
+        keyboard=MEETING_PLACE_MARKUP,
+    ),
+    FormStep(
+        LeadForm.importance,
+        number=17,
+        prompt="How would you rate the importance of this lead?",
+        answer_key="importance",
+        keyboard=IMPORTANCE_MARKUP,
+    ),
+)
+
+# States outside the linear flow -> the state "back" returns to
+_DETOURS = {LeadForm.ocr_confirmation: LeadForm.business_card_photo}
+
+# Compiled tables, keyed by raw FSM state ("LeadForm:full_name")
+STEPS: Dict[str, FormStep] = {step.state.state: step for step in FORM_STEPS}
+NEXT_STEP: Dict[str, FormStep] = {
+    step.state.state: following for step, following in zip(FORM_STEPS, FORM_STEPS[1:])
+}
+PREVIOUS_STEP: Dict[str, FormStep] = {
+    step.state.state: previous for previous, step in zip(FORM_STEPS, FORM_STEPS[1:])
+}
+PREVIOUS_STEP.update(
+    {detour.state: STEPS[target.state] for detour, target in _DETOURS.items()}
+)
+TEXT_STEPS: Dict[str, FormStep] = {
+    state: step
+    for state, step in STEPS.items()
+    if step.field and not step.callback_prefix
+}
+CHOICE_STEPS: Dict[str, FormStep] = {
+    state: step for state, step in STEPS.items() if step.callback_prefix
+}
+SUGGESTION_STEPS: Dict[str, FormStep] = {
+    step.suggestion[0]: step for step in FORM_STEPS if step.suggestion
+}
+# Draft keys of the form answers after the business card; a draft holding
+# none of them is at the start of the form
+ANSWER_KEYS: Tuple[str, ...] = tuple(
+    step.field or step.answer_key
+    for step in FORM_STEPS
+    if step.number is not None and (step.field or step.answer_key)
+)
+
+
+class StepFilter(BaseFilter):
+    """
+    Matches when the current state is a step of ``steps`` (for callbacks,
+    also the step's callback prefix) and passes that step to the handler as
+    ``form_step``.
+    """
+
+    def __init__(self, steps: Dict[str, FormStep]) -> None:
+        self.steps = steps
+
+    async def __call__(
+        self, event: Union[Message, CallbackQuery], raw_state: Optional[str] = None
+    ) -> Union[bool, Dict[str, Any]]:
+        step = self.steps.get(raw_state)
+        if step is None:
+            return False
+        if isinstance(event, CallbackQuery) and not (event.data or "").startswith(
+            f"{step.callback_prefix}:"
+        ):
+            return False
+        return {"form_step": step}
@@ -11,7 +11,6 @@ from aiogram.types import (
 )
 
 from infrastructure.some_api.api import MyApi
-from tgbot.config import load_config
 from tgbot.utils.keyboards import get_main_keyboard
 
 user_router = Router()
@@ -30,15 +29,13 @@ class RegistrationStates(StatesGroup):
 
 
 @user_router.message(CommandStart())
-async def user_start(message: Message):
+async def user_start(message: Message, api: MyApi):
     try:
-        config = load_config()
-        async with MyApi(config=config) as api:
-            status, result = await api.login(telegram_id=message.from_user.id)
-            if status == 200:
-                # User is already registered
-                await message.answer(
-                    f"""
+        status, result = await api.login(telegram_id=message.from_user.id)
+        if status == 200:
+            # User is already registered
+            await message.answer(
+                f"""
 👋 Welcome back, {message.from_user.first_name}!
 
 📝 <b>How to use this bot:</b>
@@ -51,14 +48,14 @@ async def user_start(message: Message):
 3️⃣ Follow the guided process to complete the lead form
 
 Need help? Type /help to see all available commands.
-                    """,
-                    parse_mode="HTML",
-                    reply_markup=get_main_keyboard(),
-                )
-            else:
-                # User needs to register first
-                await message.answer(
-                    f"""
+                """,
+                parse_mode="HTML",
+                reply_markup=get_main_keyboard(),
+            )
+        else:
+            # User needs to register first
+            await message.answer(
+                f"""
 👋 Hello {message.from_user.first_name}!
 
 Welcome to the Exhibition Lead Collection Bot. 
@@ -68,12 +65,12 @@ Before you can start collecting leads, you need to register with your company.
 • 📸 Send business card photos
 • 📋 Fill out lead forms
 • 📊 Track your exhibition leads
-                    """,
-                    parse_mode="HTML",
-                    reply_markup=ReplyKeyboardRemove(),
-                )
-                # Show company selection for registration
-                await show_company_selection(message, api)
+                """,
+                parse_mode="HTML",
+                reply_markup=ReplyKeyboardRemove(),
+            )
+            # Show company selection for registration
+            await show_company_selection(message, api)
     except Exception as e:
         await message.answer("An error occurred. Please try again later.")
         print(f"Error in user_start: {e}")
@@ -141,7 +138,9 @@ async def show_company_selection(message: Message, api: MyApi):
 
 
 @user_router.callback_query(F.data.startswith("company:"))
-async def register_with_company(callback: CallbackQuery, state: FSMContext):
+async def register_with_company(
+    callback: CallbackQuery, state: FSMContext, api: MyApi
+):
     try:
         await callback.answer()  # Acknowledge the callback first
 
@@ -168,6 +167,7 @@ async def register_with_company(callback: CallbackQuery, state: FSMContext):
         # If both first_name and last_name are available, proceed with registration
         await complete_registration(
             callback.message,
+            api,
             callback.from_user.id,
             company_id,
             callback.from_user.first_name,
@@ -181,29 +181,29 @@ async def register_with_company(callback: CallbackQuery, state: FSMContext):
 
 
 @user_router.callback_query(F.data == "retry_registration")
-async def retry_registration(callback: CallbackQuery):
+async def retry_registration(callback: CallbackQuery, api: MyApi):
     """Handle retry registration button click."""
     await callback.answer()
     await callback.message.edit_reply_markup(
         reply_markup=None
     )  # Remove the retry button
-    await show_company_selection(callback.message, MyApi(config=load_config()))
+    await show_company_selection(callback.message, api)
 
 
 # Button text handlers
 @user_router.message(F.text.in_(START_BUTTON_PATTERNS))
-async def handle_start_button(message: Message):
+async def handle_start_button(message: Message, api: MyApi):
     """Handle 'Start' button text as /start command"""
-    await user_start(message)
+    await user_start(message, api)
 
 
 @user_router.message(F.text.in_(LEAD_BUTTON_PATTERNS))
-async def handle_lead_button(message: Message, state: FSMContext = None):
+async def handle_lead_button(message: Message, api: MyApi, state: FSMContext = None):
     """Handle 'Lead' button text as /lead command"""
     # Import cmd_lead from the business_card module
     from tgbot.handlers.lead.business_card import cmd_lead
 
-    await cmd_lead(message, state)
+    await cmd_lead(message, state, api)
 
 
 @user_router.message(F.text.in_(HELP_BUTTON_PATTERNS))
@@ -230,7 +230,7 @@ async def process_first_name(message: Message, state: FSMContext):
 
 
 @user_router.message(RegistrationStates.waiting_for_last_name)
-async def process_last_name(message: Message, state: FSMContext):
+async def process_last_name(message: Message, state: FSMContext, api: MyApi):
     """Process the last name provided by the user"""
     # Store the last name
     last_name = message.text.strip()
@@ -248,46 +248,43 @@ async def process_last_name(message: Message, state: FSMContext):
 
     # Complete the registration
     await complete_registration(
-        message, message.from_user.id, company_id, first_name, last_name
+        message, api, message.from_user.id, company_id, first_name, last_name
     )
 
 
 async def complete_registration(
-    message, telegram_id, company_id, first_name, last_name
+    message, api: MyApi, telegram_id, company_id, first_name, last_name
 ):
     """Complete the registration process with the API"""
-    config = load_config()
-
-    async with MyApi(config=config) as api:
-        # Register user with selected company
-        status, result = await api.register(
-            telegram_id=telegram_id,
-            company_id=company_id,
-            first_name=first_name,
-            last_name=last_name,
-        )
+    # Register user with selected company
+    status, result = await api.register(
+        telegram_id=telegram_id,
+        company_id=company_id,
+        first_name=first_name,
+        last_name=last_name,
+    )
 
-        if status in (200, 201):
-            # Registration successful
-            await message.answer(
-                "✅ Registration successful! Welcome to the system.\n\n"
-                "You can now use the /lead command to start the lead form."
-            )
-            # Send a new message with the main keyboard
-            await message.answer(
-                "Use the buttons below for quick access to commands:",
-                reply_markup=get_main_keyboard(),
-            )
-        else:
-            # Registration failed
-            keyboard = [
-                [
-                    InlineKeyboardButton(
-                        text="🔄 Try Again", callback_data="retry_registration"
-                    )
-                ]
+    if status in (200, 201):
+        # Registration successful
+        await message.answer(
+            "✅ Registration successful! Welcome to the system.\n\n"
+            "You can now use the /lead command to start the lead form."
+        )
+        # Send a new message with the main keyboard
+        await message.answer(
+            "Use the buttons below for quick access to commands:",
+            reply_markup=get_main_keyboard(),
+        )
+    else:
+        # Registration failed
+        keyboard = [
+            [
+                InlineKeyboardButton(
+                    text="🔄 Try Again", callback_data="retry_registration"
+                )
             ]
-            markup = InlineKeyboardMarkup(inline_keyboard=keyboard)
-            await message.answer(
-                "❌ Registration failed. Please try again.", reply_markup=markup
-            )
+        ]
+        markup = InlineKeyboardMarkup(inline_keyboard=keyboard)
+        await message.answer(
+            "❌ Registration failed. Please try again.", reply_markup=markup
+        )
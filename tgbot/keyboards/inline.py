@@ -1,15 +1,167 @@
-"""Reusable inline‑keyboard helpers."""
+"""Reusable inline‑keyboard helpers.
 
-from typing import List, Sequence
+Keyboards that do not depend on the draft are built once, at import time, and
+shared by every handler, so they must never be modified in place. When the
+bot uses ``KeyboardCacheSession`` their JSON is also serialized only once.
+"""
+
+from typing import Any, Dict, List, Sequence, Tuple
+
+from aiogram import Bot
+from aiogram.client.session.aiohttp import AiohttpSession
+from aiogram.methods import TelegramMethod
+from aiogram.types import InlineKeyboardButton, InlineKeyboardMarkup, InputFile
+from aiohttp import FormData
+
+# Choices offered by the form, as (value stored in the lead, label)
+COMPANY_TYPE_CHOICES: List[Tuple[str, str]] = [
+    ("importer_exporter", "Importer/Exporter"),
+    ("forwarder", "Forwarder"),
+    ("agent", "Agent"),
+]
+
+MODE_OF_TRANSPORT_CHOICES: List[Tuple[str, str]] = [
+    ("wagons", "Wagons"),
+    ("containers", "Containers"),
+    ("lcl", "LCL"),
+    ("air", "Air"),
+    ("auto", "Auto"),
+]
+
+IMPORTANCE_CHOICES: List[Tuple[str, str]] = [
+    ("low", "Low"),
+    ("medium", "Medium"),
+    ("high", "High"),
+]
+
+MEETING_PLACE_CHOICES: List[Tuple[str, str]] = [
+    ("our_booth", "Our Booth"),
+    ("partner_booth", "Partner Booth"),
+]
+
+# id() of every shared markup -> the markup (kept alive so ids stay unique)
+_STATIC_MARKUPS: Dict[int, InlineKeyboardMarkup] = {}
+
+
+def static_markup(rows: List[List[InlineKeyboardButton]]) -> InlineKeyboardMarkup:
+    """Build a shared markup and register it for serialization caching."""
+    markup = InlineKeyboardMarkup(inline_keyboard=rows)
+    _STATIC_MARKUPS[id(markup)] = markup
+    return markup
+
+
+def is_static_markup(markup: Any) -> bool:
+    return markup is not None and _STATIC_MARKUPS.get(id(markup)) is markup
 
-from aiogram.types import InlineKeyboardButton, InlineKeyboardMarkup
 
 BACK_BTN = InlineKeyboardButton(text="⬅️ Back", callback_data="lead:back")
+DIRECTIONS_DONE_BTN = InlineKeyboardButton(text="✅ Done", callback_data="directions:done")
+SKIP_EMAIL_BTN = InlineKeyboardButton(text="Skip Email", callback_data="skip:email")
+
+BACK_MARKUP = static_markup([[BACK_BTN]])
+
+SKIP_EMAIL_MARKUP = static_markup([[SKIP_EMAIL_BTN], [BACK_BTN]])
+
+SKIP_BUSINESS_CARD_MARKUP = static_markup(
+    [[InlineKeyboardButton(text="⏩ Skip Business Card", callback_data="business_card:skip")]]
+)
+
+COMPANY_TYPE_MARKUP = static_markup(
+    [
+        *(
+            [InlineKeyboardButton(text=label, callback_data=f"company_type:{value}")]
+            for value, label in COMPANY_TYPE_CHOICES
+        ),
+        [BACK_BTN],
+    ]
+)
+
+TRANSPORT_MARKUP = static_markup(
+    [
+        *(
+            [InlineKeyboardButton(text=label, callback_data=f"transport:{value}")]
+            for value, label in MODE_OF_TRANSPORT_CHOICES
+        ),
+        [BACK_BTN],
+    ]
+)
+
+MEETING_PLACE_MARKUP = static_markup(
+    [
+        *(
+            [InlineKeyboardButton(text=label, callback_data=f"meeting_place:{value}")]
+            for value, label in MEETING_PLACE_CHOICES
+        ),
+        [BACK_BTN],
+    ]
+)
+
+IMPORTANCE_MARKUP = static_markup(
+    [
+        [InlineKeyboardButton(text="⚪ Low", callback_data="importance:low")],
+        [InlineKeyboardButton(text="🟡 Medium", callback_data="importance:medium")],
+        [InlineKeyboardButton(text="🟢 High", callback_data="importance:high")],
+        [BACK_BTN],
+    ]
+)
+
+CONFIRM_MARKUP = static_markup(
+    [
+        [InlineKeyboardButton(text="✅ Confirm", callback_data="lead:confirm")],
+        [InlineKeyboardButton(text="❌ Cancel", callback_data="lead:cancel")],
+        [InlineKeyboardButton(text="🔄 Restart", callback_data="lead:restart")],
+    ]
+)
+
+RETRY_DIRECTIONS_MARKUP = static_markup(
+    [
+        [InlineKeyboardButton(text="🔄 Try Again", callback_data="retry_fetch_directions")],
+        [BACK_BTN],
+    ]
+)
 
 
 def back_markup(
     extra_rows: Sequence[List[InlineKeyboardButton]] | None = None,
 ) -> InlineKeyboardMarkup:
-    rows = [*extra_rows] if extra_rows else []
+    """The given rows followed by the Back button (the shared markup if there are none)."""
+    if not extra_rows:
+        return BACK_MARKUP
+    rows = [*extra_rows]
     rows.append([BACK_BTN])
     return InlineKeyboardMarkup(inline_keyboard=rows)
+
+
+class KeyboardCacheSession(AiohttpSession):
+    """
+    Bot session that sends the JSON of the shared keyboards serialized once,
+    instead of dumping and encoding the same markup on every request.
+    """
+
+    def __init__(self, **kwargs: Any) -> None:
+        super().__init__(**kwargs)
+        self._serialized: Dict[int, str] = {}
+
+    def build_form_data(self, bot: Bot, method: TelegramMethod[Any]) -> FormData:
+        markup = getattr(method, "reply_markup", None)
+        if not is_static_markup(markup):
+            return super().build_form_data(bot, method)
+
+        form = FormData(quote_fields=False)
+        files: Dict[str, InputFile] = {}
+        for key, value in method.model_dump(warnings=False, exclude={"reply_markup"}).items():
+            value = self.prepare_value(value, bot=bot, files=files)
+            if not value:
+                continue
+            form.add_field(key, value)
+        form.add_field("reply_markup", self._serialize(bot, markup))
+        for key, value in files.items():
+            form.add_field(key, value.read(bot), filename=value.filename or key)
+        return form
+
+    def _serialize(self, bot: Bot, markup: InlineKeyboardMarkup) -> str:
+        serialized = self._serialized.get(id(markup))
+        if serialized is None:
+            serialized = self.prepare_value(markup.model_dump(warnings=False), bot=bot, files={})
+            self._serialized[id(markup)] = serialized
+        return serialized
@@ -0,0 +1,20 @@
+from typing import Callable, Dict, Any, Awaitable
+
+from aiogram import BaseMiddleware
+from aiogram.types import Message
+
+from infrastructure.some_api.api import MyApi
+
+
+class ApiMiddleware(BaseMiddleware):
+    def __init__(self, api: MyApi) -> None:
+        self.api = api
+
+    async def __call__(
+        self,
+        handler: Callable[[Message, Dict[str, Any]], Awaitable[Any]],
+        event: Message,
+        data: Dict[str, Any],
+    ) -> Any:
+        data["api"] = self.api
+        return await handler(event, data)
@@ -0,0 +1,24 @@
+from typing import Callable, Dict, Any, Awaitable, Optional
+
+from aiogram import BaseMiddleware
+from aiogram.fsm.context import FSMContext
+from aiogram.types import Message
+
+from tgbot.services.draft_lifecycle import DraftLifecycle
+
+
+class DraftLifecycleMiddleware(BaseMiddleware):
+    def __init__(self, draft_lifecycle: DraftLifecycle) -> None:
+        self.draft_lifecycle = draft_lifecycle
+
+    async def __call__(
+        self,
+        handler: Callable[[Message, Dict[str, Any]], Awaitable[Any]],
+        event: Message,
+        data: Dict[str, Any],
+    ) -> Any:
+        data["draft_lifecycle"] = self.draft_lifecycle
+        state: Optional[FSMContext] = data.get("state")
+        if state is not None:
+            self.draft_lifecycle.touch(state.key)
+        return await handler(event, data)
@@ -0,0 +1,263 @@
+import asyncio
+import hashlib
+import logging
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Any, Optional, Tuple
+
+from aiogram import Bot
+from aiogram.client.session.middlewares.base import (
+    BaseRequestMiddleware,
+    NextRequestMiddlewareType,
+)
+from aiogram.exceptions import TelegramBadRequest
+from aiogram.methods import (
+    DeleteMessage,
+    EditMessageReplyMarkup,
+    EditMessageText,
+    SendMessage,
+    TelegramMethod,
+)
+from aiogram.types import InlineKeyboardMarkup, Message
+
+from tgbot.keyboards.inline import is_static_markup
+
+_Key = Tuple[int, int]
+
+
+@dataclass
+class _MessageState:
+    # Digests of what this process last sent for the message, once the held
+    # edit is sent (text is None when only the keyboard is known)
+    text: Optional[bytes]
+    markup: bytes
+    # When the digests were recorded (monotonic)
+    known_at: float
+    # When the last keyboard edit was sent (monotonic), 0 if there was none
+    sent_at: float = 0.0
+    pending: Optional[EditMessageReplyMarkup] = None
+    flush: Optional[asyncio.Task] = None
+
+
+class EditOptimizer(BaseRequestMiddleware):
+    """
+    Bot session middleware that trims message edits before they are sent.
+
+    The digest of the text and keyboard this process last sent is kept for
+    the ``max_messages`` most recently used bot messages (by chat and message
+    id). An edit that would not change the message is answered without a
+    request, but only within ``dedup_ttl`` seconds of the send it is compared
+    with: another instance of the bot (with Redis storage) may have edited the
+    message since. "message is not modified" errors are swallowed, so handlers
+    never see them.
+
+    Keyboard edits (``editMessageReplyMarkup``, e.g. the directions picker)
+    that follow the previous one of the same message within ``debounce``
+    seconds are held: a newer keyboard edit replaces the held one and only the
+    last is sent when the window ends. Held edits return ``True`` at once, so
+    handlers of a burst of taps do not wait for the window; their failures
+    are logged. Text edits are always sent right away (superseding a held
+    keyboard edit), so callers that fall back to a new message on
+    ``TelegramBadRequest`` still see the error. Edits of inline messages pass
+    through.
+    """
+
+    def __init__(
+        self, debounce: float = 0.3, max_messages: int = 10000, dedup_ttl: float = 10.0
+    ) -> None:
+        self.debounce = debounce
+        self.max_messages = max_messages
+        self.dedup_ttl = dedup_ttl
+        self._messages: "OrderedDict[_Key, _MessageState]" = OrderedDict()
+        self._markup_digests: dict[int, bytes] = {}
+        self.sent = 0
+        self.dropped = 0
+        self.coalesced = 0
+        self.log = logging.getLogger(self.__class__.__name__)
+
+    def stats(self) -> dict:
+        return {
+            "tracked": len(self._messages),
+            "sent": self.sent,
+            "dropped": self.dropped,
+            "coalesced": self.coalesced,
+        }
+
+    async def __call__(
+        self,
+        make_request: NextRequestMiddlewareType[Any],
+        bot: Bot,
+        method: TelegramMethod[Any],
+    ) -> Any:
+        if isinstance(method, (EditMessageText, EditMessageReplyMarkup)):
+            if method.inline_message_id is None and method.message_id is not None:
+                return await self._edit(make_request, bot, method)
+        elif isinstance(method, DeleteMessage):
+            self._forget((method.chat_id, method.message_id))
+        elif isinstance(method, SendMessage):
+            result = await make_request(bot, method)
+            if isinstance(result, Message):
+                self._remember(
+                    (result.chat.id, result.message_id),
+                    _MessageState(
+                        self._text_digest(method),
+                        self._markup_digest(method),
+                        known_at=time.monotonic(),
+                    ),
+                )
+            return result
+        return await make_request(bot, method)
+
+    async def drain(self) -> None:
+        """Send the held edits now, e.g. before the bot session is closed."""
+        for state in self._messages.values():
+            if state.pending is not None:
+                # Still waiting for the window to end
+                state.flush.cancel()
+        tasks = [
+            state.flush for state in self._messages.values() if state.flush is not None
+        ]
+        await asyncio.gather(*tasks, return_exceptions=True)
+
+    async def _edit(
+        self,
+        make_request: NextRequestMiddlewareType[Any],
+        bot: Bot,
+        method: TelegramMethod[Any],
+    ) -> Any:
+        key = (method.chat_id, method.message_id)
+        text = (
+            self._text_digest(method) if isinstance(method, EditMessageText) else None
+        )
+        markup = self._markup_digest(method)
+        now = time.monotonic()
+
+        state = self._messages.get(key)
+        if state is None:
+            state = self._remember(key, _MessageState(text, markup, known_at=now))
+        else:
+            recent = now - state.known_at < self.dedup_ttl
+            if recent and (text is None or text == state.text) and markup == state.markup:
+                self.dropped += 1
+                return True
+            self._messages.move_to_end(key)
+            if text is not None or not recent:
+                # An old text digest may no longer be what the message shows
+                state.text = text
+            state.markup = markup
+            state.known_at = now
+
+        if isinstance(method, EditMessageText):
+            if state.pending is not None:
+                # The text edit carries the keyboard as well
+                self._drop_pending(state)
+                self.coalesced += 1
+            return await self._send(make_request, bot, key, method)
+
+        if state.pending is not None:
+            state.pending = method
+            self.coalesced += 1
+            return True
+
+        wait = state.sent_at + self.debounce - now
+        if wait > 0:
+            state.pending = method
+            state.flush = asyncio.create_task(
+                self._flush(make_request, bot, key, state, wait)
+            )
+            return True
+
+        state.sent_at = now
+        return await self._send(make_request, bot, key, method)
+
+    async def _flush(
+        self,
+        make_request: NextRequestMiddlewareType[Any],
+        bot: Bot,
+        key: _Key,
+        state: _MessageState,
+        wait: float,
+    ) -> None:
+        try:
+            await asyncio.sleep(wait)
+        except asyncio.CancelledError:
+            # Drained: send what is held right away
+            pass
+        method, state.pending = state.pending, None
+        if method is None:
+            return
+        state.sent_at = time.monotonic()
+        try:
+            await self._send(make_request, bot, key, method)
+        except Exception as e:
+            self.log.warning("Held edit of message %s failed: %s", key, e)
+
+    async def _send(
+        self,
+        make_request: NextRequestMiddlewareType[Any],
+        bot: Bot,
+        key: _Key,
+        method: TelegramMethod[Any],
+    ) -> Any:
+        self.sent += 1
+        try:
+            return await make_request(bot, method)
+        except TelegramBadRequest as e:
+            if "message is not modified" in str(e):
+                return True
+            self._forget(key)
+            raise
+        except Exception:
+            # What the message shows is unknown now
+            self._forget(key)
+            raise
+
+    def _remember(self, key: _Key, state: _MessageState) -> _MessageState:
+        self._messages[key] = state
+        self._messages.move_to_end(key)
+        while len(self._messages) > self.max_messages:
+            _, evicted = self._messages.popitem(last=False)
+            if evicted.pending is not None:
+                # Evicted while an edit is held: send it now
+                evicted.flush.cancel()
+        return state
+
+    def _forget(self, key: _Key) -> None:
+        state = self._messages.pop(key, None)
+        if state is not None and state.pending is not None:
+            self._drop_pending(state)
+
+    @staticmethod
+    def _drop_pending(state: _MessageState) -> None:
+        # The held edit is dropped, its task ends without sending
+        state.pending = None
+        state.flush.cancel()
+
+    @staticmethod
+    def _text_digest(method: Any) -> bytes:
+        parts = (
+            method.text,
+            str(method.parse_mode),
+            repr(method.entities),
+            repr(method.link_preview_options),
+        )
+        return hashlib.blake2b("\0".join(parts).encode("utf-8"), digest_size=16).digest()
+
+    def _markup_digest(self, method: Any) -> bytes:
+        markup = method.reply_markup
+        if markup is None:
+            return b""
+        if is_static_markup(markup):
+            # Shared keyboards never change, their digest is computed once
+            digest = self._markup_digests.get(id(markup))
+            if digest is None:
+                digest = self._markup_digests[id(markup)] = self._digest(markup)
+            return digest
+        return self._digest(markup)
+
+    @staticmethod
+    def _digest(markup: InlineKeyboardMarkup) -> bytes:
+        return hashlib.blake2b(
+            markup.model_dump_json(exclude_none=True).encode("utf-8"), digest_size=16
+        ).digest()
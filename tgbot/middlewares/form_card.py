@@ -0,0 +1,20 @@
+from typing import Callable, Dict, Any, Awaitable
+
+from aiogram import BaseMiddleware
+from aiogram.types import Message
+
+from tgbot.services.form_card import FormCard
+
+
+class FormCardMiddleware(BaseMiddleware):
+    def __init__(self, form_card: FormCard) -> None:
+        self.form_card = form_card
+
+    async def __call__(
+        self,
+        handler: Callable[[Message, Dict[str, Any]], Awaitable[Any]],
+        event: Message,
+        data: Dict[str, Any],
+    ) -> Any:
+        data["form_card"] = self.form_card
+        return await handler(event, data)
@@ -0,0 +1,218 @@
+from typing import Any, Awaitable, Callable, Dict, Mapping, Optional
+
+from aiogram import BaseMiddleware, Bot
+from aiogram.fsm.context import FSMContext
+from aiogram.fsm.middleware import FSMContextMiddleware
+from aiogram.fsm.state import State
+from aiogram.fsm.storage.base import (
+    DEFAULT_DESTINY,
+    BaseStorage,
+    StateType,
+    StorageKey,
+)
+from aiogram.fsm.storage.redis import RedisStorage
+from aiogram.types import Message
+
+_UNLOADED: Any = object()
+
+
+class BufferedFSMContext(FSMContext):
+    """
+    FSM context that talks to the storage at most twice per update.
+
+    State and data are read together on first use, with one
+    ``get_state_and_data`` call when the storage has it (otherwise the state
+    and the data are read separately, the data only if it is used). The state
+    can also be seeded from a ``raw_state`` that was already loaded. Every
+    write only changes the in-memory copy until ``flush`` stores state and data
+    together at the end of the update.
+    """
+
+    def __init__(
+        self, storage: BaseStorage, key: StorageKey, raw_state: Optional[str] = _UNLOADED
+    ) -> None:
+        super().__init__(storage=storage, key=key)
+        self._state = raw_state
+        self._data: Optional[Dict[str, Any]] = None
+        self._state_changed = False
+        self._data_changed = False
+        # Storage calls the handler asked for, and the ones actually made
+        self.requested_ops = 0
+        self.storage_ops = 0
+
+    async def set_state(self, state: StateType = None) -> None:
+        self.requested_ops += 1
+        self._state = state.state if isinstance(state, State) else state
+        self._state_changed = True
+
+    async def get_state(self) -> Optional[str]:
+        self.requested_ops += 1
+        if self._state is _UNLOADED:
+            await self._load()
+        return self._state
+
+    async def set_data(self, data: Mapping[str, Any]) -> None:
+        self.requested_ops += 1
+        self._data = dict(data)
+        self._data_changed = True
+
+    async def get_data(self) -> Dict[str, Any]:
+        self.requested_ops += 1
+        return dict(await self._load_data())
+
+    async def get_value(self, key: str, default: Optional[Any] = None) -> Optional[Any]:
+        self.requested_ops += 1
+        return (await self._load_data()).get(key, default)
+
+    async def update_data(
+        self, data: Optional[Mapping[str, Any]] = None, **kwargs: Any
+    ) -> Dict[str, Any]:
+        self.requested_ops += 1
+        current = await self._load_data()
+        if data:
+            current.update(data)
+        current.update(kwargs)
+        self._data_changed = True
+        return dict(current)
+
+    async def clear(self) -> None:
+        await self.set_state(None)
+        await self.set_data({})
+
+    async def flush(self) -> None:
+        """Write the buffered state and data to the storage."""
+        if not self._state_changed and not self._data_changed:
+            return
+
+        set_state_and_data = getattr(self.storage, "set_state_and_data", None)
+        if set_state_and_data is not None and self._state_changed and self._data_changed:
+            await set_state_and_data(self.key, self._state, self._data)
+            self.storage_ops += 1
+        elif isinstance(self.storage, RedisStorage):
+            await self._flush_redis(self.storage)
+        else:
+            if self._state_changed:
+                await self.storage.set_state(self.key, self._state)
+                self.storage_ops += 1
+            if self._data_changed:
+                await self.storage.set_data(self.key, self._data)
+                self.storage_ops += 1
+        self._state_changed = self._data_changed = False
+
+    async def _flush_redis(self, storage: RedisStorage) -> None:
+        # Both keys in one round trip
+        async with storage.redis.pipeline(transaction=True) as pipe:
+            if self._state_changed:
+                state_key = storage.key_builder.build(self.key, "state")
+                if self._state is None:
+                    pipe.delete(state_key)
+                else:
+                    pipe.set(state_key, self._state, ex=storage.state_ttl)
+            if self._data_changed:
+                data_key = storage.key_builder.build(self.key, "data")
+                if not self._data:
+                    pipe.delete(data_key)
+                else:
+                    pipe.set(data_key, storage.json_dumps(self._data), ex=storage.data_ttl)
+            await pipe.execute()
+        self.storage_ops += 1
+
+    async def _load(self) -> None:
+        get_state_and_data = getattr(self.storage, "get_state_and_data", None)
+        if get_state_and_data is not None:
+            state, data = await get_state_and_data(self.key)
+            if self._data is None:
+                self._data = data
+        else:
+            state = await self.storage.get_state(self.key)
+        self.storage_ops += 1
+        if self._state is _UNLOADED:
+            self._state = state
+
+    async def _load_data(self) -> Dict[str, Any]:
+        if self._data is None:
+            if self._state is _UNLOADED and hasattr(self.storage, "get_state_and_data"):
+                await self._load()
+            else:
+                self._data = await self.storage.get_data(self.key)
+                self.storage_ops += 1
+        return self._data
+
+
+class BufferedFSMContextMiddleware(FSMContextMiddleware):
+    """
+    The dispatcher's FSM middleware, handing out a ``BufferedFSMContext``.
+
+    The ``raw_state`` it loads for the filters comes from the context's
+    combined read, so the handler's data is already there when it asks.
+    """
+
+    def get_context(
+        self,
+        bot: Bot,
+        chat_id: int,
+        user_id: int,
+        thread_id: Optional[int] = None,
+        business_connection_id: Optional[str] = None,
+        destiny: str = DEFAULT_DESTINY,
+    ) -> FSMContext:
+        return BufferedFSMContext(
+            storage=self.storage,
+            key=StorageKey(
+                user_id=user_id,
+                chat_id=chat_id,
+                bot_id=bot.id,
+                thread_id=thread_id,
+                business_connection_id=business_connection_id,
+                destiny=destiny,
+            ),
+        )
+
+
+class FSMBufferMiddleware(BaseMiddleware):
+    """
+    Flushes the handler's ``BufferedFSMContext`` once the handler is done,
+    wrapping a plain ``FSMContext`` in one first (when the dispatcher uses
+    aiogram's FSM middleware). Keeps counters of storage calls per update.
+    """
+
+    def __init__(self) -> None:
+        self.updates = 0
+        self.requested_ops = 0
+        self.storage_ops = 0
+
+    async def __call__(
+        self,
+        handler: Callable[[Message, Dict[str, Any]], Awaitable[Any]],
+        event: Message,
+        data: Dict[str, Any],
+    ) -> Any:
+        data["fsm_buffer"] = self
+        state: Optional[FSMContext] = data.get("state")
+        if state is None:
+            return await handler(event, data)
+
+        if isinstance(state, BufferedFSMContext):
+            # Loaded by BufferedFSMContextMiddleware, the state read is counted
+            buffered, loaded_ops = state, 0
+        else:
+            # The dispatcher has read the state already
+            buffered = BufferedFSMContext(state.storage, state.key, data.get("raw_state"))
+            data["state"] = buffered
+            loaded_ops = 1
+        try:
+            return await handler(event, data)
+        finally:
+            # Writes made before an error are kept, as they would be without the buffer
+            await buffered.flush()
+            self.updates += 1
+            self.requested_ops += buffered.requested_ops + loaded_ops
+            self.storage_ops += buffered.storage_ops + loaded_ops
+
+    def stats(self) -> Dict[str, float]:
+        updates = self.updates or 1
+        return {
+            "updates": self.updates,
+            "requested_ops_per_update": round(self.requested_ops / updates, 2),
+            "storage_ops_per_update": round(self.storage_ops / updates, 2),
+        }
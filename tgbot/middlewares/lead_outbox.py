@@ -0,0 +1,20 @@
+from typing import Callable, Dict, Any, Awaitable
+
+from aiogram import BaseMiddleware
+from aiogram.types import Message
+
+from tgbot.services.lead_outbox import LeadOutbox
+
+
+class LeadOutboxMiddleware(BaseMiddleware):
+    def __init__(self, lead_outbox: LeadOutbox) -> None:
+        self.lead_outbox = lead_outbox
+
+    async def __call__(
+        self,
+        handler: Callable[[Message, Dict[str, Any]], Awaitable[Any]],
+        event: Message,
+        data: Dict[str, Any],
+    ) -> Any:
+        data["lead_outbox"] = self.lead_outbox
+        return await handler(event, data)
@@ -0,0 +1,20 @@
+from typing import Callable, Dict, Any, Awaitable
+
+from aiogram import BaseMiddleware
+from aiogram.types import Message
+
+from tgbot.services.ocr_pipeline import OcrPipeline
+
+
+class OcrPipelineMiddleware(BaseMiddleware):
+    def __init__(self, ocr_pipeline: OcrPipeline) -> None:
+        self.ocr_pipeline = ocr_pipeline
+
+    async def __call__(
+        self,
+        handler: Callable[[Message, Dict[str, Any]], Awaitable[Any]],
+        event: Message,
+        data: Dict[str, Any],
+    ) -> Any:
+        data["ocr_pipeline"] = self.ocr_pipeline
+        return await handler(event, data)
@@ -0,0 +1,20 @@
+from typing import Callable, Dict, Any, Awaitable
+
+from aiogram import BaseMiddleware
+from aiogram.types import Message
+
+from tgbot.services.photo_cache import PhotoCache
+
+
+class PhotoCacheMiddleware(BaseMiddleware):
+    def __init__(self, photo_cache: PhotoCache) -> None:
+        self.photo_cache = photo_cache
+
+    async def __call__(
+        self,
+        handler: Callable[[Message, Dict[str, Any]], Awaitable[Any]],
+        event: Message,
+        data: Dict[str, Any],
+    ) -> Any:
+        data["photo_cache"] = self.photo_cache
+        return await handler(event, data)
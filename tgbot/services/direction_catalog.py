@@ -0,0 +1,158 @@
+import bisect
+import hashlib
+import logging
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from typing import Any, Iterable, Optional
+
+from infrastructure.some_api.api import MyApi
+
+
+@dataclass
+class DirectionCatalogVersion:
+    """
+    One version of the shipment directions catalog, indexed by id.
+
+    A selection of directions is stored as a bitset over the catalog order
+    (bit ``i`` set = ``directions[i]`` selected), hex-encoded so it stays a
+    short string in any FSM storage. A mask is only meaningful together with
+    the version it was built for.
+    """
+
+    version: str
+    # (id, name) pairs in catalog order; ids are strings as in callback data
+    directions: list[tuple[str, str]]
+    by_id: dict[str, str] = field(init=False)
+    # id -> position in ``directions``, i.e. the bit of the direction in a mask
+    position: dict[str, int] = field(init=False)
+    # Names lowercased with dashes as spaces, and their sorted (word, position)
+    normalized: list[str] = field(init=False, repr=False)
+    words: list[tuple[str, int]] = field(init=False, repr=False)
+
+    def __post_init__(self) -> None:
+        self.by_id = dict(self.directions)
+        self.position = {dir_id: i for i, (dir_id, _) in enumerate(self.directions)}
+        self.normalized = [
+            " ".join(name.lower().replace("-", " ").split()) for _, name in self.directions
+        ]
+        self.words = sorted(
+            {(word, i) for i, name in enumerate(self.normalized) for word in name.split()}
+        )
+
+    def encode(self, ids: Iterable[Any]) -> str:
+        """Selection mask of the given ids, skipping ids the catalog does not know."""
+        bits = 0
+        for dir_id in ids:
+            i = self.position.get(str(dir_id))
+            if i is not None:
+                bits |= 1 << i
+        return format(bits, "x")
+
+    def decode(self, mask: Optional[str]) -> list[str]:
+        """Ids selected in the mask, in catalog order."""
+        bits = int(mask or "0", 16)
+        ids = []
+        while bits:
+            low = bits & -bits
+            i = low.bit_length() - 1
+            if i >= len(self.directions):
+                break
+            ids.append(self.directions[i][0])
+            bits ^= low
+        return ids
+
+    @staticmethod
+    def toggle(mask: Optional[str], i: int) -> tuple[str, bool]:
+        """Flip direction ``i`` in the mask; returns the new mask and whether it is now selected."""
+        bits = int(mask or "0", 16) ^ (1 << i)
+        return format(bits, "x"), bool(bits >> i & 1)
+
+    def search(self, prefix: str) -> list[int]:
+        """Positions of the directions with a word starting with ``prefix``, in catalog order."""
+        tokens = prefix.lower().replace("-", " ").split()
+        if not tokens:
+            return list(range(len(self.directions)))
+        phrase = " ".join(tokens)
+        found = set()
+        start = bisect.bisect_left(self.words, (tokens[0], -1))
+        for word, i in self.words[start:]:
+            if not word.startswith(tokens[0]):
+                break
+            found.add(i)
+        if len(tokens) > 1:
+            found = {i for i in found if f" {phrase}" in f" {self.normalized[i]}"}
+        return sorted(found)
+
+
+class DirectionCatalog:
+    """
+    Shared in-process index of the shipment directions catalog.
+
+    Drafts keep only the selected direction ids and the catalog version they
+    were chosen from; names are looked up here. The last ``keep_versions``
+    versions are kept. When a draft refers to a version that is gone (e.g.
+    after a restart or a catalog change) the newest version is used instead
+    and ids that no longer exist are dropped.
+    """
+
+    def __init__(self, keep_versions: int = 3) -> None:
+        self.keep_versions = keep_versions
+        self._versions: "OrderedDict[str, DirectionCatalogVersion]" = OrderedDict()
+        self._last_source: Optional[list] = None
+        self.log = logging.getLogger(self.__class__.__name__)
+
+    @property
+    def latest(self) -> Optional[DirectionCatalogVersion]:
+        if not self._versions:
+            return None
+        return next(reversed(self._versions.values()))
+
+    def get(self, version: Optional[str]) -> Optional[DirectionCatalogVersion]:
+        """Return the given version, or the newest one if it has expired."""
+        return self._versions.get(version) or self.latest
+
+    def get_exact(self, version: Optional[str]) -> Optional[DirectionCatalogVersion]:
+        """Return the given version only if it is still indexed (masks are tied to it)."""
+        return self._versions.get(version)
+
+    def update(self, directions: list[dict[str, Any]]) -> DirectionCatalogVersion:
+        """Index a catalog response, reusing the current version if nothing changed."""
+        # The API client serves the same cached list until it is refreshed
+        if directions is self._last_source and self.latest is not None:
+            return self.latest
+
+        pairs = [
+            (str(d.get("id")), d.get("name"))
+            for d in directions
+            if d.get("id") and d.get("name")
+        ]
+        version = hashlib.sha1(repr(pairs).encode("utf-8")).hexdigest()[:12]
+        self._last_source = directions
+        if version not in self._versions:
+            self._versions[version] = DirectionCatalogVersion(version, pairs)
+            self.log.info("Shipment directions catalog version %s (%d directions)", version, len(pairs))
+        self._versions.move_to_end(version)
+        while len(self._versions) > self.keep_versions:
+            self._versions.popitem(last=False)
+        return self._versions[version]
+
+    async def refresh(self, api: MyApi) -> Optional[DirectionCatalogVersion]:
+        """Fetch the catalog (served from the API catalog cache) and index it."""
+        status, response = await api.get_shipment_directions()
+        if status != 200 or not response:
+            return None
+        directions = response.get("results") if isinstance(response, dict) else response
+        if not isinstance(directions, list) or not directions:
+            return None
+        return self.update(directions)
+
+    def names(self, version: Optional[str], ids: Iterable[Any]) -> list[str]:
+        """Names of the selected directions, skipping ids the catalog does not know."""
+        catalog = self.get(version)
+        if catalog is None:
+            return []
+        return [catalog.by_id[str(i)] for i in ids if str(i) in catalog.by_id]
+
+
+# Shared by all handlers of this process
+direction_catalog = DirectionCatalog()
@@ -0,0 +1,141 @@
+import asyncio
+import logging
+import time
+from collections import OrderedDict
+from typing import Optional
+
+from aiogram.fsm.storage.base import BaseEventIsolation, BaseStorage, StorageKey
+from aiogram.fsm.storage.memory import MemoryStorage
+
+from tgbot.storage import SqliteStorage
+from tgbot.storage.cached import approx_size
+
+
+class DraftLifecycle:
+    """
+    Expires FSM drafts of chats that have gone quiet.
+
+    Chats are kept in an OrderedDict ordered by last activity, so the sweeper
+    only looks at the front of it: each tick it expires at most ``batch_size``
+    chats that have been idle for longer than ``idle_timeout`` and stops at the
+    first one that is still fresh. A draft is cleared under the chat's event
+    isolation lock, so it never races with an update of the same chat.
+    """
+
+    def __init__(
+        self,
+        storage: BaseStorage,
+        events_isolation: BaseEventIsolation,
+        idle_timeout: float = 24 * 3600,
+        sweep_interval: float = 60.0,
+        batch_size: int = 500,
+    ) -> None:
+        self.storage = storage
+        self.events_isolation = events_isolation
+        self.idle_timeout = idle_timeout
+        self.sweep_interval = sweep_interval
+        self.batch_size = batch_size
+        # chat key -> monotonic time of the last update, least recent first
+        self._last_seen: "OrderedDict[StorageKey, float]" = OrderedDict()
+        self._task: Optional[asyncio.Task] = None
+        self.expired = 0
+        self.reclaimed_bytes = 0
+        self.log = logging.getLogger(self.__class__.__name__)
+
+    async def start(self) -> None:
+        if isinstance(self.storage, SqliteStorage):
+            # Drafts restored from disk keep the idle time they had before the restart
+            await self.storage.open()
+            offset = time.monotonic() - time.time()
+            for key, updated_at in sorted(
+                self.storage.updated_at().items(), key=lambda item: item[1]
+            ):
+                self._last_seen.setdefault(key, updated_at + offset)
+        if self._task is None:
+            self._task = asyncio.create_task(self._sweep())
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+
+    def touch(self, key: StorageKey) -> None:
+        """Record activity in a chat."""
+        self._last_seen[key] = time.monotonic()
+        self._last_seen.move_to_end(key)
+
+    def stats(self) -> dict[str, int]:
+        return {
+            "live_drafts": self.live_drafts(),
+            # Every chat active within the idle timeout, with a draft or not
+            "tracked_chats": len(self._last_seen),
+            "expired": self.expired,
+            "reclaimed_bytes": self.reclaimed_bytes,
+        }
+
+    def live_drafts(self) -> int:
+        """Number of chats whose storage record still holds a state or data."""
+        if isinstance(self.storage, SqliteStorage):
+            return self.storage.record_count()
+        if isinstance(self.storage, MemoryStorage):
+            # Finished and cleared forms leave an empty record behind
+            return sum(
+                1
+                for record in self.storage.storage.values()
+                if record.state is not None or record.data
+            )
+        # Counting other storages would take a read per key
+        return len(self._last_seen)
+
+    async def sweep_once(self) -> int:
+        """Expire up to ``batch_size`` idle drafts and return how many were expired."""
+        deadline = time.monotonic() - self.idle_timeout
+        idle = []
+        for key, last_seen in self._last_seen.items():
+            if last_seen > deadline or len(idle) >= self.batch_size:
+                break
+            idle.append(key)
+
+        expired = 0
+        for key in idle:
+            try:
+                expired += await self._expire(key, deadline)
+            except Exception:
+                self.log.exception("Failed to expire the draft of chat %s", key.chat_id)
+        return expired
+
+    async def _sweep(self) -> None:
+        while True:
+            await asyncio.sleep(self.sweep_interval)
+            expired = await self.sweep_once()
+            if expired:
+                self.log.info(
+                    "Expired %d idle drafts, %d live, %d KB reclaimed in total",
+                    expired,
+                    self.live_drafts(),
+                    self.reclaimed_bytes // 1024,
+                )
+
+    async def _expire(self, key: StorageKey, deadline: float) -> int:
+        async with self.events_isolation.lock(key):
+            # The chat may have been active while we waited for the lock
+            if self._last_seen.get(key, deadline) > deadline:
+                return 0
+            self._last_seen.pop(key, None)
+
+            state = await self.storage.get_state(key)
+            data = await self.storage.get_data(key)
+            if isinstance(self.storage, MemoryStorage):
+                # Clearing would leave an empty record behind for every chat
+                self.storage.storage.pop(key, None)
+            elif state is not None or data:
+                await self.storage.set_state(key, None)
+                await self.storage.set_data(key, {})
+            if state is None and not data:
+                # The form was finished or cancelled, nothing to reclaim
+                return 0
+
+            self.reclaimed_bytes += approx_size(state) + approx_size(data)
+            self.expired += 1
+            return 1
@@ -0,0 +1,143 @@
+import logging
+from typing import Optional
+
+from aiogram.exceptions import TelegramBadRequest
+from aiogram.fsm.context import FSMContext
+from aiogram.types import InlineKeyboardMarkup, Message
+
+# Draft key holding the message id of the chat's form card
+FORM_CARD_KEY = "form_card_id"
+
+
+class FormCard:
+    """
+    Shows the prompts of the lead form on one message per draft.
+
+    With ``enabled``, the prompt that follows a typed answer replaces the text
+    of the chat's form card (the message whose id is kept in the draft under
+    ``FORM_CARD_KEY``) instead of being sent as a new message with the whole
+    summary again. The edit carries ``compact`` when the caller gives one
+    (the answer just saved and the next prompt), so the summary is not sent
+    again for every answer; the full summary is shown when the form is
+    confirmed. With ``delete_replies`` the user's answers are deleted as well,
+    so the card stays the last message of the chat. If the card cannot be
+    edited (deleted by the user, too old, ...) the full ``text`` is sent as a
+    new message, which becomes the card. Choice buttons edit their own message
+    through ``edit``, with the compact text as well.
+
+    Disabled, ``show`` answers with a new message and ``edit`` edits with the
+    full text, as the form always did.
+    """
+
+    def __init__(self, enabled: bool = False, delete_replies: bool = False) -> None:
+        self.enabled = enabled
+        self.delete_replies = delete_replies
+        self.sent = 0
+        self.edited = 0
+        self.fallbacks = 0
+        self.deleted = 0
+        self.log = logging.getLogger(self.__class__.__name__)
+
+    def stats(self) -> dict:
+        return {
+            "sent": self.sent,
+            "edited": self.edited,
+            "fallbacks": self.fallbacks,
+            "deleted": self.deleted,
+        }
+
+    async def show(
+        self,
+        message: Message,
+        state: FSMContext,
+        text: str,
+        reply_markup: Optional[InlineKeyboardMarkup] = None,
+        compact: Optional[str] = None,
+        notice: Optional[str] = None,
+    ) -> None:
+        """
+        Show a form prompt in the chat of ``message``.
+
+        ``message`` is either the user's answer or a bot message whose button
+        was pressed; a bot message is edited itself and becomes the card.
+        ``compact`` replaces ``text`` when the card is edited. ``notice`` is
+        sent as a message of its own before the prompt, or put on top of the
+        card.
+        """
+        if not self.enabled:
+            if notice:
+                await message.answer(notice, parse_mode="HTML")
+                self.sent += 1
+            await message.answer(text, parse_mode="HTML", reply_markup=reply_markup)
+            self.sent += 1
+            return
+
+        if notice:
+            text = f"{notice}\n\n{text}"
+            compact = f"{notice}\n\n{compact}" if compact else None
+
+        is_reply = message.from_user is not None and not message.from_user.is_bot
+        if is_reply:
+            card_id = (await state.get_data()).get(FORM_CARD_KEY)
+        else:
+            card_id = message.message_id
+
+        if card_id is None or not await self._edit(
+            message, card_id, compact or text, reply_markup
+        ):
+            sent = await message.answer(
+                text, parse_mode="HTML", reply_markup=reply_markup
+            )
+            self.sent += 1
+            card_id = sent.message_id
+        await state.update_data({FORM_CARD_KEY: card_id})
+
+        if is_reply and self.delete_replies:
+            try:
+                await message.delete()
+                self.deleted += 1
+            except TelegramBadRequest as e:
+                # Already deleted, or older than Telegram allows
+                self.log.debug("Could not delete reply %s: %s", message.message_id, e)
+
+    async def edit(
+        self,
+        message: Message,
+        state: FSMContext,
+        text: str,
+        reply_markup: Optional[InlineKeyboardMarkup] = None,
+        compact: Optional[str] = None,
+    ) -> None:
+        """Edit the bot message whose button was pressed with the next prompt."""
+        if not self.enabled:
+            await message.edit_text(text, parse_mode="HTML", reply_markup=reply_markup)
+            return
+        await message.edit_text(
+            compact or text, parse_mode="HTML", reply_markup=reply_markup
+        )
+        self.edited += 1
+        await state.update_data({FORM_CARD_KEY: message.message_id})
+
+    async def _edit(
+        self,
+        message: Message,
+        card_id: int,
+        text: str,
+        reply_markup: Optional[InlineKeyboardMarkup],
+    ) -> bool:
+        try:
+            await message.bot.edit_message_text(
+                text=text,
+                chat_id=message.chat.id,
+                message_id=card_id,
+                parse_mode="HTML",
+                reply_markup=reply_markup,
+            )
+        except TelegramBadRequest as e:
+            if "message is not modified" in str(e):
+                return True
+            self.fallbacks += 1
+            self.log.info("Form card %s not editable, sending a new one: %s", card_id, e)
+            return False
+        self.edited += 1
+        return True
@@ -0,0 +1,231 @@
+import asyncio
+import logging
+from typing import Any, Optional
+
+from aiogram import Bot
+from aiogram import exceptions
+
+from infrastructure.database.models import LeadSubmission
+from infrastructure.database.repo.requests import RequestsRepo
+from infrastructure.some_api.api import MyApi
+from tgbot.services.photo_cache import PhotoCache
+
+
+class LeadOutbox:
+    """
+    Durable outbox for confirmed leads.
+
+    ``submit`` stores the lead and returns immediately. A pool of background
+    workers delivers stored leads to the backend with retries and an
+    idempotency key, then edits the user's summary message with the result.
+    Leads survive restarts because they are only removed from the queue once
+    the backend has answered.
+    """
+
+    def __init__(
+        self,
+        session_pool,
+        bot: Bot,
+        api: MyApi,
+        photo_cache: PhotoCache,
+        workers: int = 4,
+        max_attempts: int = 8,
+        poll_interval: float = 2.0,
+    ) -> None:
+        self.session_pool = session_pool
+        self.bot = bot
+        self.api = api
+        self.photo_cache = photo_cache
+        self.workers = workers
+        self.max_attempts = max_attempts
+        self.poll_interval = poll_interval
+        self._queue: asyncio.Queue[LeadSubmission] = asyncio.Queue(
+            maxsize=workers * 2
+        )
+        self._wakeup = asyncio.Event()
+        self._tasks: list[asyncio.Task] = []
+        self.log = logging.getLogger(self.__class__.__name__)
+
+    async def start(self) -> None:
+        """Release rows interrupted by a previous shutdown and start the workers."""
+        async with self.session_pool() as session:
+            released = await RequestsRepo(session).lead_submissions.release_processing()
+        if released:
+            self.log.info("Requeued %d interrupted lead submissions", released)
+
+        self._tasks.append(asyncio.create_task(self._poll()))
+        for _ in range(self.workers):
+            self._tasks.append(asyncio.create_task(self._work()))
+
+    async def stop(self) -> None:
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks.clear()
+
+    async def submit(
+        self,
+        idempotency_key: str,
+        telegram_id: int,
+        chat_id: int,
+        message_id: Optional[int],
+        payload: dict[str, Any],
+        summary: str,
+        photo_file_id: Optional[str] = None,
+        photo_file_unique_id: Optional[str] = None,
+    ) -> Optional[LeadSubmission]:
+        """
+        Store a lead in the outbox and wake up the workers.
+        Returns None if a lead with the same idempotency key is already queued.
+        """
+        async with self.session_pool() as session:
+            submission = await RequestsRepo(session).lead_submissions.enqueue(
+                idempotency_key=idempotency_key,
+                telegram_id=telegram_id,
+                chat_id=chat_id,
+                message_id=message_id,
+                payload=payload,
+                summary=summary,
+                photo_file_id=photo_file_id,
+                photo_file_unique_id=photo_file_unique_id,
+            )
+        if submission is not None:
+            self._wakeup.set()
+        return submission
+
+    async def _poll(self) -> None:
+        while True:
+            try:
+                async with self.session_pool() as session:
+                    due = await RequestsRepo(session).lead_submissions.claim_due(
+                        limit=self._queue.maxsize
+                    )
+                for submission in due:
+                    await self._queue.put(submission)
+            except asyncio.CancelledError:
+                raise
+            except Exception:
+                self.log.exception("Failed to poll the lead outbox")
+                due = []
+
+            if due:
+                # The queue had room for a full batch; look for more right away
+                continue
+            self._wakeup.clear()
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), self.poll_interval)
+            except asyncio.TimeoutError:
+                pass
+
+    async def _work(self) -> None:
+        while True:
+            submission = await self._queue.get()
+            try:
+                await self._deliver(submission)
+            except asyncio.CancelledError:
+                raise
+            except Exception:
+                self.log.exception("Failed to deliver lead submission %s", submission.id)
+            finally:
+                self._queue.task_done()
+
+    async def _deliver(self, submission: LeadSubmission) -> None:
+        attempts = submission.attempts + 1
+        try:
+            photo_bytes = await self._download_photo(
+                submission.photo_file_id, submission.photo_file_unique_id
+            )
+            status, response = await self.api.create_lead(
+                submission.payload,
+                photo_bytes,
+                idempotency_key=submission.idempotency_key,
+            )
+        except Exception as e:
+            # Network or 5xx errors: try again later with exponential backoff
+            await self._retry_or_fail(submission, attempts, f"API submission error: {e}")
+            return
+
+        if status not in (200, 201):
+            # The backend answered definitively; retrying would not help
+            error = self._error_detail(response)
+            async with self.session_pool() as session:
+                await RequestsRepo(session).lead_submissions.mark_failed(
+                    submission.id, attempts, error
+                )
+            await self._notify_failure(submission, error)
+            return
+
+        async with self.session_pool() as session:
+            await RequestsRepo(session).lead_submissions.mark_sent(submission.id)
+        await self._notify(
+            submission,
+            "<b>✅ Success!</b>\n\n"
+            "Thank you! The lead information has been submitted successfully.",
+        )
+
+    async def _retry_or_fail(
+        self, submission: LeadSubmission, attempts: int, error: str
+    ) -> None:
+        async with self.session_pool() as session:
+            repo = RequestsRepo(session).lead_submissions
+            if attempts >= self.max_attempts:
+                await repo.mark_failed(submission.id, attempts, error)
+            else:
+                delay = min(5 * 2 ** (attempts - 1), 300)
+                await repo.reschedule(submission.id, attempts, error, delay)
+                self.log.warning(
+                    "Lead submission %s failed (attempt %d), retrying in %ss: %s",
+                    submission.id,
+                    attempts,
+                    delay,
+                    error,
+                )
+                return
+        await self._notify_failure(submission, error)
+
+    async def _download_photo(
+        self, file_id: Optional[str], file_unique_id: Optional[str] = None
+    ) -> Optional[bytes]:
+        if not file_id:
+            return None
+        try:
+            # Downloaded on the first attempt, then served from disk on retries
+            return await self.photo_cache.get(self.bot, file_id, file_unique_id)
+        except Exception as e:
+            # Continue without the photo
+            self.log.warning("Error downloading business card photo: %s", e)
+            return None
+
+    async def _notify_failure(self, submission: LeadSubmission, error: str) -> None:
+        await self._notify(
+            submission,
+            "<b>❌ Error!</b>\n\n"
+            "There was a problem submitting the lead information.\n\n"
+            f"<b>Error:</b> {error}\n\n"
+            "Please try again or contact support if the issue persists.",
+        )
+
+    async def _notify(self, submission: LeadSubmission, status_text: str) -> None:
+        text = f"{submission.summary}\n\n{status_text}"
+        try:
+            if submission.message_id:
+                await self.bot.edit_message_text(
+                    text,
+                    chat_id=submission.chat_id,
+                    message_id=submission.message_id,
+                    parse_mode="HTML",
+                )
+            else:
+                await self.bot.send_message(
+                    submission.chat_id, text, parse_mode="HTML"
+                )
+        except exceptions.TelegramAPIError as e:
+            self.log.warning(
+                "Could not report status of lead submission %s: %s", submission.id, e
+            )
+
+    @staticmethod
+    def _error_detail(response: Any) -> str:
+        if isinstance(response, dict):
+            return response.get("detail") or response.get("error", "Unknown error")
+        return "Unknown error"
@@ -0,0 +1,156 @@
+import asyncio
+import time
+from collections import OrderedDict, deque
+from typing import Generic, Hashable, Optional, TypeVar
+
+T = TypeVar("T")
+
+
+class AdmissionRejected(Exception):
+    """The job cannot be admitted: the queue is full or the wait would be too long."""
+
+
+class FairAdmission(Generic[T]):
+    """
+    Admission controller with a global and a per-user concurrency cap.
+
+    Waiting jobs are kept in one queue per user and handed out round-robin,
+    so a user who uploads ten cards does not delay everybody else's first one.
+    Jobs are rejected up front when the queue is full or when the expected
+    wait is longer than ``deadline``, and jobs that still waited longer than
+    that are dropped by ``acquire`` so the caller can fall back right away.
+    """
+
+    def __init__(
+        self,
+        max_in_flight: int = 4,
+        per_user_limit: int = 1,
+        max_queue: int = 100,
+        deadline: float = 20.0,
+    ) -> None:
+        self.max_in_flight = max_in_flight
+        self.per_user_limit = per_user_limit
+        self.max_queue = max_queue
+        self.deadline = deadline
+        # user -> waiting (job, enqueued_at), users in round-robin order
+        self._waiting: "OrderedDict[Hashable, deque[tuple[T, float]]]" = OrderedDict()
+        self._queued = 0
+        self._in_flight: dict[Hashable, int] = {}
+        self._in_flight_total = 0
+        self._changed = asyncio.Event()
+        # Moving average of how long one job takes, to estimate waits
+        self._avg_service_time = 5.0
+        self.admitted = 0
+        self.rejected = 0
+        self.expired = 0
+
+    def submit(self, user: Hashable, job: T) -> int:
+        """
+        Queue a job and return its position in the queue (1 is next).
+        Raises AdmissionRejected if the job should not wait at all.
+        """
+        if self._queued >= self.max_queue:
+            self.rejected += 1
+            raise AdmissionRejected("queue is full")
+        position = self._position_of_new(user)
+        if self.expected_wait(position) > self.deadline:
+            self.rejected += 1
+            raise AdmissionRejected("expected wait exceeds the deadline")
+
+        self._waiting.setdefault(user, deque()).append((job, time.monotonic()))
+        self._queued += 1
+        self._changed.set()
+        return position
+
+    async def acquire(self) -> tuple[Hashable, T, bool]:
+        """
+        Wait for the next job that may run.
+        Returns ``(user, job, expired)``; expired jobs hold no slot and must not run.
+        """
+        while (user := self._next_user()) is None:
+            self._changed.clear()
+            await self._changed.wait()
+
+        waiting = self._waiting[user]
+        job, enqueued_at = waiting.popleft()
+        self._queued -= 1
+        if waiting:
+            # Round-robin: this user goes to the back of the line
+            self._waiting.move_to_end(user)
+        else:
+            del self._waiting[user]
+
+        if time.monotonic() - enqueued_at > self.deadline:
+            self.expired += 1
+            return user, job, True
+
+        self._in_flight[user] = self._in_flight.get(user, 0) + 1
+        self._in_flight_total += 1
+        self.admitted += 1
+        return user, job, False
+
+    def release(self, user: Hashable, service_time: Optional[float] = None) -> None:
+        """Free the slot taken by ``acquire`` once the job has finished."""
+        self._in_flight_total -= 1
+        self._in_flight[user] -= 1
+        if not self._in_flight[user]:
+            del self._in_flight[user]
+        if service_time is not None:
+            self._avg_service_time = 0.8 * self._avg_service_time + 0.2 * service_time
+        self._changed.set()
+
+    def pop_expired(self) -> list[tuple[Hashable, T]]:
+        """Remove and return the jobs that have waited longer than the deadline."""
+        now = time.monotonic()
+        expired = []
+        for user in list(self._waiting):
+            waiting = self._waiting[user]
+            # Jobs of one user are queued in order, so expired ones are at the front
+            while waiting and now - waiting[0][1] > self.deadline:
+                expired.append((user, waiting.popleft()[0]))
+            if not waiting:
+                del self._waiting[user]
+        self._queued -= len(expired)
+        self.expired += len(expired)
+        return expired
+
+    def expected_wait(self, position: int) -> float:
+        """Rough wait of the job at ``position``, from the average service time."""
+        free = self.max_in_flight - self._in_flight_total
+        if position <= free:
+            return 0.0
+        return (position - free) / self.max_in_flight * self._avg_service_time
+
+    @property
+    def queue_depth(self) -> int:
+        return self._queued
+
+    def stats(self) -> dict[str, int]:
+        return {
+            "queue_depth": self._queued,
+            "in_flight": self._in_flight_total,
+            "admitted": self.admitted,
+            "rejected": self.rejected,
+            "expired": self.expired,
+        }
+
+    def _next_user(self) -> Optional[Hashable]:
+        if self._in_flight_total >= self.max_in_flight:
+            return None
+        for user in self._waiting:
+            if self._in_flight.get(user, 0) < self.per_user_limit:
+                return user
+        return None
+
+    def _position_of_new(self, user: Hashable) -> int:
+        # A new job of this user is dispatched after its own waiting jobs and,
+        # round-robin, after one more job from every user queued before it.
+        own = len(self._waiting.get(user, ()))
+        ahead = own
+        before = True
+        for other, waiting in self._waiting.items():
+            if other == user:
+                before = False
+                continue
+            ahead += min(len(waiting), own + 1 if before else own)
+        return ahead + 1
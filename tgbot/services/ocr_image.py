@@ -0,0 +1,118 @@
+import asyncio
+import io
+import logging
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+from typing import Optional, Sequence
+
+from aiogram.types import PhotoSize
+
+try:
+    from PIL import Image
+except ImportError:  # Pillow is optional, without it photos are uploaded as-is
+    Image = None
+
+
+def choose_photo_size(photos: Sequence[PhotoSize], min_side: int) -> PhotoSize:
+    """
+    Return the smallest photo size whose shorter side is at least ``min_side``.
+    Falls back to the largest size when none of them is big enough.
+    """
+    by_area = sorted(photos, key=lambda p: p.width * p.height)
+    for photo in by_area:
+        if min(photo.width, photo.height) >= min_side:
+            return photo
+    return by_area[-1]
+
+
+def recompress_jpeg(data: bytes, max_side: int, quality: int) -> bytes:
+    """
+    Downscale the image so that its longer side is at most ``max_side`` and
+    re-encode it as JPEG. Runs in a worker process.
+    """
+    with Image.open(io.BytesIO(data)) as image:
+        image = image.convert("RGB")
+        image.thumbnail((max_side, max_side))
+        output = io.BytesIO()
+        image.save(output, format="JPEG", quality=quality, optimize=True)
+    result = output.getvalue()
+    return result if len(result) < len(data) else data
+
+
+class OcrImagePreparer:
+    """
+    Prepares business card photos for the OCR upload.
+
+    The smallest Telegram photo size that still meets the OCR resolution target
+    is downloaded, and it can be downscaled and recompressed in a process pool
+    so that the event loop never does image work.
+    """
+
+    def __init__(
+        self,
+        min_side: int = 1000,
+        max_side: int = 1600,
+        jpeg_quality: int = 85,
+        recompress: bool = True,
+        workers: int = 2,
+    ) -> None:
+        self.min_side = min_side
+        self.max_side = max_side
+        self.jpeg_quality = jpeg_quality
+        self.workers = workers
+        self.log = logging.getLogger(self.__class__.__name__)
+        if recompress and Image is None:
+            self.log.warning("Pillow is not installed, OCR photos are not recompressed")
+        self.recompress = recompress and Image is not None
+        self._executor: Optional[ProcessPoolExecutor] = None
+        self.cards = 0
+        self.bytes_saved = 0
+
+    def choose(self, photos: Sequence[PhotoSize]) -> PhotoSize:
+        return choose_photo_size(photos, self.min_side)
+
+    async def prepare(
+        self, data: bytes, original_size: Optional[int] = None
+    ) -> bytes:
+        """
+        Return the bytes to upload for OCR.
+        :param data: The downloaded photo.
+        :param original_size: Size of the largest available photo, to report the saving.
+        """
+        prepared = data
+        if self.recompress:
+            try:
+                prepared = await asyncio.get_running_loop().run_in_executor(
+                    self._get_executor(),
+                    recompress_jpeg,
+                    data,
+                    self.max_side,
+                    self.jpeg_quality,
+                )
+            except Exception as e:
+                self.log.warning("Could not recompress OCR photo: %s", e)
+
+        saved = max((original_size or len(data)) - len(prepared), 0)
+        self.cards += 1
+        self.bytes_saved += saved
+        self.log.info(
+            "OCR photo: %d bytes uploaded, %d bytes saved", len(prepared), saved
+        )
+        return prepared
+
+    def stats(self) -> dict[str, int]:
+        return {"cards": self.cards, "bytes_saved": self.bytes_saved}
+
+    async def close(self) -> None:
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
+
+    def _get_executor(self) -> ProcessPoolExecutor:
+        if self._executor is None:
+            # spawn: forking a process that runs an event loop and threads is unsafe
+            self._executor = ProcessPoolExecutor(
+                max_workers=self.workers,
+                mp_context=multiprocessing.get_context("spawn"),
+            )
+        return self._executor
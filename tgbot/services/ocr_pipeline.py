@@ -0,0 +1,274 @@
+import asyncio
+import logging
+import time
+from dataclasses import dataclass
+from html import escape
+from typing import Any, Optional
+
+from aiogram import Bot
+from aiogram import exceptions
+from aiogram.fsm.context import FSMContext
+from aiogram.fsm.storage.base import BaseEventIsolation, BaseStorage, StorageKey
+from aiogram.types import InlineKeyboardButton, InlineKeyboardMarkup, PhotoSize
+
+from infrastructure.some_api.api import MyApi
+from tgbot.services.ocr_admission import AdmissionRejected, FairAdmission
+from tgbot.services.ocr_image import OcrImagePreparer
+from tgbot.services.photo_cache import PhotoCache
+
+# Lead form field -> keys of the OCR response that can fill it
+OCR_CONTACT_FIELDS = {
+    "full_name": ("full_name",),
+    "position": ("position",),
+    "phone_number": ("phone", "phone_number"),
+    "email": ("email",),
+    "company_name": ("company_name",),
+    "company_address": ("company_address",),
+}
+
+OCR_FIELD_LABELS = {
+    "full_name": "📝 Name",
+    "position": "🏢 Position",
+    "phone_number": "📱 Phone",
+    "email": "📧 Email",
+    "company_name": "🏭 Company",
+    "company_address": "🏢 Address",
+}
+
+
+def ocr_contact_values(extracted_data: dict) -> dict[str, Any]:
+    """Map an OCR response to the lead form fields it can fill."""
+    values = {}
+    for field, keys in OCR_CONTACT_FIELDS.items():
+        value = next((extracted_data.get(k) for k in keys if extracted_data.get(k)), None)
+        if value:
+            values[field] = value
+    return values
+
+
+@dataclass
+class OcrJob:
+    """A business card photo waiting for OCR, and the lead draft it belongs to."""
+
+    key: StorageKey
+    draft_id: Optional[str]
+    # The size sent to OCR, chosen for readability rather than resolution
+    photo: PhotoSize
+    original_size: Optional[int] = None
+    # The photo kept in the draft and submitted with the lead (the largest size)
+    card_file_id: Optional[str] = None
+
+
+class OcrPipeline:
+    """
+    Runs business card OCR in the background.
+
+    The photo handler only enqueues a job and moves the form on to the next
+    step. Workers download, prepare and recognise the photo, then merge the
+    result into the draft as ``extracted_data``. The result is only a
+    suggestion: fields the user has already typed are never overwritten. The
+    merge takes the same per-chat lock as the dispatcher's event isolation,
+    so it never races with the user's own updates.
+
+    Jobs go through a ``FairAdmission`` controller: at most ``max_in_flight``
+    OCR calls run at once and ``per_user_limit`` per user, users are served
+    round-robin, and jobs that would wait longer than ``deadline`` are shed
+    so the user continues manually instead of waiting for a timeout.
+    """
+
+    def __init__(
+        self,
+        storage: BaseStorage,
+        events_isolation: BaseEventIsolation,
+        bot: Bot,
+        api: MyApi,
+        photo_cache: PhotoCache,
+        ocr_image: OcrImagePreparer,
+        max_in_flight: int = 4,
+        per_user_limit: int = 1,
+        queue_size: int = 100,
+        deadline: float = 20.0,
+        sweep_interval: float = 1.0,
+    ) -> None:
+        self.storage = storage
+        self.events_isolation = events_isolation
+        self.bot = bot
+        self.api = api
+        self.photo_cache = photo_cache
+        self.ocr_image = ocr_image
+        self.admission: FairAdmission[OcrJob] = FairAdmission(
+            max_in_flight=max_in_flight,
+            per_user_limit=per_user_limit,
+            max_queue=queue_size,
+            deadline=deadline,
+        )
+        self.sweep_interval = sweep_interval
+        self._tasks: list[asyncio.Task] = []
+        self.processed = 0
+        self.failed = 0
+        self.log = logging.getLogger(self.__class__.__name__)
+
+    async def start(self) -> None:
+        self._tasks.append(asyncio.create_task(self._sweep()))
+        for _ in range(self.admission.max_in_flight):
+            self._tasks.append(asyncio.create_task(self._work()))
+
+    async def stop(self) -> None:
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks.clear()
+
+    def submit(self, job: OcrJob) -> Optional[int]:
+        """
+        Queue a photo for OCR and return its position in the queue.
+        Returns None if the photo was not admitted and should be entered manually.
+        """
+        try:
+            position = self.admission.submit(job.key.user_id, job)
+        except AdmissionRejected as e:
+            self.log.info("OCR job for chat %s shed: %s", job.key.chat_id, e)
+            return None
+        self.log.debug("OCR queue depth: %d", self.admission.queue_depth)
+        return position
+
+    def is_busy(self, position: int) -> bool:
+        """Whether the job at ``position`` has to wait for a free OCR slot."""
+        return self.admission.expected_wait(position) > 0
+
+    def stats(self) -> dict[str, int]:
+        return {
+            **self.admission.stats(),
+            "processed": self.processed,
+            "failed": self.failed,
+        }
+
+    async def _work(self) -> None:
+        while True:
+            user, job, expired = await self.admission.acquire()
+            if expired:
+                try:
+                    await self._shed(job)
+                except Exception:
+                    self.log.exception("Failed to shed OCR job for chat %s", job.key.chat_id)
+                continue
+            started = time.monotonic()
+            try:
+                await self._process(job)
+            except asyncio.CancelledError:
+                raise
+            except Exception:
+                self.log.exception("Failed to process OCR job for chat %s", job.key.chat_id)
+            finally:
+                self.admission.release(user, time.monotonic() - started)
+
+    async def _sweep(self) -> None:
+        """Shed jobs that waited past the deadline even while every slot is busy."""
+        while True:
+            await asyncio.sleep(self.sweep_interval)
+            for _, job in self.admission.pop_expired():
+                try:
+                    await self._shed(job)
+                except Exception:
+                    self.log.exception("Failed to shed OCR job for chat %s", job.key.chat_id)
+
+    async def _shed(self, job: OcrJob) -> None:
+        self.log.info("OCR job for chat %s expired in the queue", job.key.chat_id)
+        if await self._merge(job, {}) is None:
+            return
+        try:
+            await self.bot.send_message(
+                job.key.chat_id,
+                "<b>⚠️ Business card reading is busy right now.</b>\n\n"
+                "Please continue filling in the form manually.",
+                parse_mode="HTML",
+            )
+        except exceptions.TelegramAPIError as e:
+            self.log.warning("Could not report OCR result to chat %s: %s", job.key.chat_id, e)
+
+    async def _process(self, job: OcrJob) -> None:
+        extracted_data = await self._recognize(job)
+        if extracted_data:
+            self.processed += 1
+        else:
+            self.failed += 1
+
+        data = await self._merge(job, extracted_data)
+        if data is not None:
+            await self._notify(job, extracted_data, data)
+
+    async def _recognize(self, job: OcrJob) -> dict:
+        # A card sent again is answered from the OCR cache without being
+        # downloaded and recompressed
+        cached = self.api.cached_business_card_ocr(job.photo.file_unique_id)
+        if cached is not None:
+            return cached[1].get("extracted_data") or {}
+        try:
+            file_content = await self.photo_cache.get(
+                self.bot, job.photo.file_id, job.photo.file_unique_id
+            )
+            upload = await self.ocr_image.prepare(file_content, job.original_size)
+            status, response = await self.api.business_card_photo_ocr(
+                upload, file_unique_id=job.photo.file_unique_id
+            )
+        except Exception as e:
+            self.log.warning("Error processing business card photo: %s", e)
+            return {}
+        if status == 200 and response:
+            return response.get("extracted_data") or {}
+        return {}
+
+    async def _merge(self, job: OcrJob, extracted_data: dict) -> Optional[dict]:
+        """
+        Store the OCR result in the draft.
+        Returns the updated draft data, or None if the draft has moved on.
+        """
+        async with self.events_isolation.lock(job.key):
+            state = FSMContext(storage=self.storage, key=job.key)
+            data = await state.get_data()
+            if (
+                data.get("draft_id") != job.draft_id
+                or data.get("business_card_photo") != (job.card_file_id or job.photo.file_id)
+            ):
+                # The form was restarted, or the photo was skipped or replaced
+                return None
+            return await state.update_data(
+                extracted_data=extracted_data,
+                ocr_processed=bool(extracted_data),
+                ocr_pending=False,
+            )
+
+    async def _notify(self, job: OcrJob, extracted_data: dict, data: dict) -> None:
+        values = ocr_contact_values(extracted_data)
+        if not values:
+            text = (
+                "<b>⚠️ Could not extract information from the business card.</b>\n\n"
+                "Please continue filling in the form manually."
+            )
+            markup = None
+        else:
+            lines = "\n".join(
+                f"{OCR_FIELD_LABELS[field]}: {escape(str(value))}"
+                for field, value in values.items()
+            )
+            text = f"<b>✅ Information extracted:</b>\n\n{lines}"
+            if any(not data.get(field) for field in values):
+                text += "\n\nIt will be suggested on the next steps, or you can use it for all empty fields now."
+                markup = InlineKeyboardMarkup(
+                    inline_keyboard=[
+                        [
+                            InlineKeyboardButton(
+                                text="✅ Fill Empty Fields", callback_data="ocr:confirm"
+                            )
+                        ]
+                    ]
+                )
+            else:
+                markup = None
+
+        try:
+            await self.bot.send_message(
+                job.key.chat_id, text, parse_mode="HTML", reply_markup=markup
+            )
+        except exceptions.TelegramAPIError as e:
+            self.log.warning("Could not report OCR result to chat %s: %s", job.key.chat_id, e)
@@ -0,0 +1,169 @@
+import asyncio
+import logging
+import os
+import time
+from collections import OrderedDict
+from typing import Optional
+
+from aiogram import Bot
+
+
+class PhotoCache:
+    """
+    Bounded on-disk cache of Telegram photos, keyed by ``file_unique_id``.
+
+    The business card is downloaded once when it is uploaded for OCR and the
+    same bytes are reused when the lead is submitted. Entries are evicted in
+    LRU order once the cache is larger than ``max_bytes`` and dropped when
+    they are older than ``max_age``. ``get_file`` results are cached as well,
+    for as long as Telegram keeps the download link valid.
+    """
+
+    def __init__(
+        self,
+        directory: str,
+        max_bytes: int = 200 * 1024 * 1024,
+        max_age: float = 24 * 3600,
+        file_info_ttl: float = 55 * 60,
+    ) -> None:
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self.max_age = max_age
+        self.file_info_ttl = file_info_ttl
+        # file_unique_id -> (size, stored_at), least recently used first
+        self._entries: "OrderedDict[str, tuple[int, float]]" = OrderedDict()
+        self._total_bytes = 0
+        # file_id -> file_unique_id, so callers that only know file_id still hit the cache
+        self._unique_ids: dict[str, str] = {}
+        # file_id -> (file_path, expires_at)
+        self._file_paths: dict[str, tuple[str, float]] = {}
+        self.hits = 0
+        self.misses = 0
+        self.log = logging.getLogger(self.__class__.__name__)
+
+    async def start(self) -> None:
+        """Create the cache directory and index the photos already stored in it."""
+        entries = await asyncio.to_thread(self._scan)
+        for unique_id, size, stored_at in sorted(entries, key=lambda e: e[2]):
+            self._entries[unique_id] = (size, stored_at)
+            self._total_bytes += size
+        self.log.info(
+            "Photo cache has %d photos (%d bytes)", len(self._entries), self._total_bytes
+        )
+
+    async def get(
+        self, bot: Bot, file_id: str, file_unique_id: Optional[str] = None
+    ) -> bytes:
+        """Return the photo bytes, downloading them from Telegram only on a miss."""
+        unique_id = file_unique_id or self._unique_ids.get(file_id)
+        if unique_id:
+            self._unique_ids[file_id] = unique_id
+            data = await self._read(unique_id)
+            if data is not None:
+                self.hits += 1
+                return data
+
+        self.misses += 1
+        file_path = await self.get_file_path(bot, file_id)
+        buffer = await bot.download_file(file_path)
+        data = buffer.read()
+        if unique_id:
+            await self._write(unique_id, data)
+        return data
+
+    async def get_file_path(self, bot: Bot, file_id: str) -> str:
+        """Return the Telegram download path of a file, cached while it stays valid."""
+        cached = self._file_paths.get(file_id)
+        if cached and cached[1] > time.monotonic():
+            return cached[0]
+        file = await bot.get_file(file_id)
+        if len(self._file_paths) >= 1024:
+            now = time.monotonic()
+            self._file_paths = {
+                f: cached for f, cached in self._file_paths.items() if cached[1] > now
+            }
+        self._file_paths[file_id] = (file.file_path, time.monotonic() + self.file_info_ttl)
+        return file.file_path
+
+    def stats(self) -> dict[str, int]:
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "photos": len(self._entries),
+            "bytes": self._total_bytes,
+        }
+
+    def _path(self, unique_id: str) -> str:
+        return os.path.join(self.directory, f"{unique_id}.jpg")
+
+    async def _read(self, unique_id: str) -> Optional[bytes]:
+        entry = self._entries.get(unique_id)
+        if entry is None:
+            return None
+        if time.time() - entry[1] > self.max_age:
+            self._evict(unique_id)
+            return None
+        try:
+            data = await asyncio.to_thread(self._read_file, self._path(unique_id))
+        except OSError:
+            self._evict(unique_id)
+            return None
+        self._entries.move_to_end(unique_id)
+        return data
+
+    async def _write(self, unique_id: str, data: bytes) -> None:
+        try:
+            await asyncio.to_thread(self._write_file, self._path(unique_id), data)
+        except OSError as e:
+            self.log.warning("Could not cache photo %s: %s", unique_id, e)
+            return
+        if unique_id in self._entries:
+            self._total_bytes -= self._entries[unique_id][0]
+        self._entries[unique_id] = (len(data), time.time())
+        self._entries.move_to_end(unique_id)
+        self._total_bytes += len(data)
+        self._shrink()
+
+    def _shrink(self) -> None:
+        now = time.time()
+        expired = [
+            unique_id
+            for unique_id, (_, stored_at) in self._entries.items()
+            if now - stored_at > self.max_age
+        ]
+        for unique_id in expired:
+            self._evict(unique_id)
+        while self._total_bytes > self.max_bytes and len(self._entries) > 1:
+            self._evict(next(iter(self._entries)))
+
+    def _evict(self, unique_id: str) -> None:
+        size, _ = self._entries.pop(unique_id)
+        self._total_bytes -= size
+        for file_id in [f for f, u in self._unique_ids.items() if u == unique_id]:
+            del self._unique_ids[file_id]
+        try:
+            os.remove(self._path(unique_id))
+        except OSError:
+            pass
+
+    def _scan(self) -> list[tuple[str, int, float]]:
+        os.makedirs(self.directory, exist_ok=True)
+        entries = []
+        for entry in os.scandir(self.directory):
+            if entry.is_file() and entry.name.endswith(".jpg"):
+                stat = entry.stat()
+                entries.append((entry.name[: -len(".jpg")], stat.st_size, stat.st_mtime))
+        return entries
+
+    @staticmethod
+    def _read_file(path: str) -> bytes:
+        with open(path, "rb") as f:
+            return f.read()
+
+    @staticmethod
+    def _write_file(path: str, data: bytes) -> None:
+        # Write to a temporary file first so a crash never leaves a truncated photo
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, "wb") as f:
+            f.write(data)
+        os.replace(tmp_path, path)
@@ -0,0 +1,15 @@
+"""FSM storage backends."""
+
+from .cached import CachedStorage
+from .compact_redis import CompactRedisStorage
+from .redis_client import ClusterRedisStorage, HashTagKeyBuilder, create_redis
+from .sqlite import SqliteStorage
+
+__all__ = [
+    "CachedStorage",
+    "ClusterRedisStorage",
+    "CompactRedisStorage",
+    "HashTagKeyBuilder",
+    "SqliteStorage",
+    "create_redis",
+]
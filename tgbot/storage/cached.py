@@ -0,0 +1,258 @@
+import asyncio
+import copy
+import logging
+import sys
+import time
+import uuid
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Any, Dict, Mapping, Optional, Tuple
+
+from aiogram.fsm.state import State
+from aiogram.fsm.storage.base import BaseEventIsolation, BaseStorage, StateType, StorageKey
+from redis.asyncio import Redis
+
+_MISSING: Any = object()
+
+
+def approx_size(value: Any) -> int:
+    """Rough number of bytes a JSON-like value takes in memory."""
+    size = sys.getsizeof(value)
+    if isinstance(value, dict):
+        size += sum(approx_size(k) + approx_size(v) for k, v in value.items())
+    elif isinstance(value, (list, tuple, set, frozenset)):
+        size += sum(approx_size(v) for v in value)
+    return size
+
+
+@dataclass
+class _Entry:
+    state: Any = _MISSING
+    data: Any = _MISSING
+    size: int = 0
+    expires_at: float = 0.0
+
+
+class CachedStorage(BaseStorage):
+    """
+    Two-tier FSM storage: a bounded in-process LRU in front of a Redis storage.
+
+    Reads are served from memory when the chat was touched recently; writes go
+    to Redis first and then update the local copy. Every write is announced
+    on a pub/sub channel so other bot replicas drop their copy of the chat.
+    Entries also expire after ``ttl`` seconds, which bounds staleness if an
+    invalidation message is lost.
+
+    The bot reads each update's state and data through ``get_state_and_data``
+    (see ``BufferedFSMContextMiddleware``): a miss is one call to the inner
+    storage, a single HMGET with ``CompactRedisStorage``.
+    """
+
+    def __init__(
+        self,
+        storage: BaseStorage,
+        redis: Redis,
+        max_entries: int = 1000,
+        ttl: float = 30.0,
+        channel: str = "fsm:invalidate",
+    ) -> None:
+        self.storage = storage
+        self.redis = redis
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.channel = channel
+        self.instance_id = uuid.uuid4().hex[:8]
+        self._entries: "OrderedDict[StorageKey, _Entry]" = OrderedDict()
+        self._bytes = 0
+        self._listener: Optional[asyncio.Task] = None
+        self.hits = 0
+        self.misses = 0
+        self.invalidations = 0
+        self.log = logging.getLogger(self.__class__.__name__)
+
+    async def start(self) -> None:
+        """Start listening for invalidations from other replicas."""
+        if self._listener is None:
+            self._listener = asyncio.create_task(self._listen())
+
+    def create_isolation(self, **kwargs: Any) -> BaseEventIsolation:
+        return self.storage.create_isolation(**kwargs)
+
+    async def set_state(self, key: StorageKey, state: StateType = None) -> None:
+        await self.storage.set_state(key, state)
+        self._remember(key, state=state.state if isinstance(state, State) else state)
+        await self._publish(key)
+
+    async def get_state(self, key: StorageKey) -> Optional[str]:
+        entry = self._lookup(key)
+        if entry is not None and entry.state is not _MISSING:
+            self.hits += 1
+            return entry.state
+        self.misses += 1
+        state = await self.storage.get_state(key)
+        self._remember(key, state=state)
+        return state
+
+    async def set_data(self, key: StorageKey, data: Mapping[str, Any]) -> None:
+        await self.storage.set_data(key, data)
+        self._remember(key, data=copy.deepcopy(dict(data)))
+        await self._publish(key)
+
+    async def get_data(self, key: StorageKey) -> Dict[str, Any]:
+        entry = self._lookup(key)
+        if entry is not None and entry.data is not _MISSING:
+            self.hits += 1
+            return copy.deepcopy(entry.data)
+        self.misses += 1
+        data = await self.storage.get_data(key)
+        self._remember(key, data=copy.deepcopy(data))
+        return data
+
+    async def set_state_and_data(
+        self, key: StorageKey, state: StateType, data: Mapping[str, Any]
+    ) -> None:
+        set_both = getattr(self.storage, "set_state_and_data", None)
+        if set_both is not None:
+            await set_both(key, state, data)
+        else:
+            await self.storage.set_state(key, state)
+            await self.storage.set_data(key, data)
+        self._remember(
+            key,
+            state=state.state if isinstance(state, State) else state,
+            data=copy.deepcopy(dict(data)),
+        )
+        await self._publish(key)
+
+    async def get_state_and_data(
+        self, key: StorageKey
+    ) -> Tuple[Optional[str], Dict[str, Any]]:
+        entry = self._lookup(key)
+        if entry is not None and entry.state is not _MISSING and entry.data is not _MISSING:
+            self.hits += 1
+            return entry.state, copy.deepcopy(entry.data)
+        self.misses += 1
+        get_both = getattr(self.storage, "get_state_and_data", None)
+        if get_both is not None:
+            state, data = await get_both(key)
+        else:
+            state = await self.storage.get_state(key)
+            data = await self.storage.get_data(key)
+        self._remember(key, state=state, data=copy.deepcopy(data))
+        return state, data
+
+    def stats(self) -> Dict[str, Any]:
+        lookups = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / lookups * 100, 1) if lookups else 0.0,
+            "entries": len(self._entries),
+            "bytes": self._bytes,
+            "invalidations": self.invalidations,
+        }
+
+    async def close(self) -> None:
+        if self._listener is not None:
+            self._listener.cancel()
+            await asyncio.gather(self._listener, return_exceptions=True)
+            self._listener = None
+        self._entries.clear()
+        self._bytes = 0
+        await self.storage.close()
+
+    def _lookup(self, key: StorageKey) -> Optional[_Entry]:
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        if entry.expires_at < time.monotonic():
+            self._forget(key)
+            return None
+        self._entries.move_to_end(key)
+        return entry
+
+    def _remember(self, key: StorageKey, state: Any = _MISSING, data: Any = _MISSING) -> None:
+        entry = self._entries.get(key)
+        if entry is None:
+            entry = self._entries[key] = _Entry()
+        else:
+            self._bytes -= entry.size
+        if state is not _MISSING:
+            entry.state = state
+        if data is not _MISSING:
+            entry.data = data
+        entry.size = approx_size(entry.state) + (
+            approx_size(entry.data) if entry.data is not _MISSING else 0
+        )
+        entry.expires_at = time.monotonic() + self.ttl
+        self._bytes += entry.size
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._forget(next(iter(self._entries)))
+
+    def _forget(self, key: StorageKey) -> None:
+        entry = self._entries.pop(key, None)
+        if entry is not None:
+            self._bytes -= entry.size
+
+    @staticmethod
+    def _encode_key(key: StorageKey) -> str:
+        return "|".join(
+            str(part or "")
+            for part in (
+                key.bot_id,
+                key.chat_id,
+                key.user_id,
+                key.thread_id,
+                key.business_connection_id,
+                key.destiny,
+            )
+        )
+
+    @staticmethod
+    def _decode_key(value: str) -> StorageKey:
+        bot_id, chat_id, user_id, thread_id, business_connection_id, destiny = value.split("|")
+        return StorageKey(
+            bot_id=int(bot_id),
+            chat_id=int(chat_id),
+            user_id=int(user_id),
+            thread_id=int(thread_id) if thread_id else None,
+            business_connection_id=business_connection_id or None,
+            destiny=destiny,
+        )
+
+    async def _publish(self, key: StorageKey) -> None:
+        try:
+            await self.redis.publish(
+                self.channel, f"{self.instance_id}|{self._encode_key(key)}"
+            )
+        except Exception as e:
+            # Other replicas fall back to the entry TTL
+            self.log.warning("Could not publish FSM invalidation: %s", e)
+
+    async def _listen(self) -> None:
+        while True:
+            try:
+                async with self.redis.pubsub(ignore_subscribe_messages=True) as pubsub:
+                    await pubsub.subscribe(self.channel)
+                    async for message in pubsub.listen():
+                        self._on_invalidation(message["data"])
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                # Messages may have been missed while disconnected
+                self.log.warning("FSM invalidation listener failed: %s", e)
+                self._entries.clear()
+                self._bytes = 0
+                await asyncio.sleep(1)
+
+    def _on_invalidation(self, payload: Any) -> None:
+        if isinstance(payload, bytes):
+            payload = payload.decode("utf-8")
+        instance_id, _, encoded_key = payload.partition("|")
+        if instance_id == self.instance_id:
+            return
+        key = self._decode_key(encoded_key)
+        if key in self._entries:
+            self._forget(key)
+            self.invalidations += 1
@@ -0,0 +1,148 @@
+import zlib
+from typing import Any, Dict, Mapping, Optional, Tuple
+
+import msgpack
+from aiogram.fsm.state import State
+from aiogram.fsm.storage.base import BaseEventIsolation, BaseStorage, StateType, StorageKey
+from aiogram.fsm.storage.redis import RedisEventIsolation
+from redis.asyncio import Redis
+
+from tgbot.storage.redis_client import RedisClient, close_redis
+
+# First byte of a stored data payload
+_RAW = b"\x00"
+_ZLIB = b"\x01"
+
+STATE_FIELD = "s"
+DATA_FIELD = "d"
+
+
+def _default(value: Any) -> Any:
+    # Sets (e.g. selected directions) and tuples are stored as lists
+    if isinstance(value, (set, frozenset, tuple)):
+        return list(value)
+    raise TypeError(f"Cannot serialize {type(value).__name__}")
+
+
+class CompactRedisStorage(BaseStorage):
+    """
+    FSM storage that keeps the state and data of a chat in a single Redis hash.
+
+    Compared with aiogram's ``RedisStorage`` the key is short, the data is
+    serialized with msgpack and zlib-compressed once it is larger than
+    ``compress_threshold`` bytes, both fields share one TTL that is renewed on
+    every write, and ``get_state_and_data`` / ``set_state_and_data`` read or
+    write both of them in one round trip. With ``hash_tag`` the chat id is put
+    in a ``{hash tag}`` so that keys spread over a Redis Cluster by chat.
+    """
+
+    def __init__(
+        self,
+        redis: RedisClient,
+        ttl: Optional[int] = None,
+        compress_threshold: int = 1024,
+        prefix: str = "fsm",
+        hash_tag: bool = False,
+    ) -> None:
+        self.redis = redis
+        self.ttl = ttl
+        self.compress_threshold = compress_threshold
+        self.prefix = prefix
+        self.hash_tag = hash_tag
+
+    @classmethod
+    def from_url(cls, url: str, **kwargs: Any) -> "CompactRedisStorage":
+        return cls(redis=Redis.from_url(url), **kwargs)
+
+    def create_isolation(self, **kwargs: Any) -> BaseEventIsolation:
+        return RedisEventIsolation(redis=self.redis, **kwargs)
+
+    def build_key(self, key: StorageKey) -> str:
+        chat = f"{{{key.chat_id}}}" if self.hash_tag else str(key.chat_id)
+        parts = [self.prefix, str(key.bot_id), chat, str(key.user_id)]
+        if key.thread_id:
+            parts.append(f"t{key.thread_id}")
+        if key.business_connection_id:
+            parts.append(f"b{key.business_connection_id}")
+        if key.destiny != "default":
+            parts.append(key.destiny)
+        return ":".join(parts)
+
+    async def set_state(self, key: StorageKey, state: StateType = None) -> None:
+        await self._write(key, {STATE_FIELD: self._encode_state(state)})
+
+    async def get_state(self, key: StorageKey) -> Optional[str]:
+        value = await self.redis.hget(self.build_key(key), STATE_FIELD)
+        return self._decode_state(value)
+
+    async def set_data(self, key: StorageKey, data: Mapping[str, Any]) -> None:
+        await self._write(key, {DATA_FIELD: self._encode_data(data)})
+
+    async def get_data(self, key: StorageKey) -> Dict[str, Any]:
+        value = await self.redis.hget(self.build_key(key), DATA_FIELD)
+        return self._decode_data(value)
+
+    async def get_state_and_data(
+        self, key: StorageKey
+    ) -> Tuple[Optional[str], Dict[str, Any]]:
+        """Read the state and the data with a single HMGET."""
+        state, data = await self.redis.hmget(
+            self.build_key(key), [STATE_FIELD, DATA_FIELD]
+        )
+        return self._decode_state(state), self._decode_data(data)
+
+    async def set_state_and_data(
+        self, key: StorageKey, state: StateType, data: Mapping[str, Any]
+    ) -> None:
+        """Write the state and the data in one round trip."""
+        await self._write(
+            key,
+            {STATE_FIELD: self._encode_state(state), DATA_FIELD: self._encode_data(data)},
+        )
+
+    async def close(self) -> None:
+        await close_redis(self.redis)
+
+    async def _write(self, key: StorageKey, fields: Dict[str, Optional[bytes]]) -> None:
+        redis_key = self.build_key(key)
+        to_set = {f: v for f, v in fields.items() if v is not None}
+        to_delete = [f for f, v in fields.items() if v is None]
+
+        async with self.redis.pipeline(transaction=True) as pipe:
+            if to_delete:
+                pipe.hdel(redis_key, *to_delete)
+            if to_set:
+                pipe.hset(redis_key, mapping=to_set)
+                if self.ttl:
+                    pipe.expire(redis_key, self.ttl)
+            await pipe.execute()
+
+    @staticmethod
+    def _encode_state(state: StateType) -> Optional[bytes]:
+        if state is None:
+            return None
+        value = state.state if isinstance(state, State) else state
+        return value.encode("utf-8")
+
+    @staticmethod
+    def _decode_state(value: Optional[bytes]) -> Optional[str]:
+        if value is None:
+            return None
+        return value.decode("utf-8") if isinstance(value, bytes) else value
+
+    def _encode_data(self, data: Mapping[str, Any]) -> Optional[bytes]:
+        if not data:
+            return None
+        payload = msgpack.packb(dict(data), default=_default, use_bin_type=True)
+        if len(payload) > self.compress_threshold:
+            return _ZLIB + zlib.compress(payload)
+        return _RAW + payload
+
+    @staticmethod
+    def _decode_data(value: Optional[bytes]) -> Dict[str, Any]:
+        if not value:
+            return {}
+        payload = value[1:]
+        if value[:1] == _ZLIB:
+            payload = zlib.decompress(payload)
+        return msgpack.unpackb(payload, raw=False, strict_map_key=False)
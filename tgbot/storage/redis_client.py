@@ -0,0 +1,61 @@
+from typing import Literal, Union
+
+from aiogram.fsm.storage.base import StorageKey
+from aiogram.fsm.storage.redis import DefaultKeyBuilder, RedisStorage
+from redis.asyncio import Redis
+from redis.asyncio.cluster import ClusterNode, RedisCluster
+
+from tgbot.config import RedisConfig
+
+RedisClient = Union[Redis, RedisCluster]
+
+
+def create_redis(config: RedisConfig) -> RedisClient:
+    """
+    Create the Redis client for the configured topology.
+
+    In cluster mode REDIS_HOST:REDIS_PORT and every entry of REDIS_NODES are
+    used as startup nodes; the rest of the cluster is discovered from them.
+    """
+    if config.mode == "cluster":
+        nodes = [ClusterNode(config.redis_host, config.redis_port)]
+        for node in config.nodes:
+            host, _, port = node.rpartition(":")
+            nodes.append(ClusterNode(host, int(port)))
+        return RedisCluster(
+            startup_nodes=nodes,
+            password=config.redis_pass or None,
+            max_connections=config.max_connections,
+        )
+    return Redis.from_url(config.dsn(), max_connections=config.max_connections)
+
+
+async def close_redis(redis: RedisClient) -> None:
+    if isinstance(redis, RedisCluster):
+        await redis.aclose()
+    else:
+        await redis.aclose(close_connection_pool=True)
+
+
+class HashTagKeyBuilder(DefaultKeyBuilder):
+    """
+    Key builder for Redis Cluster: the chat id is put in a ``{hash tag}``, so
+    the state, data and lock keys of a chat are stored in the same slot and
+    can be written in one transaction.
+    """
+
+    def build(
+        self,
+        key: StorageKey,
+        part: Literal["data", "state", "lock"] | None = None,
+    ) -> str:
+        built = super().build(key, part)
+        prefix = self.prefix + self.separator
+        return f"{prefix}{{{key.chat_id}}}{self.separator}{built[len(prefix):]}"
+
+
+class ClusterRedisStorage(RedisStorage):
+    """aiogram's ``RedisStorage`` on top of a ``RedisCluster`` client."""
+
+    async def close(self) -> None:
+        await close_redis(self.redis)
@@ -0,0 +1,238 @@
+import asyncio
+import json
+import logging
+import os
+import time
+from typing import Any, Dict, Mapping, Optional, Tuple
+
+import aiosqlite
+from aiogram.fsm.state import State
+from aiogram.fsm.storage.base import BaseEventIsolation, BaseStorage, StateType, StorageKey
+from aiogram.fsm.storage.memory import SimpleEventIsolation
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS fsm (
+    bot_id INTEGER NOT NULL,
+    chat_id INTEGER NOT NULL,
+    user_id INTEGER NOT NULL,
+    thread_id INTEGER NOT NULL DEFAULT 0,
+    business_connection_id TEXT NOT NULL DEFAULT '',
+    destiny TEXT NOT NULL,
+    state TEXT,
+    data TEXT,
+    updated_at REAL NOT NULL,
+    PRIMARY KEY (bot_id, chat_id, user_id, thread_id, business_connection_id, destiny)
+)
+"""
+
+_UPSERT = """
+INSERT INTO fsm (
+    bot_id, chat_id, user_id, thread_id, business_connection_id, destiny,
+    state, data, updated_at
+) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
+ON CONFLICT (bot_id, chat_id, user_id, thread_id, business_connection_id, destiny)
+DO UPDATE SET state = excluded.state, data = excluded.data, updated_at = excluded.updated_at
+"""
+
+_DELETE = """
+DELETE FROM fsm WHERE bot_id = ? AND chat_id = ? AND user_id = ?
+    AND thread_id = ? AND business_connection_id = ? AND destiny = ?
+"""
+
+
+def _default(value: Any) -> Any:
+    # Sets (e.g. selected directions) are stored as lists
+    if isinstance(value, (set, frozenset)):
+        return list(value)
+    raise TypeError(f"Cannot serialize {type(value).__name__}")
+
+
+def _key_columns(key: StorageKey) -> tuple:
+    return (
+        key.bot_id,
+        key.chat_id,
+        key.user_id,
+        key.thread_id or 0,
+        key.business_connection_id or "",
+        key.destiny,
+    )
+
+
+class SqliteStorage(BaseStorage):
+    """
+    Durable FSM storage for single-node deployments without Redis.
+
+    Every record lives in an in-memory mirror, so reads cost the same as with
+    ``MemoryStorage``; like it, reads and writes copy the top level of the
+    data only (drafts hold JSON values that handlers replace, not mutate).
+    Writes only mark the chat as dirty; a background task commits all dirty
+    chats in one transaction every ``flush_interval`` seconds, so a burst of
+    updates costs one fsync. The database runs in WAL mode: a crash loses at
+    most the last ``flush_interval`` of changes and never leaves a
+    half-written record. On start the mirror is loaded from disk, dropping
+    records idle for longer than ``ttl``.
+    """
+
+    def __init__(
+        self,
+        path: str,
+        flush_interval: float = 0.2,
+        ttl: Optional[float] = None,
+    ) -> None:
+        self.path = path
+        self.flush_interval = flush_interval
+        self.ttl = ttl
+        self._db: Optional[aiosqlite.Connection] = None
+        self._open_lock = asyncio.Lock()
+        # key -> (state, data, updated_at wall time)
+        self._records: Dict[StorageKey, Tuple[Optional[str], Dict[str, Any], float]] = {}
+        self._dirty: set[StorageKey] = set()
+        self._flusher: Optional[asyncio.Task] = None
+        self._stopping = asyncio.Event()
+        self.commits = 0
+        self.log = logging.getLogger(self.__class__.__name__)
+
+    async def open(self) -> None:
+        """Open the database and load the stored records into memory."""
+        async with self._open_lock:
+            if self._db is not None:
+                return
+            directory = os.path.dirname(self.path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+
+            db = await aiosqlite.connect(self.path, timeout=30)
+            await db.execute("PRAGMA journal_mode=WAL")
+            await db.execute("PRAGMA synchronous=NORMAL")
+            await db.execute(_SCHEMA)
+            if self.ttl:
+                await db.execute(
+                    "DELETE FROM fsm WHERE updated_at < ?", (time.time() - self.ttl,)
+                )
+            await db.commit()
+
+            async with db.execute(
+                "SELECT bot_id, chat_id, user_id, thread_id, business_connection_id,"
+                " destiny, state, data, updated_at FROM fsm ORDER BY updated_at"
+            ) as cursor:
+                async for row in cursor:
+                    key = StorageKey(
+                        bot_id=row[0],
+                        chat_id=row[1],
+                        user_id=row[2],
+                        thread_id=row[3] or None,
+                        business_connection_id=row[4] or None,
+                        destiny=row[5],
+                    )
+                    self._records[key] = (row[6], json.loads(row[7]) if row[7] else {}, row[8])
+            self.log.info("Loaded %d FSM records from %s", len(self._records), self.path)
+
+            self._db = db
+            self._stopping.clear()
+            self._flusher = asyncio.create_task(self._flush_periodically())
+
+    def create_isolation(self, **kwargs: Any) -> BaseEventIsolation:
+        return SimpleEventIsolation()
+
+    async def set_state(self, key: StorageKey, state: StateType = None) -> None:
+        _, data, _ = await self._get(key)
+        self._put(key, state.state if isinstance(state, State) else state, data)
+
+    async def get_state(self, key: StorageKey) -> Optional[str]:
+        state, _, _ = await self._get(key)
+        return state
+
+    async def set_data(self, key: StorageKey, data: Mapping[str, Any]) -> None:
+        state, _, _ = await self._get(key)
+        self._put(key, state, dict(data))
+
+    async def get_data(self, key: StorageKey) -> Dict[str, Any]:
+        _, data, _ = await self._get(key)
+        return dict(data)
+
+    async def set_state_and_data(
+        self, key: StorageKey, state: StateType, data: Mapping[str, Any]
+    ) -> None:
+        await self._get(key)
+        self._put(
+            key,
+            state.state if isinstance(state, State) else state,
+            dict(data),
+        )
+
+    async def get_state_and_data(
+        self, key: StorageKey
+    ) -> Tuple[Optional[str], Dict[str, Any]]:
+        state, data, _ = await self._get(key)
+        return state, dict(data)
+
+    def record_count(self) -> int:
+        """Number of keys holding a state or data; cleared keys are not kept."""
+        return len(self._records)
+
+    def updated_at(self) -> Dict[StorageKey, float]:
+        """Wall-clock time of the last write of every stored record."""
+        return {key: record[2] for key, record in self._records.items()}
+
+    async def flush(self) -> None:
+        """Commit the records changed since the last flush in one transaction."""
+        if self._db is None or not self._dirty:
+            return
+        dirty, self._dirty = self._dirty, set()
+        upserts = []
+        deletes = []
+        for key in dirty:
+            record = self._records.get(key)
+            if record is None:
+                deletes.append(_key_columns(key))
+            else:
+                state, data, updated_at = record
+                encoded = json.dumps(data, default=_default) if data else None
+                upserts.append((*_key_columns(key), state, encoded, updated_at))
+        try:
+            if deletes:
+                await self._db.executemany(_DELETE, deletes)
+            if upserts:
+                await self._db.executemany(_UPSERT, upserts)
+            await self._db.commit()
+        except BaseException:
+            # Retried on the next flush, unless the chat is written again
+            # meanwhile; also when the flush is cancelled mid-transaction
+            self._dirty |= dirty
+            await self._db.rollback()
+            raise
+        self.commits += 1
+
+    async def close(self) -> None:
+        if self._flusher is not None:
+            # Let a flush in progress finish instead of cancelling it
+            self._stopping.set()
+            await asyncio.gather(self._flusher, return_exceptions=True)
+            self._flusher = None
+        if self._db is not None:
+            await self.flush()
+            await self._db.close()
+            self._db = None
+
+    async def _get(self, key: StorageKey) -> Tuple[Optional[str], Dict[str, Any], float]:
+        if self._db is None:
+            await self.open()
+        return self._records.get(key, (None, {}, 0.0))
+
+    def _put(self, key: StorageKey, state: Optional[str], data: Dict[str, Any]) -> None:
+        if state is None and not data:
+            self._records.pop(key, None)
+        else:
+            self._records[key] = (state, data, time.time())
+        self._dirty.add(key)
+
+    async def _flush_periodically(self) -> None:
+        while not self._stopping.is_set():
+            try:
+                await asyncio.wait_for(self._stopping.wait(), self.flush_interval)
+            except asyncio.TimeoutError:
+                pass
+            try:
+                await self.flush()
+            except Exception as e:
+                self.log.warning("Could not save FSM records: %s", e)